@@ -1,6 +1,6 @@
 from django.contrib import admin
 from todolist.models import UserTodo
-from .models import CustomUser, UserProfile
+from .models import CustomUser, UserProfile, OutboxEmail
 
 
 class TaskTabularInline(admin.TabularInline):
@@ -20,5 +20,11 @@ class UserProfilePanel(admin.ModelAdmin):
     search_fields = ('user',)
 
 
+class OutboxEmailPanel(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt')
+    list_filter = ('status',)
+
+
 admin.site.register(CustomUser, CustomUserPanel)
 admin.site.register(UserProfile, UserProfilePanel)
+admin.site.register(OutboxEmail, OutboxEmailPanel)
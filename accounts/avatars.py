@@ -0,0 +1,113 @@
+import posixpath
+from io import BytesIO
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+DEFAULT_AVATAR = 'default-user-avatar.jpg'
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+MAX_PIXELS = 40_000_000
+ORIGINAL_MAX_SIDE = 1024
+
+# Square thumbnails, the smallest one that fits is picked by the templates
+VARIANTS = {'navbar': 64, 'profile': 320}
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+
+def is_default(avatar):
+    return avatar.name.split('/')[-1] == DEFAULT_AVATAR
+
+
+def variant_name(avatar_name, variant, extension):
+    directory, filename = posixpath.split(avatar_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{variant}.{extension}')
+
+
+def variant_names(avatar_name):
+    return [variant_name(avatar_name, variant, extension) for variant in VARIANTS for extension in VARIANT_FORMATS]
+
+
+def validate_avatar(upload):
+    """
+    Checks the size, the format and the dimensions of the uploaded image, then decodes it, so a truncated or
+    corrupt file is refused here rather than when it is processed. AVATAR_MAX_UPLOAD_SIZE is read on every call.
+    """
+    max_size = getattr(settings, 'AVATAR_MAX_UPLOAD_SIZE', 5 * 1024 * 1024)
+    if upload.size > max_size:
+        raise ValidationError(f'Your avatar is too big. It must be {max_size // (1024 * 1024)}MB or less.')
+
+    try:
+        image = Image.open(upload)
+        image.verify()
+        if image.format not in ALLOWED_FORMATS:
+            raise ValidationError('Your avatar must be a JPEG, PNG, WEBP or GIF image.')
+        if image.width * image.height > MAX_PIXELS:
+            raise ValidationError('Your avatar has too many pixels.')
+
+        # verify() only checks the structure, the pixels are decoded from a new image (verify() consumes this one)
+        upload.seek(0)
+        Image.open(upload).load()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError('Your avatar is not a valid image.')
+    finally:
+        upload.seek(0)
+
+
+def is_processed_inline(upload):
+    """
+    Uploads up to AVATAR_INLINE_MAX_SIZE are processed during the request, larger ones are left to
+    the processavatars command to keep the request fast.
+    """
+    return upload.size <= getattr(settings, 'AVATAR_INLINE_MAX_SIZE', 1024 * 1024)
+
+
+def encode(image, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def replace_file(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, content)
+
+
+def process_avatar(profile):
+    """
+    Re-encodes the original avatar without any metadata (EXIF, GPS, comments...), bounded to ORIGINAL_MAX_SIDE,
+    and generates every thumbnail variant in WebP and JPEG. It does not save the profile.
+    """
+    avatar = profile.avatar
+    storage = avatar.storage
+
+    with avatar.open('rb') as file:
+        image = Image.open(file)
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    image = image.convert('RGBA' if image_format in ('PNG', 'WEBP') and 'A' in image.getbands() else 'RGB')
+    image.thumbnail((ORIGINAL_MAX_SIDE, ORIGINAL_MAX_SIDE), Image.LANCZOS)
+
+    avatar.name = replace_file(storage, avatar.name, encode(image, image_format, quality=90))
+
+    opaque = image.convert('RGB')
+    for variant, side in VARIANTS.items():
+        thumbnail = ImageOps.fit(opaque, (side, side), Image.LANCZOS)
+        for extension, variant_format in VARIANT_FORMATS.items():
+            replace_file(storage, variant_name(avatar.name, variant, extension),
+                         encode(thumbnail, variant_format, quality=82, optimize=True))
+
+    profile.avatar_processed = True
+
+
+def delete_avatar(avatar):
+    if is_default(avatar):
+        return
+
+    for name in [avatar.name, *variant_names(avatar.name)]:
+        if avatar.storage.exists(name):
+            avatar.storage.delete(name)
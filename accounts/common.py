@@ -1,14 +1,9 @@
-import os
-
-
-def delete_image(path):
-    if not os.path.exists(path):
-        return
-    os.remove(path)
-
-
 def upload_new_picture(profile, new_picture):
-    old_picture = profile.avatar.name.split('/')[-1]
-    if old_picture != 'default-user-avatar.jpg':
-        delete_image(profile.avatar.path)
+    """
+    Replaces the avatar of the profile and returns the previous one, which the caller deletes (delete_avatar)
+    once the new one is saved, so a failed upload keeps it.
+    """
+    previous = profile.avatar
     profile.avatar = new_picture
+    profile.avatar_processed = False
+    return previous
@@ -1,6 +1,8 @@
 from django import forms
 from .models import CustomUser, UserProfile
 from django.contrib.auth import forms as auth_forms
+from django.template.loader import render_to_string
+from .mail import queue_mail
 from .validators import length_username_validator
 
 
@@ -49,6 +51,17 @@ class CustomPasswordResetForm(auth_forms.PasswordResetForm):
              'class': 'main_input'}
         )
 
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email, html_email_template_name=None):
+        """
+        Same as PasswordResetForm.send_mail, but the email is queued in the outbox instead of sent in the request.
+        """
+        subject = ''.join(render_to_string(subject_template_name, context).splitlines())
+        body = render_to_string(email_template_name, context)
+        html_body = render_to_string(html_email_template_name, context) if html_email_template_name else ''
+
+        queue_mail(subject, body, from_email, (to_email,), html_body=html_body)
+
 
 class CustomSetPasswordForm(auth_forms.SetPasswordForm):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import OutboxEmail
+
+
+def queue_mail(subject, body, from_email, recipients, html_body=''):
+    """
+    Stores the email in the outbox. It is delivered later by the sendoutbox command.
+    """
+    return OutboxEmail.objects.create(subject=subject,
+                                      body=body,
+                                      html_body=html_body or '',
+                                      from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+                                      recipients='\n'.join(recipients))
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email,
+                                     email.recipients.split('\n'), connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def reset_connection(connection):
+    try:
+        connection.close()
+    except (SMTPException, OSError):
+        pass
+
+
+def claim_batch(batch_size):
+    """
+    Claims up to batch_size due emails by moving their next attempt past EMAIL_OUTBOX_CLAIM_TIMEOUT, so other
+    workers skip them while they are being sent. The rows are only locked (skipping rows locked by other workers
+    where the database supports it) while they are claimed. The emails of a worker that dies are due again
+    once their claim expires.
+    """
+    claim_timeout = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', 600)
+
+    with transaction.atomic():
+        emails = list(OutboxEmail.objects.select_for_update(skip_locked=True)
+                      .filter(status=OutboxEmail.Status.PENDING, next_attempt__lte=timezone.now())
+                      .order_by('next_attempt', 'id')[:batch_size])
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            next_attempt=timezone.now() + timedelta(seconds=claim_timeout)
+        )
+    return emails
+
+
+def mark_sent(email):
+    email.status = OutboxEmail.Status.SENT
+    email.date_sent = timezone.now()
+    email.attempts += 1
+    email.save(update_fields=('status', 'date_sent', 'attempts'))
+
+
+def mark_failed_attempt(email, error):
+    email.attempts += 1
+    email.last_error = str(error) or type(error).__name__
+
+    if email.attempts >= getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        email.status = OutboxEmail.Status.FAILED
+    else:
+        retry_delay = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+        email.next_attempt = timezone.now() + timedelta(seconds=retry_delay * 2 ** (email.attempts - 1))
+    email.save(update_fields=('status', 'attempts', 'last_error', 'next_attempt'))
+
+
+def deliver_outbox(batch_size=50, connection=None):
+    """
+    Sends one batch of due emails over a single SMTP connection and returns (sent, failed) counts.
+
+    The batch is claimed first (see claim_batch), so several workers can drain the outbox in parallel, and the
+    emails are sent outside of any transaction. Each result is saved right after its email, so a crash never
+    sends the delivered emails again. Any error counts as a failed attempt, retried with exponential backoff
+    until EMAIL_OUTBOX_MAX_ATTEMPTS, so a broken email cannot block the outbox.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    try:
+        for email in emails:
+            try:
+                # Reuses the open connection, or reconnects after a failure.
+                connection.open()
+                build_message(email, connection).send()
+            except Exception as error:
+                mark_failed_attempt(email, error)
+                reset_connection(connection)
+                failed += 1
+                continue
+
+            mark_sent(email)
+            sent += 1
+    finally:
+        reset_connection(connection)
+
+    return sent, failed
@@ -1,5 +1,7 @@
+import time
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from mysite.settings import PASSWORD_RESET_TIMEOUT
 from django.utils import timezone
 from datetime import timedelta
@@ -8,16 +10,43 @@ from datetime import timedelta
 class Command(BaseCommand):
     help = 'Helper command to delete inactive users older than specified time.'
     UserModel = get_user_model()
-    current_time = timezone.now()
     time_kwarg = {'seconds': PASSWORD_RESET_TIMEOUT}
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of users deleted per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the users that would be deleted.')
+
     def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(**self.time_kwarg)
+        inactive_users = self.UserModel.objects.filter(is_active=False, date_joined__lte=cutoff)
+
+        if options['dry_run']:
+            count = inactive_users.count()
+            self.stdout.write(f'Would delete {count} inactive {self.pluralize(count)} joined before {cutoff}.')
+            return
+
         deleted_users = 0
-        inactive_users = self.UserModel.objects.filter(is_active=False)
+        started = time.monotonic()
+
+        while True:
+            batch = list(inactive_users.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+
+            # The collector deletes the related rows of the whole batch with a few set-based queries
+            with transaction.atomic():
+                self.UserModel.objects.filter(pk__in=batch).delete()
+
+            deleted_users += len(batch)
+            self.stdout.write(f'Deleted {deleted_users} inactive {self.pluralize(deleted_users)} so far...')
 
-        for user in inactive_users:
-            if self.current_time >= user.date_joined + timedelta(**self.time_kwarg):
-                user.delete()
-                deleted_users += 1
+        elapsed = time.monotonic() - started
+        rate = deleted_users / elapsed if elapsed else 0
+        self.stdout.write(f'Deleted {deleted_users} inactive {self.pluralize(deleted_users)}! '
+                          f'({elapsed:.2f}s, {rate:.0f} users/s)')
 
-        self.stdout.write(f'Deleted {deleted_users} inactive {"users" if deleted_users in (0, 2) else "user"}!')
+    @staticmethod
+    def pluralize(count):
+        return 'user' if count == 1 else 'users'
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.avatars import DEFAULT_AVATAR, process_avatar
+from accounts.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Strips the metadata of the uploaded avatars and generates their thumbnails.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new avatars instead of exiting once all are processed.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls, when there is nothing to process.')
+
+    def handle(self, *args, **options):
+        while True:
+            profiles = UserProfile.objects.filter(avatar_processed=False).exclude(avatar__endswith=DEFAULT_AVATAR)
+            processed = 0
+
+            for profile in profiles.iterator():
+                try:
+                    process_avatar(profile)
+                except OSError as error:
+                    self.stderr.write(f'Could not process the avatar of {profile}: {error}')
+                    continue
+
+                profile.save(update_fields=('avatar', 'avatar_processed'))
+                processed += 1
+
+            if processed:
+                self.stdout.write(f'Processed {processed} avatars.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
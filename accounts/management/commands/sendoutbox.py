@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from accounts.mail import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = 'Delivers the queued emails in batches over one reused SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of emails sent per batch.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is drained.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls, when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            # Delivery errors are recorded on the emails, deliver_outbox does not raise them
+            sent, failed = deliver_outbox(batch_size=options['batch_size'])
+            total_sent, total_failed = total_sent + sent, total_failed + failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, {failed} failed.')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(f'Outbox drained: {total_sent} sent, {total_failed} failed.')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from utils.smtp import SMTPSink
+
+
+class Command(BaseCommand):
+    help = 'Runs a local SMTP server that prints every received email instead of delivering it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=1025)
+
+    def handle(self, *args, **options):
+        def on_message(mail_from, recipients, message):
+            self.stdout.write(f'--- From: {mail_from} To: {", ".join(recipients)}\n{message.as_string()}')
+
+        with SMTPSink(options['host'], options['port'], on_message=on_message) as sink:
+            self.stdout.write(f'SMTP sink listening on {options["host"]}:{sink.port}. Press CTRL-C to quit.')
+            try:
+                sink.thread.join()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.9 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='avatar_processed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
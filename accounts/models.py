@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 
@@ -9,8 +10,38 @@ class CustomUser(AbstractUser):
 class UserProfile(models.Model):
     bio = models.CharField(max_length=150, null=True, blank=True)
     avatar = models.ImageField(upload_to='images/user-profiles', default='/images/default-user-avatar.jpg')
+    avatar_processed = models.BooleanField(default=False)
     dark_mode = models.BooleanField(default=False)
     user = models.OneToOneField(db_index=True, to=CustomUser, on_delete=models.CASCADE)
 
     def __str__(self):
         return self.user.username
+
+
+class OutboxEmail(models.Model):
+    """
+    Email waiting to be delivered by the sendoutbox command, so requests never talk to the SMTP server.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        SENT = 'sent'
+        FAILED = 'failed'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text='One email address per line.')
+
+    status = models.CharField(max_length=7, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    date_sent = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.subject} ({self.status})'
+
+    class Meta:
+        indexes = [models.Index(fields=('status', 'next_attempt'))]
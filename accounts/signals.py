@@ -1,9 +1,9 @@
-from django.core.cache import cache
 from django.dispatch import receiver
-from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from accounts.models import CustomUser, UserProfile
-from accounts.common import delete_image
-from utils.caching import set_cache
+from accounts.avatars import delete_avatar
+from utils.caching import invalidate_user_caches
 from teams.models import TeamJunction, Team
 
 
@@ -18,24 +18,34 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 
-@receiver(pre_delete, sender=CustomUser)
-def delete_user_avatar(sender, instance, **kwargs):
-    profile = UserProfile.objects.get(user=instance)
-    picture = profile.avatar.name.split('/')[-1]
+@receiver(post_delete, sender=UserProfile)
+def delete_user_avatar(sender, instance, using, **kwargs):
+    # The profile is already loaded by the deletion collector, so this does not query per user
+    avatar = instance.avatar
+    transaction.on_commit(lambda: delete_avatar(avatar), using=using)
 
-    if picture != 'default-user-avatar.jpg':
-        delete_image(profile.avatar.path)
 
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=TeamJunction)
+@receiver(post_delete, sender=TeamJunction)
+def invalidate_member_cache(sender, instance, using, **kwargs):
+    invalidate_user_caches([instance.user_id], using=using)
 
-@receiver([post_save, post_delete])
-def clear_cache(sender, instance, **kwargs):
-    if sender not in (Team, TeamJunction, UserProfile):
-        return
 
-    if isinstance(instance, Team):
-        user = instance.owner
-    else:
-        user = instance.user
+@receiver(post_save, sender=Team)
+def invalidate_team_cache(sender, instance, created, using, **kwargs):
+    """
+    Every member caches the team's slug and title, so all of them are invalidated.
+    A new team has no members yet, besides the owner who is added right after.
+    """
+    user_ids = [instance.owner_id]
+    if not created:
+        user_ids.extend(TeamJunction.objects.using(using).filter(team=instance).values_list('user_id', flat=True))
+    invalidate_user_caches(user_ids, using=using)
 
-    cache.delete(user)
-    set_cache(user)
+
+@receiver(post_delete, sender=Team)
+def invalidate_deleted_team_cache(sender, instance, using, **kwargs):
+    # The members are collected from the cascaded TeamJunction deletes, within the same transaction.
+    invalidate_user_caches([instance.owner_id], using=using)
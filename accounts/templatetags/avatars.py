@@ -0,0 +1,19 @@
+from django import template
+from accounts.avatars import is_default, variant_name
+
+register = template.Library()
+
+
+@register.inclusion_tag('accounts/render/avatar.html')
+def avatar_picture(profile, variant, alt='', css_class='', style=''):
+    """
+    Renders the profile's avatar as <picture>, preferring the WebP thumbnail of the given variant.
+    Avatars that are not processed yet fall back to the original image.
+    """
+    avatar = profile.avatar
+    context = {'src': avatar.url, 'webp': None, 'alt': alt, 'css_class': css_class, 'style': style}
+
+    if profile.avatar_processed and not is_default(avatar):
+        context.update({'src': avatar.storage.url(variant_name(avatar.name, variant, 'jpg')),
+                        'webp': avatar.storage.url(variant_name(avatar.name, variant, 'webp'))})
+    return context
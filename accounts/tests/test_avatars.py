@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from accounts.avatars import validate_avatar, variant_name, variant_names
+from accounts.models import CustomUser, UserProfile
+
+
+def jpeg(size=(400, 300), exif=True):
+    image = Image.new('RGB', size, 'red')
+    metadata = Image.Exif()
+    if exif:
+        metadata[0x010F] = 'Camera maker'
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', exif=metadata)
+    return buffer.getvalue()
+
+
+def upload(content, name='avatar.jpg'):
+    return SimpleUploadedFile(name, content, content_type='image/jpeg')
+
+
+class MediaRootMixin:
+    """
+    Saves the uploads in a temporary MEDIA_ROOT.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class ValidateAvatarTest(SimpleTestCase):
+    def test_valid_image(self):
+        validate_avatar(upload(jpeg()))
+
+    def test_refused_uploads(self):
+        content = jpeg()
+        cases = {'oversized': upload(b'x' * 2048), 'not an image': upload(b'not an image'),
+                 'truncated': upload(content[:len(content) // 2])}
+        for case, uploaded in cases.items():
+            with self.subTest(case), override_settings(AVATAR_MAX_UPLOAD_SIZE=1024), \
+                    self.assertRaises(ValidationError):
+                validate_avatar(uploaded)
+
+
+class AvatarUploadTest(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(username='pictured', email='pictured@example.com', password='x')
+        self.client.force_login(self.user)
+
+    def post(self, content):
+        return self.client.post(reverse('accounts:my_profile', kwargs={'username': self.user.username}),
+                                {'avatar': upload(content)})
+
+    def profile(self):
+        return UserProfile.objects.get(user=self.user)
+
+    def test_inline_upload_is_stripped_and_resized(self):
+        self.post(jpeg())
+        profile = self.profile()
+        self.assertTrue(profile.avatar_processed)
+
+        with profile.avatar.open('rb') as file:
+            self.assertEqual(len(Image.open(file).getexif()), 0)
+        for variant, side in (('navbar', 64), ('profile', 320)):
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with default_storage.open(variant_name(profile.avatar.name, variant, extension)) as file:
+                    image = Image.open(file)
+                    self.assertEqual((image.format, image.size), (image_format, (side, side)))
+                    self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(AVATAR_INLINE_MAX_SIZE=1)
+    def test_large_upload_is_left_to_the_command(self):
+        self.post(jpeg())
+        self.assertFalse(self.profile().avatar_processed)
+
+        call_command('processavatars', stdout=StringIO())
+        profile = self.profile()
+        self.assertTrue(profile.avatar_processed)
+        self.assertTrue(all(default_storage.exists(name) for name in variant_names(profile.avatar.name)))
+
+    def test_replacing_deletes_the_previous_files(self):
+        self.post(jpeg())
+        previous = self.profile().avatar.name
+        self.post(jpeg(exif=False))
+
+        self.assertNotEqual(self.profile().avatar.name, previous)
+        self.assertFalse(any(default_storage.exists(name) for name in [previous, *variant_names(previous)]))
+
+    def test_truncated_upload_keeps_the_previous_picture(self):
+        self.post(jpeg())
+        previous = self.profile().avatar.name
+        content = jpeg()
+
+        response = self.post(content[:len(content) // 2])
+        self.assertContains(response, 'Your avatar is not a valid image.')
+        self.assertEqual(self.profile().avatar.name, previous)
+        self.assertTrue(default_storage.exists(previous))
+
+    def test_processing_failure_keeps_the_previous_picture(self):
+        self.post(jpeg())
+        previous = self.profile().avatar.name
+
+        with mock.patch('accounts.views.user_profile.process_avatar', side_effect=OSError('image file is truncated')):
+            response = self.post(jpeg(exif=False))
+        self.assertContains(response, 'Your avatar could not be processed.')
+
+        profile = self.profile()
+        self.assertEqual((profile.avatar.name, profile.avatar_processed), (previous, True))
+        self.assertEqual(default_storage.listdir('images/user-profiles')[1], [previous.split('/')[-1]])
+
+
+class AvatarDeletionTest(MediaRootMixin, TransactionTestCase):
+    """
+    The files of a deleted profile are removed on commit, which TestCase never runs.
+    """
+    def test_deleted_profile_removes_every_file(self):
+        user = CustomUser.objects.create_user(username='deleted', email='deleted@example.com', password='x')
+        self.client.force_login(user)
+        self.client.post(reverse('accounts:my_profile', kwargs={'username': user.username}),
+                         {'avatar': upload(jpeg())})
+        name = UserProfile.objects.get(user=user).avatar.name
+        self.assertTrue(default_storage.exists(name))
+
+        user.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in [name, *variant_names(name)]))
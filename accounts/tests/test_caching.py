@@ -0,0 +1,73 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from accounts.models import CustomUser, UserProfile
+from teams.models import Team, TeamJunction
+from utils.caching import bump_cache_versions, get_cache_version, get_user_cache, version_key
+
+
+class UserCacheRecordTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='cached', email='cached@example.com', password='x')
+        cls.team = Team.objects.create(title='Cached', identifier='cached', owner=cls.user)
+        TeamJunction.objects.create(team=cls.team, user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_record_is_read_without_queries(self):
+        record = get_user_cache(self.user)
+        self.assertFalse(record.dark_mode)
+        self.assertEqual(record.team_ids, (self.team.id,))
+        self.assertEqual(record.owned_teams(self.user.id)[0].slug, self.team.slug)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_cache(self.user), record)
+
+    def test_bumped_version_rebuilds_the_record(self):
+        record = get_user_cache(self.user)
+        # update() sends no signal, only the bump makes the change visible
+        UserProfile.objects.filter(user=self.user).update(dark_mode=True)
+        self.assertFalse(get_user_cache(self.user).dark_mode)
+
+        bump_cache_versions([self.user.id])
+        rebuilt = get_user_cache(self.user)
+        self.assertTrue(rebuilt.dark_mode)
+        self.assertGreater(rebuilt.version, record.version)
+
+
+class InvalidationOnCommitTest(TransactionTestCase):
+    """
+    Invalidations are deferred to transaction.on_commit, which TestCase never runs.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='first', email='first@example.com', password='x')
+        self.other = CustomUser.objects.create_user(username='second', email='second@example.com', password='x')
+
+    def test_invalidated_when_the_transaction_commits(self):
+        version = get_cache_version(self.user.id)
+        with transaction.atomic():
+            UserProfile.objects.filter(user=self.user).get().save()
+            self.assertEqual(get_cache_version(self.user.id), version)
+        self.assertNotEqual(get_cache_version(self.user.id), version)
+
+    def test_kept_when_the_transaction_rolls_back(self):
+        version = get_cache_version(self.user.id)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            UserProfile.objects.filter(user=self.user).get().save()
+            raise RuntimeError
+        self.assertEqual(get_cache_version(self.user.id), version)
+
+    def test_flushed_once_per_transaction(self):
+        team = Team.objects.create(title='Flushed', identifier='flushed', owner=self.user)
+        with mock.patch.object(cache, 'delete_many', wraps=cache.delete_many) as delete_many:
+            with transaction.atomic():
+                for user in (self.user, self.other):
+                    TeamJunction.objects.create(team=team, user=user)
+                    UserProfile.objects.filter(user=user).get().save()
+        delete_many.assert_called_once()
+        flushed = set(delete_many.call_args.args[0])
+        self.assertLessEqual({version_key(self.user.id), version_key(self.other.id)}, flushed)
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import CustomUser, UserProfile
+
+
+class CheckUsersTest(TestCase):
+    def setUp(self):
+        expired = timezone.now() - timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT + 60)
+        for number in range(5):
+            CustomUser.objects.create_user(username=f'abandoned{number}', email=f'abandoned{number}@example.com',
+                                           password='x', is_active=False, date_joined=expired)
+        self.recent = CustomUser.objects.create_user(username='recent', email='recent@example.com', password='x',
+                                                     is_active=False)
+        self.active = CustomUser.objects.create_user(username='active', email='active@example.com', password='x',
+                                                     date_joined=expired)
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('checkusers', *args, stdout=out)
+        return out.getvalue()
+
+    def test_deletes_expired_inactive_users_in_batches(self):
+        output = self.call('--batch-size', '2')
+        self.assertIn('Deleted 5 inactive users!', output)
+        self.assertEqual(output.count('so far...'), 3)
+        self.assertQuerysetEqual(CustomUser.objects.order_by('username'), ['active', 'recent'],
+                                 transform=lambda user: user.username)
+        self.assertEqual(UserProfile.objects.count(), 2)
+
+    def test_dry_run_only_counts(self):
+        self.assertIn('Would delete 5 inactive users', self.call('--dry-run'))
+        self.assertEqual(CustomUser.objects.count(), 7)
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from accounts.mail import deliver_outbox, queue_mail
+from accounts.models import OutboxEmail
+from utils.smtp import SMTPSink
+
+
+class DeliverOutboxTest(TestCase):
+    def setUp(self):
+        self.email = queue_mail('Hello', 'Body', 'from@example.com', ['to@example.com'])
+
+    def smtp_settings(self, port):
+        return self.settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='localhost',
+                             EMAIL_PORT=port, EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='')
+
+    def deliver_unreachable(self):
+        # The port of a closed sink refuses connections
+        with SMTPSink() as sink:
+            port = sink.port
+        with self.smtp_settings(port):
+            return deliver_outbox()
+
+    def make_due(self):
+        OutboxEmail.objects.update(next_attempt=timezone.now() - timedelta(seconds=1))
+
+    def test_sends_due_emails(self):
+        with SMTPSink() as sink, self.smtp_settings(sink.port):
+            self.assertEqual(deliver_outbox(), (1, 0))
+            self.assertEqual(deliver_outbox(), (0, 0))
+
+        mail_from, recipients, message = sink.messages[0]
+        self.assertEqual((mail_from, recipients, message['Subject']), ('from@example.com', ['to@example.com'], 'Hello'))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboxEmail.Status.SENT, 1))
+
+    def test_retries_with_backoff(self):
+        self.assertEqual(self.deliver_unreachable(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboxEmail.Status.PENDING, 1))
+        self.assertGreater(self.email.next_attempt, timezone.now())
+        self.assertTrue(self.email.last_error)
+
+        # Not due yet
+        with SMTPSink() as sink, self.smtp_settings(sink.port):
+            self.assertEqual(deliver_outbox(), (0, 0))
+            self.make_due()
+            self.assertEqual(deliver_outbox(), (1, 0))
+        self.assertEqual(len(sink.messages), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        with self.settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2):
+            self.deliver_unreachable()
+            self.make_due()
+            self.deliver_unreachable()
+
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboxEmail.Status.FAILED, 2))
+        self.make_due()
+        self.assertEqual(deliver_outbox(), (0, 0))
+
+    def test_any_error_is_a_failed_attempt(self):
+        with SMTPSink() as sink, self.smtp_settings(sink.port):
+            with mock.patch('accounts.mail.build_message', side_effect=ValueError('broken')):
+                self.assertEqual(deliver_outbox(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.attempts, self.email.last_error), (1, 'broken'))
+
+    def test_claimed_emails_are_not_due(self):
+        due_while_sending = []
+
+        def build_message(email, connection):
+            due_while_sending.append(OutboxEmail.objects.filter(next_attempt__lte=timezone.now()).count())
+            return mock.Mock()
+
+        with mock.patch('accounts.mail.build_message', build_message):
+            self.assertEqual(deliver_outbox(connection=mock.Mock()), (1, 0))
+        self.assertEqual(due_while_sending, [0])
@@ -13,9 +13,9 @@ from django.core.exceptions import ValidationError
 from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
 from accounts.tokens import email_verification_token
-from django.core.mail import send_mail
+from django.db import transaction
+from accounts.mail import queue_mail
 from mysite.settings import EMAIL_HOST_USER
-from smtplib import SMTPException
 
 
 class RegisterView(GenericDispatchMixin, CreateView):
@@ -35,14 +35,9 @@ class RegisterView(GenericDispatchMixin, CreateView):
             return render(self.request, 'home/home.html')
 
         user.is_active = False
-        user.save()
-
-        try:
+        with transaction.atomic():
+            user.save()
             self.send_mail(user)
-        except SMTPException:
-            user.delete()
-            context = {'admin_email': EMAIL_HOST_USER}
-            return render(self.request, 'accounts/register/register_failed.html', context)
 
         return render(self.request, 'accounts/register/register_done.html')
 
@@ -62,7 +57,7 @@ class RegisterView(GenericDispatchMixin, CreateView):
         }
 
         message = render_to_string(self.email_template_name, context)
-        send_mail(self.title, message, EMAIL_HOST_USER, (user.email,))
+        queue_mail(self.title, message, EMAIL_HOST_USER, (user.email,))
 
 
 class ActivateAccountView(View):
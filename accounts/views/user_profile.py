@@ -10,6 +10,8 @@ from utils.http import Http400
 from utils.mixins import GenericDispatchMixin, EnableSearchBarMixin
 from django.urls import reverse_lazy
 from accounts.common import upload_new_picture
+from accounts.avatars import delete_avatar, is_processed_inline, process_avatar, validate_avatar
+from django.core.exceptions import ValidationError
 
 
 class UserProfileView(GenericDispatchMixin, EnableSearchBarMixin, View):
@@ -19,6 +21,7 @@ class UserProfileView(GenericDispatchMixin, EnableSearchBarMixin, View):
         self.user = None
         self.profile = None
         self.is_trusted = None
+        self.avatar_error = None
 
     def dispatch(self, request, *args, **kwargs):
         if 'q' in self.request.GET:
@@ -48,14 +51,36 @@ class UserProfileView(GenericDispatchMixin, EnableSearchBarMixin, View):
         new_picture = self.request.FILES.get('avatar', None)
         bio = self.request.POST.get('bio', None)
 
+        previous = None
         if new_picture:
-            upload_new_picture(self.profile, new_picture)
+            try:
+                validate_avatar(new_picture)
+            except ValidationError as error:
+                self.avatar_error = error.messages[0]
+                return self.get(self.request, *args, **kwargs)
+            processed = self.profile.avatar_processed
+            previous = (upload_new_picture(self.profile, new_picture), processed)
 
         if bio is not None:
             self.profile.bio = bio
 
         self.profile.save()
 
+        if new_picture and is_processed_inline(new_picture):
+            try:
+                process_avatar(self.profile)
+            except OSError:
+                # The new picture is dropped and the previous one kept
+                delete_avatar(self.profile.avatar)
+                self.profile.avatar, self.profile.avatar_processed = previous
+                self.profile.save(update_fields=('avatar', 'avatar_processed'))
+                self.avatar_error = 'Your avatar could not be processed.'
+                return self.get(self.request, *args, **kwargs)
+            self.profile.save(update_fields=('avatar', 'avatar_processed'))
+
+        if previous:
+            delete_avatar(previous[0])
+
         return self.get(self.request, *args, **kwargs)
 
     def alter_form(self, instance):
@@ -79,7 +104,8 @@ class UserProfileView(GenericDispatchMixin, EnableSearchBarMixin, View):
         context.update({'username': self.user.username,
                         'profile': self.profile,
                         'instance': UserProfileForm(instance=self.profile),
-                        'concrete': self.is_trusted})
+                        'concrete': self.is_trusted,
+                        'avatar_error': self.avatar_error})
         return context
 
 
@@ -0,0 +1,62 @@
+import hashlib
+from abc import ABC, abstractmethod
+from django.core.exceptions import SuspiciousOperation
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+API_VERSION = 'v1'
+
+
+class ApiMixin:
+    """
+    Base Mixin of the JSON API views. Anonymous requests get 401 and the 400/404 errors
+    raised by the other mixins are returned as JSON instead of the HTML error pages.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.error('Authentication required.', 401)
+
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return self.error('Not found.', 404)
+        except SuspiciousOperation:
+            return self.error('Bad request.', 400)
+
+    @staticmethod
+    def error(message, status):
+        return JsonResponse({'error': message}, status=status)
+
+
+class ConditionalGetMixin(ABC):
+    """
+    Answers GET with 304 Not Modified when the client's If-None-Match matches the current ETag.
+    The ETag is derived from get_version(), which must be cheap (e.g. a change version from the cache),
+    so an unchanged resource is never queried nor serialized. Implement get_version() and get_data().
+    """
+    @abstractmethod
+    def get_version(self):
+        pass
+
+    @abstractmethod
+    def get_data(self):
+        pass
+
+    def get_etag(self):
+        raw = f'{API_VERSION}:{self.request.user.id}:{self.get_version()}:{self.request.get_full_path()}'
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(self.get_data())
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,98 @@
+from utils.http import Http400
+
+
+class InvalidFields(Http400):
+    pass
+
+
+class Serializer:
+    """
+    Turns objects into plain dicts. `fields` maps every public field to the (dotted) attribute it is read from.
+    Clients pick the fields with ?fields=a,b,c, otherwise default_fields (or all of them) are returned.
+    """
+    fields = {}
+    default_fields = None
+
+    def __init__(self, selected=None):
+        if selected:
+            names = tuple(dict.fromkeys(name.strip() for name in selected.split(',') if name.strip()))
+        else:
+            names = self.default_fields or tuple(self.fields)
+
+        if not names or not set(names).issubset(self.fields):
+            raise InvalidFields
+        self.names = names
+
+    def load_fields(self):
+        """
+        Returns the model fields (for QuerySet.only()) that the selected fields are read from.
+        """
+        paths = set()
+        for name in self.names:
+            path = self.fields[name].split('.')
+            paths.update('__'.join(path[:depth]) for depth in range(1, len(path) + 1))
+        return paths
+
+    def related(self):
+        return {'__'.join(self.fields[name].split('.')[:-1]) for name in self.names if '.' in self.fields[name]}
+
+    def prepare(self, queryset, *required):
+        """
+        Loads only the columns (and relations) the selected fields need, plus the required ones (e.g. ordering keys).
+        """
+        related = self.related()
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*self.load_fields(), *required)
+
+    def to_dict(self, obj):
+        data = {}
+        for name in self.names:
+            value = obj
+            for attribute in self.fields[name].split('.'):
+                value = getattr(value, attribute)
+            data[name] = value
+        return data
+
+    def many(self, objects):
+        return [self.to_dict(obj) for obj in objects]
+
+
+class TodoSerializer(Serializer):
+    fields = {'id': 'pk',
+              'title': 'title',
+              'slug': 'slug',
+              'memo': 'memo',
+              'important': 'important',
+              'date_created': 'date_created',
+              'date_completed': 'date_completed'}
+
+
+class TeamTodoSerializer(TodoSerializer):
+    fields = {**TodoSerializer.fields, 'team': 'team.slug'}
+
+
+class TeamSummarySerializer(Serializer):
+    """
+    Serializes the CachedTeam tuples of the user's cache record, so listing the teams needs no query.
+    """
+    fields = {'id': 'id',
+              'slug': 'slug',
+              'title': 'title',
+              'owner': 'owner_name'}
+
+
+class TeamSerializer(Serializer):
+    fields = {'id': 'pk',
+              'slug': 'slug',
+              'title': 'title',
+              'owner': 'owner.username',
+              'member_count': 'member_count',
+              'pending_count': 'pending_count',
+              'open_todo_count': 'open_todo_count',
+              'completed_todo_count': 'completed_todo_count'}
+
+
+class MemberSerializer(Serializer):
+    fields = {'id': 'pk',
+              'username': 'user.username'}
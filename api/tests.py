@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from accounts.models import CustomUser
+from teams.models import Team, TeamJunction
+from todolist.models import UserTodo, TeamTodo
+
+
+class TodoApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='api', email='api@example.com', password='x')
+        cls.team = Team.objects.create(title='Api', identifier='apiteam', owner=cls.user)
+        TeamJunction.objects.create(team=cls.team, user=cls.user)
+        cls.todos = [UserTodo.objects.create(title=f'Todo {number}', user=cls.user) for number in range(3)]
+        TeamTodo.objects.create(title='Team todo', team=cls.team)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_anonymous(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api:user_todos')).status_code, 401)
+
+    def test_fields_and_cursor(self):
+        response = self.client.get(reverse('api:user_todos'), {'fields': 'id,title', 'per_page': 2})
+        data = response.json()
+        self.assertEqual(data['results'], [{'id': todo.id, 'title': todo.title} for todo in self.todos[:0:-1]])
+
+        data = self.client.get(reverse('api:user_todos'), {'fields': 'id', 'per_page': 2,
+                                                           'cursor': data['next']}).json()
+        self.assertEqual((data['results'], data['next']), ([{'id': self.todos[0].id}], None))
+
+    def test_bad_requests(self):
+        for params in ({'per_page': 0}, {'status': 'done'}, {'cursor': 'garbage'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('api:user_todos'), params)
+                self.assertEqual((response.status_code, response.json()), (400, {'error': 'Bad request.'}))
+
+    def test_not_modified_without_queries_of_the_resource(self):
+        url = reverse('api:team_todos', kwargs={'team': self.team.slug})
+        etag = self.client.get(url)['ETag']
+
+        # The session, the user and the team access
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        self.assertEqual(self.client.get(url, {'status': 'open'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TodoApiChangesTest(TransactionTestCase):
+    """
+    The change versions are dropped when the transaction commits, which TestCase never does.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='api', email='api@example.com', password='x')
+        self.todo = UserTodo.objects.create(title='Todo', user=self.user)
+        self.client.force_login(self.user)
+
+    def test_change_invalidates_the_etag(self):
+        url = reverse('api:user_todo', kwargs={'todo_pk': self.todo.pk})
+        etag = self.client.get(url)['ETag']
+
+        self.todo.title = 'Renamed'
+        self.todo.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['title'], 'Renamed')
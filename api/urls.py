@@ -0,0 +1,20 @@
+from django.urls import path
+from api.views import *
+
+app_name = 'api'
+
+urlpatterns = [
+    # Todos
+    path('v1/todos/', UserTodoListApi.as_view(), name='user_todos'),
+    path('v1/todos/<int:todo_pk>/', UserTodoDetailApi.as_view(), name='user_todo'),
+
+    # Teams
+    path('v1/teams/', TeamListApi.as_view(), name='teams'),
+    path('v1/teams/<str:team>/', TeamDetailApi.as_view(), name='team'),
+    path('v1/teams/<str:team>/todos/', TeamTodoListApi.as_view(), name='team_todos'),
+    path('v1/teams/<str:team>/todos/<int:todo_pk>/', TeamTodoDetailApi.as_view(), name='team_todo'),
+
+    # Membership
+    path('v1/teams/<str:team>/members/', TeamMemberListApi.as_view(), name='team_members'),
+    path('v1/teams/<str:team>/pending/', TeamPendingListApi.as_view(), name='team_pending'),
+]
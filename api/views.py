@@ -0,0 +1,145 @@
+from abc import abstractmethod
+from django.http import Http404
+from django.views import View
+from api.mixins import ApiMixin, ConditionalGetMixin
+from api.serializers import (TodoSerializer, TeamTodoSerializer, TeamSummarySerializer, TeamSerializer,
+                             MemberSerializer)
+from teams.mixins import TeamMemberRequiredMixin
+from teams.models import TeamJunction, PendingUser
+from todolist.models import UserTodo, TeamTodo
+from todolist.views.home import TodoHomeView
+from utils.caching import get_change_version
+from utils.http import Http400
+from utils.mixins import CursorPaginateObjectMixin
+
+
+class ListApiMixin(ConditionalGetMixin, CursorPaginateObjectMixin):
+    """
+    Cursor paginated list. Query params: fields, cursor, per_page (up to max_per_page) and order_by.
+    """
+    serializer_class = None
+    ORDER_BY = {}
+    default_order = None
+    per_page = 20
+    max_per_page = 100
+
+    @abstractmethod
+    def get_queryset(self):
+        pass
+
+    def get_per_page(self):
+        try:
+            per_page = int(self.request.GET.get('per_page', self.per_page))
+        except ValueError:
+            raise Http400
+
+        if not 0 < per_page <= self.max_per_page:
+            raise Http400
+        return per_page
+
+    def get_data(self):
+        serializer = self.serializer_class(self.request.GET.get('fields'))
+        order = self.ORDER_BY.get(self.request.GET.get('order_by', self.default_order))
+        if not order:
+            raise Http400
+
+        queryset = serializer.prepare(self.get_queryset(), *(field.lstrip('-') for field in order))
+        page = self.cursor_paginate(queryset, self.request.GET.get('cursor'), order, self.get_per_page())
+        return {'results': serializer.many(page),
+                'next': page.next_cursor,
+                'previous': page.previous_cursor}
+
+
+class TodoListMixin:
+    """
+    Filters the todos by ?status=open|completed|all, ordered like the home page.
+    """
+    ORDER_BY = TodoHomeView.ORDER_BY
+    default_order = 'newest'
+    STATUS = {'open': {'date_completed__isnull': True},
+              'completed': {'date_completed__isnull': False},
+              'all': {}}
+
+    def filter_status(self, queryset):
+        status = self.STATUS.get(self.request.GET.get('status', 'all'))
+        if status is None:
+            raise Http400
+        return queryset.filter(**status)
+
+
+class UserTodoListApi(ApiMixin, TodoListMixin, ListApiMixin, View):
+    serializer_class = TodoSerializer
+
+    def get_version(self):
+        return get_change_version('user', self.request.user.id)
+
+    def get_queryset(self):
+        return self.filter_status(UserTodo.objects.filter(user=self.request.user))
+
+
+class UserTodoDetailApi(ApiMixin, ConditionalGetMixin, View):
+    def get_version(self):
+        return get_change_version('user', self.request.user.id)
+
+    def get_data(self):
+        serializer = TodoSerializer(self.request.GET.get('fields'))
+        todo = serializer.prepare(UserTodo.objects.filter(pk=self.kwargs['todo_pk'], user=self.request.user)).first()
+        if not todo:
+            raise Http404
+        return serializer.to_dict(todo)
+
+
+class TeamListApi(ApiMixin, ConditionalGetMixin, View):
+    """
+    The teams of the user, read from the user's cache record.
+    """
+    def get_version(self):
+        return self.request.user_cache.version
+
+    def get_data(self):
+        serializer = TeamSummarySerializer(self.request.GET.get('fields'))
+        return {'results': serializer.many(self.request.user_cache.teams)}
+
+
+class TeamVersionMixin:
+    def get_version(self):
+        return get_change_version('team', self.team.pk)
+
+
+class TeamDetailApi(ApiMixin, TeamMemberRequiredMixin, TeamVersionMixin, ConditionalGetMixin, View):
+    def get_data(self):
+        data = TeamSerializer(self.request.GET.get('fields')).to_dict(self.team)
+        data['is_owner'] = self.is_trusted
+        return data
+
+
+class TeamTodoListApi(ApiMixin, TeamMemberRequiredMixin, TeamVersionMixin, TodoListMixin, ListApiMixin, View):
+    serializer_class = TeamTodoSerializer
+
+    def get_queryset(self):
+        return self.filter_status(TeamTodo.objects.filter(team=self.team))
+
+
+class TeamTodoDetailApi(ApiMixin, TeamMemberRequiredMixin, TeamVersionMixin, ConditionalGetMixin, View):
+    def get_data(self):
+        # The todo and its team are already loaded by the TeamAccess query
+        todo = self.team_access.todo
+        if not todo:
+            raise Http404
+        return TeamTodoSerializer(self.request.GET.get('fields')).to_dict(todo)
+
+
+class TeamMemberListApi(ApiMixin, TeamMemberRequiredMixin, TeamVersionMixin, ListApiMixin, View):
+    serializer_class = MemberSerializer
+    ORDER_BY = {'joined': ('id',)}
+    default_order = 'joined'
+
+    def get_queryset(self):
+        return TeamJunction.objects.filter(team=self.team)
+
+
+class TeamPendingListApi(TeamMemberListApi):
+    admin_only = True
+
+    def get_queryset(self):
+        return PendingUser.objects.filter(team=self.team)
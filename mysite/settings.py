@@ -9,7 +9,7 @@ https://docs.djangoproject.com/en/3.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
-from decouple import config
+from decouple import Csv, config
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,9 +41,13 @@ INSTALLED_APPS = [
     'accounts',
     'teams',
     'todolist',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'utils.staticfiles.StaticFilesMiddleware',
+    'utils.instrumentation.InstrumentationMiddleware',
+    'utils.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,12 +60,24 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'mysite.urls'
 
+# Production template profile: the cached loader keeps every compiled template for the life of the worker.
+# Django only does this implicitly when DEBUG is off, TEMPLATE_CACHE makes it explicit (templates are no longer
+# reloaded when they change, so leave it off while editing them).
+TEMPLATE_CACHE = config('TEMPLATE_CACHE', default=not DEBUG, cast=bool)
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Compile every template and prime the URL resolver when a worker starts (mysite/wsgi.py, utils.warmup)
+TEMPLATE_WARM_UP = config('TEMPLATE_WARM_UP', default=TEMPLATE_CACHE, cast=bool)
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'utils.instrumentation.InstrumentedTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)] if TEMPLATE_CACHE
+            else TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -89,12 +105,70 @@ DATABASES = {
     }
 }
 
+# Read replicas of the primary (utils.replicas). GET requests read from a replica that is at most REPLICA_MAX_LAG
+# seconds behind, everything else (and every user for REPLICA_PIN_SECONDS after they wrote) uses the primary.
+# Any database can stand in for a replica locally, e.g. a copy of a SQLite database added to DATABASES by hand
+DATABASE_REPLICAS = []
+# A separate copy of the primary, only used by the test suite to stand in for a replica (utils.tests). Nothing is
+# routed to it unless it is listed in DATABASE_REPLICAS
+DATABASES['local_replica'] = {**DATABASES['default'], 'TEST': {'NAME': f'test_{DATABASES["default"]["NAME"]}_replica'}}
+for number, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['utils.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=REPLICA_PIN_SECONDS, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = 5
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Shared by every worker process, so `python manage.py requeststats` can read the aggregated stats
+    'instrumentation': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.instrumentation',
+    },
 }
 
+# Rendered todo cards and home page panels (todolist.fragments). Their keys change with the data, so the timeout
+# only bounds how long stale entries stay around
+FRAGMENT_CACHE_TIMEOUT = 3600
+
+# Identifies the deployed code (e.g. the commit hash). The home and team page ETags depend on it
+# (utils.mixins.ConditionalPageMixin), so browsers do not keep pages rendered by the previous release
+RELEASE = config('RELEASE', default='')
+
+# Flashed messages (utils.flash) are kept in a signed cookie, so producing or showing one never writes the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Per-request instrumentation (utils.instrumentation.InstrumentationMiddleware). The file-based cache can lose a few
+# counts when workers flush at the same moment, point it to a memcached cache for exact totals
+INSTRUMENTATION_CACHE = 'instrumentation'
+INSTRUMENTATION_FLUSH_INTERVAL = 10
+
+# Maximum number of queries per URL name. Exceeding it is logged, or raised with QUERY_BUDGET_RAISE (e.g. on CI)
+QUERY_BUDGETS = {
+    'home': 8,
+    'todo:completed_todos': 8,
+    'teams:team_home': 6,
+    'teams:manage_team': 10,
+    # Imports insert in batches, so their query count grows with the file
+    'todo:user_import_todos': None,
+    'teams:team_import_todos': None,
+    # Bulk actions run a fixed number of queries, whatever the number of todos
+    'todo:user_bulk_todos': 10,
+    'teams:team_bulk_todos': 12,
+}
+DEFAULT_QUERY_BUDGET = 20
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+
+# Serve the async variants of the home, completed and team home views (mysite/asgi.py turns it on). Their independent
+# queries run concurrently on ASYNC_DB_WORKERS threads, each with its own database connection
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+ASYNC_DB_WORKERS = config('ASYNC_DB_WORKERS', default=8, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -137,20 +211,44 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static'
 ]
 
+# Static pipeline (utils.staticfiles): `python manage.py buildstatic` collects the files with minified CSS,
+# content-hashed names and pre-compressed .gz/.br sidecars, and StaticFilesMiddleware serves them. Hashed files are
+# cached forever, so run buildstatic on every deploy. Like TEMPLATE_CACHE, it is on when DEBUG is off
+STATIC_PIPELINE = config('STATIC_PIPELINE', default=not DEBUG, cast=bool)
+if STATIC_PIPELINE:
+    STATICFILES_STORAGE = 'utils.staticfiles.PipelineStaticFilesStorage'
+# Cache lifetime (seconds) of the static files without a hashed name
+STATIC_MAX_AGE = 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Bigger avatars are processed by `python manage.py processavatars` instead of the request
+AVATAR_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+AVATAR_INLINE_MAX_SIZE = 1024 * 1024
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Team identifiers must be between 6 and 20 characters long (checked by teams.common.identifier_settings)
+TEAM_IDENTIFIER_LENGTH = 15
+TEAM_IDENTIFIER_ALPHABET = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.office365.com'
-EMAIL_USE_TLS = True
+EMAIL_HOST = config('EMAIL_HOST', default='smtp.office365.com')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_USE_SSL = False
-EMAIL_PORT = 587
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_TIMEOUT = 30
 EMAIL_HOST_USER = config('EMAIL_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Emails are queued in the outbox and delivered by `python manage.py sendoutbox`
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Seconds a worker has to send the batch it claimed, before other workers may claim its unsent emails
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 600
+
 if DEBUG is False:
     SECURE_SSL_REDIRECT = True
     CSRF_COOKIE_SECURE = True
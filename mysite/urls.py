@@ -18,7 +18,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from mysite.settings import DEBUG
-from todolist.views.home import TodoHomeView
+from todolist.views.home import TodoHomeView, AsyncTodoHomeView
 from decouple import config
 
 urlpatterns = [
@@ -34,8 +34,11 @@ urlpatterns = [
     # Todos
     path('todo/', include('todolist.urls', namespace='todo')),
 
+    # JSON API
+    path('api/', include('api.urls', namespace='api')),
+
     # Home
-    path('', TodoHomeView.as_view(), name='home'),
+    path('', (AsyncTodoHomeView if settings.ASYNC_VIEWS else TodoHomeView).as_view(), name='home'),
 ]
 
 if DEBUG is True:
@@ -1,6 +1,47 @@
-from django.contrib.auth.hashers import make_password
+import string
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.utils.crypto import get_random_string
 
+# What Team.identifier (max_length) and TeamIdentifierForm accept
+IDENTIFIER_MIN_LENGTH = 6
+IDENTIFIER_MAX_LENGTH = 20
+IDENTIFIER_ATTEMPTS = 5
 
-def generate_identifier(to_hash):
-    hashed_identifier = make_password(to_hash)[-20:-5]
-    return hashed_identifier
+
+def identifier_settings():
+    """
+    Returns the (length, alphabet) of new team identifiers, read from the TEAM_IDENTIFIER_LENGTH and
+    TEAM_IDENTIFIER_ALPHABET settings on every call.
+    """
+    length = getattr(settings, 'TEAM_IDENTIFIER_LENGTH', 15)
+    alphabet = getattr(settings, 'TEAM_IDENTIFIER_ALPHABET', string.ascii_letters + string.digits)
+    if not IDENTIFIER_MIN_LENGTH <= length <= IDENTIFIER_MAX_LENGTH:
+        raise ImproperlyConfigured(f'TEAM_IDENTIFIER_LENGTH must be between {IDENTIFIER_MIN_LENGTH} and '
+                                   f'{IDENTIFIER_MAX_LENGTH}, not {length}.')
+    return length, alphabet
+
+
+def generate_identifier():
+    """
+    Returns a random team identifier from the OS CSPRNG (secrets).
+    """
+    return get_random_string(*identifier_settings())
+
+
+def save_with_identifier(team, attempts=IDENTIFIER_ATTEMPTS):
+    """
+    Saves a new team with a fresh identifier. If the identifier is already taken, a new one is generated
+    and the insert is retried. Any other IntegrityError (e.g. duplicated slug) is raised right away.
+    """
+    for attempt in range(1, attempts + 1):
+        team.identifier = generate_identifier()
+        try:
+            with transaction.atomic():
+                team.save()
+            return team
+        except IntegrityError:
+            identifier_taken = type(team).objects.filter(identifier=team.identifier).exists()
+            if not identifier_taken or attempt == attempts:
+                raise
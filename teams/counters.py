@@ -0,0 +1,67 @@
+import threading
+from contextlib import contextmanager
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+COUNTERS = ('member_count', 'pending_count', 'open_todo_count', 'completed_todo_count')
+
+_deleting = threading.local()
+
+
+def deleting_teams():
+    if not hasattr(_deleting, 'team_ids'):
+        _deleting.team_ids = set()
+    return _deleting.team_ids
+
+
+@contextmanager
+def deleting(team_ids):
+    """
+    Marks the teams as being deleted for the duration of the block, so the cascading deletes of their members
+    and todos do not issue one counter UPDATE per row. The teams are unmarked even when the delete fails.
+    """
+    marked = deleting_teams()
+    team_ids = set(team_ids) - marked
+    marked.update(team_ids)
+    try:
+        yield
+    finally:
+        marked.difference_update(team_ids)
+
+
+def change_counter(team_model, team_id, counter, delta, using='default'):
+    """
+    Atomically moves one of the team's counters with an UPDATE ... SET counter = counter + delta.
+    Teams that are being deleted are skipped. A drifted counter stops at 0 instead of failing the write;
+    the reconcileteamcounters command repairs it.
+    """
+    if team_id is None or team_id in deleting_teams():
+        return
+    team_model.objects.using(using).filter(pk=team_id).update(**{counter: Greatest(F(counter) + delta, Value(0))})
+
+
+def count_subquery(queryset):
+    counted = queryset.filter(team=OuterRef('pk')).order_by().values('team').annotate(total=Count('pk'))
+    return Coalesce(Subquery(counted.values('total')), Value(0))
+
+
+def actual_counters(junction_model, pending_model, todo_model):
+    """
+    Returns the expressions that count the real values of every counter, to be used in annotate() or update().
+    """
+    return {
+        'member_count': count_subquery(junction_model.objects.all()),
+        'pending_count': count_subquery(pending_model.objects.all()),
+        'open_todo_count': count_subquery(todo_model.objects.filter(date_completed__isnull=True)),
+        'completed_todo_count': count_subquery(todo_model.objects.filter(date_completed__isnull=False)),
+    }
+
+
+def drifted_teams(queryset, junction_model, pending_model, todo_model):
+    """
+    Annotates the real counts as actual_<counter> and keeps only the teams with at least one wrong counter.
+    """
+    actual = {f'actual_{counter}': expression
+              for counter, expression in actual_counters(junction_model, pending_model, todo_model).items()}
+    in_sync = Q(**{counter: F(f'actual_{counter}') for counter in COUNTERS})
+    return queryset.annotate(**actual).exclude(in_sync)
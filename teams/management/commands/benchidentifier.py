@@ -0,0 +1,34 @@
+import timeit
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from teams.common import generate_identifier
+
+
+def legacy_identifier(to_hash):
+    # The previous implementation: a full password hash, sliced.
+    return make_password(to_hash)[-20:-5]
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of the team identifier generator against the previous password-hash based one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Number of identifiers generated by each implementation.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        candidates = {
+            'make_password': lambda: legacy_identifier('Team title'),
+            'generate_identifier': generate_identifier,
+        }
+
+        results = {}
+        for name, function in candidates.items():
+            seconds = timeit.timeit(function, number=iterations)
+            results[name] = seconds / iterations
+            self.stdout.write(f'{name}: {results[name] * 1e6:.1f} µs per identifier '
+                              f'({iterations / seconds:.0f} identifiers/s)')
+
+        speedup = results['make_password'] / results['generate_identifier']
+        self.stdout.write(f'generate_identifier is {speedup:.0f}x faster.')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from teams.counters import COUNTERS, drifted_teams
+from teams.models import Team, TeamJunction, PendingUser
+from todolist.models import TeamTodo
+
+
+class Command(BaseCommand):
+    help = 'Recounts the members, pending requests and todos of every team and repairs the counters that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of teams checked per query.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report the teams with wrong counters.')
+
+    def handle(self, *args, **options):
+        checked = repaired = last_id = 0
+
+        while True:
+            batch = Team.objects.filter(pk__gt=last_id).order_by('pk')[:options['batch_size']]
+            ids = list(batch.values_list('pk', flat=True))
+            if not ids:
+                break
+
+            drifted = list(drifted_teams(Team.objects.filter(pk__in=ids), TeamJunction, PendingUser, TeamTodo))
+            for team in drifted:
+                changes = ', '.join(f'{counter} {getattr(team, counter)} -> {getattr(team, f"actual_{counter}")}'
+                                    for counter in COUNTERS
+                                    if getattr(team, counter) != getattr(team, f'actual_{counter}'))
+                self.stdout.write(f'{team}: {changes}')
+
+                for counter in COUNTERS:
+                    setattr(team, counter, getattr(team, f'actual_{counter}'))
+
+            if drifted and not options['dry_run']:
+                Team.objects.bulk_update(drifted, COUNTERS)
+
+            checked, repaired, last_id = checked + len(ids), repaired + len(drifted), ids[-1]
+
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'Checked {checked} teams. {action} {repaired} with drifted counters.')
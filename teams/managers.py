@@ -1,5 +1,6 @@
-from django.db.models import Manager
+from django.db.models import Manager, QuerySet
 from django.core.exceptions import ObjectDoesNotExist
+from teams.counters import deleting
 
 
 class TeamManager(Manager):
@@ -8,3 +9,10 @@ class TeamManager(Manager):
             return self.get(**kwargs)
         except ObjectDoesNotExist:
             return None
+
+
+class TeamQuerySet(QuerySet):
+    def delete(self):
+        # The ids are read first, the cascade must not move the counters of the teams it deletes
+        with deleting(self.values_list('pk', flat=True)):
+            return super().delete()
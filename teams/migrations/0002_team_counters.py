@@ -0,0 +1,45 @@
+# Generated by Django 3.1.9 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+from teams.counters import actual_counters
+
+
+def populate_counters(apps, schema_editor):
+    Team = apps.get_model('teams', 'Team')
+    counters = actual_counters(apps.get_model('teams', 'TeamJunction'),
+                               apps.get_model('teams', 'PendingUser'),
+                               apps.get_model('todolist', 'TeamTodo'))
+    Team.objects.using(schema_editor.connection.alias).update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0001_initial'),
+        ('todolist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='completed_todo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='open_todo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.1.9 on 2026-10-18 15:16
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.db.models.deletion
+
+from teams.counters import actual_counters
+
+JUNCTION_MODELS = ('TeamJunction', 'PendingUser')
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keeps the oldest row of every (team, user) pair, then recounts the members and pending users.
+    """
+    using = schema_editor.connection.alias
+    for model_name in JUNCTION_MODELS:
+        model = apps.get_model('teams', model_name)
+        kept = model.objects.using(using).values('team', 'user').annotate(kept=Min('pk')).values('kept')
+        model.objects.using(using).exclude(pk__in=kept).delete()
+
+    Team = apps.get_model('teams', 'Team')
+    counters = actual_counters(apps.get_model('teams', 'TeamJunction'),
+                               apps.get_model('teams', 'PendingUser'),
+                               apps.get_model('todolist', 'TeamTodo'))
+    Team.objects.using(using).update(member_count=counters['member_count'], pending_count=counters['pending_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_team_counters'),
+        ('todolist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pendinguser',
+            constraint=models.UniqueConstraint(fields=('team', 'user'), name='pendinguser_unique_team_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='teamjunction',
+            constraint=models.UniqueConstraint(fields=('team', 'user'), name='teamjunction_unique_team_user'),
+        ),
+        # The unique (team, user) index starts with team, so the single column index is redundant
+        migrations.AlterField(
+            model_name='pendinguser',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='teams.team'),
+        ),
+        migrations.AlterField(
+            model_name='teamjunction',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='teams.team'),
+        ),
+    ]
@@ -1,8 +1,22 @@
-from teams.models import Team, TeamJunction, PendingUser
 from django.http import Http404
+from django.utils.functional import cached_property
+from teams.resolvers import resolve_team_access
 
 
-class InitializeTeamMixin:
+class TeamAccessMixin:
+    """
+    Resolves the team, membership, ownership and todo of the request once, with a single query.
+    Every team and todo mixin of the view reads the same TeamAccess (or None, if the team or todo does not exist).
+    """
+
+    @cached_property
+    def team_access(self):
+        return resolve_team_access(self.request.user, self.kwargs['team'],
+                                   username=self.kwargs.get('user', None),
+                                   todo_pk=self.kwargs.get('todo_pk', None))
+
+
+class InitializeTeamMixin(TeamAccessMixin):
     admin_only = False
 
     def __init__(self):
@@ -11,17 +25,28 @@ class InitializeTeamMixin:
         self.is_trusted = False
 
     def dispatch(self, request, *args, **kwargs):
-        self.team = Team.objects.get_or_none(slug=self.kwargs['team'])
-        if not self.team:
+        if not self.team_access:
             raise Http404
 
-        self.is_trusted = self.team.owner == self.request.user
+        self.team = self.team_access.team
+        self.is_trusted = self.team_access.is_owner
 
         if self.admin_only and not self.is_trusted:
             raise Http404
         return super().dispatch(request, *args, **kwargs)
 
 
+class TeamMemberRequiredMixin(InitializeTeamMixin):
+    """
+    Only the members of the team can access the view. Add admin_only = True to restrict it to the owner.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.team_access or not self.team_access.membership:
+            raise Http404
+        return super().dispatch(request, *args, **kwargs)
+
+
 class InitializeUserMixin:
     """
     This Mixin requires InitializeTeamMixin to work.
@@ -37,11 +62,10 @@ class InitializeUserMixin:
         self.user = None
 
     def dispatch(self, request, *args, **kwargs):
-        username = self.kwargs.get('user', None) or self.request.user.username
-        self.user = TeamJunction.objects.get_or_none(team=self.team, user__username=username)
+        self.user = self.team_access.membership
 
         if self.pending:
-            self.user = self.user or PendingUser.objects.get_or_none(team=self.team, user__username=username)
+            self.user = self.user or self.team_access.pending
 
         if not self.user:
             raise Http404
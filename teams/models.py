@@ -1,7 +1,8 @@
 from django.db import models
 from django.utils.text import slugify
 from accounts.models import CustomUser
-from teams.managers import TeamManager
+from teams.counters import COUNTERS, deleting
+from teams.managers import TeamManager, TeamQuerySet
 
 # TODO: TRY TO DO IT WITH MANYTOMANY RELATIONSHIP
 class Team(models.Model):
@@ -10,18 +11,33 @@ class Team(models.Model):
     identifier = models.CharField(db_index=True, unique=True, max_length=20)
     owner = models.ForeignKey(db_index=True, to=CustomUser, on_delete=models.CASCADE)
 
+    # Denormalized counters, kept in sync by teams.signals and repaired by the reconcileteamcounters command
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    open_todo_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_todo_count = models.PositiveIntegerField(default=0, editable=False)
+
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title, allow_unicode=True)
+        # The counters only move with F() updates (teams.counters). Writing back the loaded values would undo
+        # the updates made since the team was loaded
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in COUNTERS]
         return super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        with deleting([self.pk]):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
-    objects = TeamManager()
+    objects = TeamManager.from_queryset(TeamQuerySet)()
 
 
 class BaseJunctionTable(models.Model):
-    team = models.ForeignKey(db_index=True, to=Team, on_delete=models.CASCADE)
+    team = models.ForeignKey(db_index=False, to=Team, on_delete=models.CASCADE)
     user = models.ForeignKey(db_index=True, to=CustomUser, on_delete=models.CASCADE)
 
     objects = TeamManager()
@@ -31,6 +47,10 @@ class BaseJunctionTable(models.Model):
 
     class Meta:
         abstract = True
+        # Also serves the lookups by team, so team does not need an index of its own
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'user'], name='%(class)s_unique_team_user'),
+        ]
 
 
 class TeamJunction(BaseJunctionTable):
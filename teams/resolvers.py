@@ -0,0 +1,69 @@
+from django.db.models import OuterRef, Subquery
+from accounts.models import CustomUser
+from teams.models import Team, TeamJunction, PendingUser
+from todolist.models import TeamTodo
+
+
+class TeamAccess:
+    """
+    Everything the team and team todo views need to authorize a request: the team (with its owner),
+    whether the request user owns it, the membership or pending request of the looked up user and the todo.
+    """
+
+    def __init__(self, team, is_owner, membership=None, pending=None, todo=None):
+        self.team = team
+        self.is_owner = is_owner
+        self.membership = membership
+        self.pending = pending
+        self.todo = todo
+
+
+def junction_subqueries(prefix, model, team_ref, username):
+    junction = model.objects.filter(team=OuterRef(team_ref), user__username=username)
+    return {f'{prefix}_id': Subquery(junction.values('pk')[:1]),
+            f'{prefix}_user_id': Subquery(junction.values('user_id')[:1])}
+
+
+def build_junction(model, db, junction_id, team, user_id, username):
+    """
+    Builds the junction row from the annotated values, with its team and (deferred) user already cached,
+    so neither of them is lazily loaded later.
+    """
+    if junction_id is None:
+        return None
+
+    junction = model.from_db(db, ('id', 'team_id', 'user_id'), (junction_id, team.pk, user_id))
+    junction.team = team
+    junction.user = CustomUser.from_db(db, ('id', 'username'), (user_id, username))
+    return junction
+
+
+def resolve_team_access(user, team_slug, username=None, todo_pk=None):
+    """
+    Loads the team, its owner, the membership and pending request of `username` (the request user by default)
+    and optionally the team todo, all in a single query. Returns None if the team (or the todo) does not exist.
+    """
+    username = username or user.username
+
+    if todo_pk is None:
+        queryset = Team.objects.select_related('owner').filter(slug=team_slug)
+        team_ref = 'pk'
+    else:
+        queryset = TeamTodo.objects.select_related('team__owner').filter(pk=todo_pk, team__slug=team_slug)
+        team_ref = 'team_id'
+
+    queryset = queryset.annotate(**junction_subqueries('membership', TeamJunction, team_ref, username),
+                                 **junction_subqueries('pending', PendingUser, team_ref, username))
+
+    row = queryset.first()
+    if row is None:
+        return None
+
+    todo, team = (None, row) if todo_pk is None else (row, row.team)
+    return TeamAccess(
+        team=team,
+        is_owner=team.owner_id == user.id,
+        membership=build_junction(TeamJunction, queryset.db, row.membership_id, team, row.membership_user_id, username),
+        pending=build_junction(PendingUser, queryset.db, row.pending_id, team, row.pending_user_id, username),
+        todo=todo,
+    )
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from teams.counters import change_counter
+from teams.models import Team, TeamJunction, PendingUser
+from utils.caching import invalidate_changes
+
+JUNCTION_COUNTERS = {TeamJunction: 'member_count', PendingUser: 'pending_count'}
+
+
+@receiver(post_save, sender=TeamJunction)
+@receiver(post_save, sender=PendingUser)
+def increment_junction_counter(sender, instance, created, using, **kwargs):
+    if created:
+        change_counter(Team, instance.team_id, JUNCTION_COUNTERS[sender], 1, using)
+
+
+@receiver(post_delete, sender=TeamJunction)
+@receiver(post_delete, sender=PendingUser)
+def decrement_junction_counter(sender, instance, using, **kwargs):
+    change_counter(Team, instance.team_id, JUNCTION_COUNTERS[sender], -1, using)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidate_team_changes(sender, instance, using, **kwargs):
+    invalidate_changes('team', [instance.pk], using=using)
+
+
+@receiver(post_save, sender=TeamJunction)
+@receiver(post_delete, sender=TeamJunction)
+@receiver(post_save, sender=PendingUser)
+@receiver(post_delete, sender=PendingUser)
+def invalidate_membership_changes(sender, instance, using, **kwargs):
+    invalidate_changes('team', [instance.team_id], using=using)
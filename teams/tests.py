@@ -1,3 +1,163 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from accounts.models import CustomUser
+from teams.common import generate_identifier
+from teams.counters import change_counter, deleting_teams
+from teams.models import Team, TeamJunction, PendingUser
+from teams.resolvers import resolve_team_access
+from teams.views import ChangeTeamIdentifier, ChangeTeamName
+from todolist.models import TeamTodo
 
-# Create your tests here.
+
+class GenerateIdentifierTest(SimpleTestCase):
+    def test_default_length(self):
+        self.assertEqual(len(generate_identifier()), 15)
+
+    @override_settings(TEAM_IDENTIFIER_LENGTH=8, TEAM_IDENTIFIER_ALPHABET='ab')
+    def test_settings_are_read_on_every_call(self):
+        identifier = generate_identifier()
+        self.assertEqual(len(identifier), 8)
+        self.assertLessEqual(set(identifier), {'a', 'b'})
+
+    def test_length_out_of_bounds(self):
+        for length in (5, 21):
+            with self.subTest(length=length), override_settings(TEAM_IDENTIFIER_LENGTH=length):
+                with self.assertRaises(ImproperlyConfigured):
+                    generate_identifier()
+
+
+class TeamCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='x')
+        cls.team = Team.objects.create(title='Counted', identifier='counted', owner=cls.owner)
+        TeamJunction.objects.create(team=cls.team, user=cls.owner)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def test_signals_move_the_counters(self):
+        member = CustomUser.objects.create_user(username='member', email='member@example.com', password='x')
+        PendingUser.objects.create(team=self.team, user=member)
+        TeamJunction.objects.create(team=self.team, user=member)
+        todo = TeamTodo.objects.create(title='Todo', team=self.team)
+        TeamTodo.objects.create(title='Other', team=self.team)
+        todo.delete()
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual((team.member_count, team.pending_count, team.open_todo_count), (2, 1, 1))
+
+    def test_reconcile_repairs_drifted_counters(self):
+        TeamTodo.objects.create(title='Todo', team=self.team)
+        Team.objects.filter(pk=self.team.pk).update(member_count=7, open_todo_count=0)
+
+        out = StringIO()
+        call_command('reconcileteamcounters', '--dry-run', stdout=out)
+        self.assertIn('member_count 7 -> 1, open_todo_count 0 -> 1', out.getvalue())
+        self.assertEqual(Team.objects.get(pk=self.team.pk).member_count, 7)
+
+        call_command('reconcileteamcounters', stdout=StringIO())
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual((team.member_count, team.open_todo_count), (1, 1))
+
+    def test_drifted_counter_stops_at_zero(self):
+        change_counter(Team, self.team.pk, 'open_todo_count', -1)
+        self.assertEqual(Team.objects.get(pk=self.team.pk).open_todo_count, 0)
+
+    def test_deleted_team_does_not_move_its_counters(self):
+        other = Team.objects.create(title='Other', identifier='other', owner=self.owner)
+        for team in (self.team, other):
+            TeamTodo.objects.create(title='Todo', team=team)
+        deletes = {'instance': Team.objects.get(pk=self.team.pk).delete,
+                   'queryset': Team.objects.filter(pk=other.pk).delete}
+        for case, delete in deletes.items():
+            with self.subTest(case), CaptureQueriesContext(connection) as queries:
+                delete()
+            self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "teams_team"')])
+        self.assertEqual(deleting_teams(), set())
+
+    def test_failed_delete_unmarks_the_team(self):
+        with mock.patch('django.db.models.deletion.Collector.delete', side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            Team.objects.get(pk=self.team.pk).delete()
+
+        self.assertEqual(deleting_teams(), set())
+        TeamTodo.objects.create(title='Todo', team=self.team)
+        self.assertEqual(Team.objects.get(pk=self.team.pk).open_todo_count, 1)
+
+    def bump_before(self, view):
+        """
+        Moves a counter after the view loaded the team, like a concurrent request would.
+        """
+        form_valid = view.form_valid
+
+        def bumped(view, form):
+            change_counter(Team, view.team.pk, 'open_todo_count', 1)
+            return form_valid(view, form)
+        return mock.patch.object(view, 'form_valid', bumped)
+
+    def test_save_keeps_concurrent_counter_changes(self):
+        team = Team.objects.get(pk=self.team.pk)
+        change_counter(Team, team.pk, 'open_todo_count', 1)
+        team.title = 'Renamed'
+        team.save()
+
+        team.refresh_from_db()
+        self.assertEqual((team.slug, team.open_todo_count, team.member_count), ('renamed', 1, 1))
+
+    def test_rename_keeps_concurrent_counter_changes(self):
+        with self.bump_before(ChangeTeamName):
+            self.client.post(reverse('teams:change_name', kwargs={'team': self.team.slug}), {'title': 'Renamed'})
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual((team.title, team.open_todo_count), ('Renamed', 1))
+
+    def test_identifier_change_keeps_concurrent_counter_changes(self):
+        with self.bump_before(ChangeTeamIdentifier):
+            self.client.post(reverse('teams:change_identifier', kwargs={'team': self.team.slug}),
+                             {'identifier': 'changed'})
+
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual((team.identifier, team.open_todo_count), ('changed', 1))
+
+
+class ResolveTeamAccessTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='x')
+        cls.pending = CustomUser.objects.create_user(username='pending', email='pending@example.com', password='x')
+        cls.team = Team.objects.create(title='Resolved', identifier='resolved', owner=cls.owner)
+        cls.other_team = Team.objects.create(title='Other', identifier='othertm', owner=cls.pending)
+        TeamJunction.objects.create(team=cls.team, user=cls.owner)
+        PendingUser.objects.create(team=cls.team, user=cls.pending)
+        cls.todo = TeamTodo.objects.create(title='Todo', team=cls.team)
+
+    def test_resolves_everything_in_one_query(self):
+        with self.assertNumQueries(1):
+            access = resolve_team_access(self.owner, self.team.slug, todo_pk=self.todo.pk)
+            self.assertEqual((access.team, access.todo), (self.team, self.todo))
+            self.assertEqual(access.team.owner.username, 'owner')
+            self.assertTrue(access.is_owner)
+            self.assertEqual(access.membership.user.username, 'owner')
+            self.assertEqual(access.membership.team, self.team)
+            self.assertIsNone(access.pending)
+
+    def test_looked_up_user(self):
+        access = resolve_team_access(self.owner, self.team.slug, username='pending')
+        self.assertIsNone(access.membership)
+        self.assertEqual(access.pending.user_id, self.pending.id)
+
+        access = resolve_team_access(self.pending, self.team.slug)
+        self.assertFalse(access.is_owner)
+
+    def test_missing_team_or_todo(self):
+        self.assertIsNone(resolve_team_access(self.owner, 'missing'))
+        self.assertIsNone(resolve_team_access(self.owner, self.team.slug, todo_pk=self.todo.pk + 1))
+        # The todo must belong to the team of the URL
+        self.assertIsNone(resolve_team_access(self.owner, self.other_team.slug, todo_pk=self.todo.pk))
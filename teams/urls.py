@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth.decorators import login_required
 from teams.views import *
@@ -5,7 +6,8 @@ from teams.views import *
 app_name = 'teams'
 
 urlpatterns = [
-    path('', login_required(TeamHomeView.as_view()), name='team_home'),
+    path('', AsyncTeamHomeView.as_view() if settings.ASYNC_VIEWS else login_required(TeamHomeView.as_view()),
+         name='team_home'),
 
     path('create/', login_required(CreateTeam.as_view()), name='create_team'),
     path('join/', login_required(JoinTeam.as_view()), name='join_team'),
@@ -1,20 +1,23 @@
+import asyncio
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.views import View
-from django.core.cache import cache
 from teams.base import FullInitializer
-from teams.common import generate_identifier
+from teams.common import save_with_identifier
 from teams.forms import TeamForm, TeamIdentifierForm
 from teams.models import Team, TeamJunction, PendingUser
 from django.views.generic.base import ContextMixin
-from utils.mixins import GenericDispatchMixin, PaginateObjectMixin, EnableSearchBarMixin
+from utils.async_db import run_db
+from utils.flash import flash_message, pop_flashed
+from utils.mixins import AsyncViewMixin, ConditionalPageMixin, GenericDispatchMixin, PaginateObjectMixin, \
+    EnableSearchBarMixin
 from utils.http import Http400
 from utils.base import BaseRedirectFormView
 from teams.mixins import InitializeTeamMixin
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 
-class TeamHomeView(PaginateObjectMixin, ContextMixin, GenericDispatchMixin, View):
+class TeamHomeView(ConditionalPageMixin, PaginateObjectMixin, ContextMixin, GenericDispatchMixin, View):
     per_page = 3
 
     def __init__(self, *args, **kwargs):
@@ -25,12 +28,21 @@ class TeamHomeView(PaginateObjectMixin, ContextMixin, GenericDispatchMixin, View
         self.ownership_teams = None
 
     def dispatch(self, request, *args, **kwargs):
-        self.errors = self.request.session.pop('errors', None)
-        self.message = self.request.session.pop('message', None)
+        self.message, self.errors = pop_flashed(self.request)
+        if not (self.message or self.errors) and (response := self.not_modified()):
+            return response
 
-        # First, query the database
-        self.all_teams = cache.get(self.request.user)['user_teams']
-        self.ownership_teams = self.all_teams.filter(owner=self.request.user)
+        self.paginate_teams()
+        return self.add_validators(super().dispatch(request, *args, **kwargs))
+
+    def get_versions(self):
+        # Everything but the forms comes from the user's cache record
+        return [self.request.user_cache.version]
+
+    def paginate_teams(self):
+        # First, read the teams from the user's cache record
+        self.all_teams = self.request.user_cache.teams
+        self.ownership_teams = self.request.user_cache.owned_teams(self.request.user.id)
 
         # Second, get query params for page
         all_teams_page = self.request.GET.get('at_page', 1)
@@ -40,8 +52,6 @@ class TeamHomeView(PaginateObjectMixin, ContextMixin, GenericDispatchMixin, View
         self.all_teams = self.paginate(self.all_teams, all_teams_page)
         self.ownership_teams = self.paginate(self.ownership_teams, ownership_teams_page)
 
-        return super().dispatch(request, *args, **kwargs)
-
     def get(self, request, *args, **kwargs):
         context = self.get_context_data()
         return render(self.request, 'teams/home/team_home.html', context)
@@ -57,6 +67,28 @@ class TeamHomeView(PaginateObjectMixin, ContextMixin, GenericDispatchMixin, View
         return context
 
 
+class AsyncTeamHomeView(AsyncViewMixin, TeamHomeView):
+    """
+    The team home page for ASGI. The flashed messages and the user's cache record (with the version of the page)
+    are loaded concurrently on the database executor, then the page is rendered like TeamHomeView.
+    """
+    login_required = True
+
+    async def get(self, request, *args, **kwargs):
+        (self.message, self.errors), not_modified = await asyncio.gather(run_db(pop_flashed, request),
+                                                                         run_db(self.not_modified))
+        if not (self.message or self.errors) and not_modified:
+            return not_modified
+        if self.message or self.errors:
+            # Like TeamHomeView, a page with flashed messages is not cached
+            self.validators = None
+        return self.add_validators(await run_db(self.render_teams, request, *args, **kwargs))
+
+    def render_teams(self, request, *args, **kwargs):
+        self.paginate_teams()
+        return TeamHomeView.get(self, request, *args, **kwargs)
+
+
 class ManageTeam(InitializeTeamMixin, PaginateObjectMixin, ContextMixin, View):
     per_page = 5
     orphans = 0
@@ -68,7 +100,7 @@ class ManageTeam(InitializeTeamMixin, PaginateObjectMixin, ContextMixin, View):
     def dispatch(self, request, *args, **kwargs):
         if not self.request.method == 'GET':
             raise Http400
-        self.errors = self.request.session.pop('errors', None)
+        _, self.errors = pop_flashed(self.request)
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
@@ -79,8 +111,9 @@ class ManageTeam(InitializeTeamMixin, PaginateObjectMixin, ContextMixin, View):
         context = super().get_context_data(**kwargs)
 
         joined_users_page = self.request.GET.get('u_page', 1)
-        joined_users = self.paginate(TeamJunction.objects.filter(team=self.team).only('user'),
-                                     joined_users_page)
+        joined_users = self.paginate(TeamJunction.objects.filter(team=self.team).select_related('user')
+                                     .only('user__username').order_by('pk'),
+                                     joined_users_page, count=self.team.member_count)
 
         context.update({'team': self.team,
                         'owner': self.team.owner.username,
@@ -90,8 +123,9 @@ class ManageTeam(InitializeTeamMixin, PaginateObjectMixin, ContextMixin, View):
 
         if self.is_trusted:
             pending_users_page = self.request.GET.get('p_page', 1)
-            pending_users = self.paginate(PendingUser.objects.filter(team=self.team).only('user'),
-                                          pending_users_page)
+            pending_users = self.paginate(PendingUser.objects.filter(team=self.team).select_related('user')
+                                          .only('user__username').order_by('pk'),
+                                          pending_users_page, count=self.team.pending_count)
 
             context.update({'pending_users': pending_users,
                             'identifier_form': TeamIdentifierForm(initial={'identifier': self.team.identifier}),
@@ -106,9 +140,14 @@ class CreateTeam(BaseRedirectFormView):
     def form_valid(self, form):
         form = form.save(commit=False)
         form.owner = self.request.user
-        form.identifier = generate_identifier(form.title)
-        form.save()
-        TeamJunction.objects.create(team=form, user=self.request.user)
+
+        try:
+            with transaction.atomic():
+                save_with_identifier(form)
+                TeamJunction.objects.create(team=form, user=self.request.user)
+        except IntegrityError:
+            return self.form_invalid(['An error occurred. Please try another name!'])
+
         return self.redirect()
 
 
@@ -129,9 +168,14 @@ class JoinTeam(BaseRedirectFormView):
         if self.errors:
             return self.form_invalid(self.errors)
 
-        PendingUser.objects.create(team=team, user=self.request.user)
-        self.request.session['message'] = 'You have successfully applied to join this team! ' \
-                                          'Your request is pending.'
+        try:
+            with transaction.atomic():
+                PendingUser.objects.create(team=team, user=self.request.user)
+        except IntegrityError:
+            # A concurrent request created it first, (team, user) is unique
+            return self.form_invalid(['Your request is pending.'])
+
+        flash_message(self.request, 'You have successfully applied to join this team! Your request is pending.')
         return self.redirect()
 
     def validate_entry(self, team: Team) -> None:
@@ -165,8 +209,13 @@ class AcceptUser(FullInitializer, View):
         return super().dispatch(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        self.user.delete()
-        TeamJunction.objects.create(team=self.team, user=self.user.user)
+        try:
+            with transaction.atomic():
+                self.user.delete()
+                TeamJunction.objects.create(team=self.team, user=self.user.user)
+        except IntegrityError:
+            # Accepted twice at the same time, the user is already a member
+            pass
         return redirect(reverse('teams:manage_team', kwargs={'team': self.team.slug}))
 
 
@@ -245,8 +294,6 @@ class ChangeTeamIdentifier(InitializeTeamMixin, BaseRedirectFormView):
         except IntegrityError:
             return self.form_invalid(['An error occurred. Please try another identifier!'])
 
-        self.team.identifier = identifier
-        self.team.save()
         return self.redirect()
 
     def redirect(self, redirect_kwargs=None):
@@ -270,8 +317,6 @@ class ChangeTeamName(InitializeTeamMixin, BaseRedirectFormView):
         except IntegrityError:
             return self.form_invalid(['An error occurred. Please try another name!'])
 
-        self.team.title = name
-        self.team.save()
         return self.redirect()
 
     def redirect(self, redirect_kwargs=None):
@@ -0,0 +1,113 @@
+from collections import Counter
+from django.db import connections, transaction
+from django.utils import timezone
+from teams.counters import change_counter
+from teams.models import Team
+from todolist.models import TeamTodo
+from todolist.search import get_search_backend
+from utils.caching import invalidate_changes
+
+ACTIONS = ('complete', 'reopen', 'delete', 'toggle_important')
+MAX_BULK_IDS = 500
+NOT_FOUND = 'not_found'
+UNCHANGED = 'unchanged'
+
+
+def selected_todos(todos, action):
+    """
+    Returns the todos the action actually changes. Completing a completed todo is a no-op, and so on.
+    """
+    if action == 'complete':
+        return [todo for todo in todos if todo.date_completed is None]
+    if action == 'reopen':
+        return [todo for todo in todos if todo.date_completed is not None]
+    return list(todos)
+
+
+def apply_changes(model, todos, action, using):
+    queryset = model.objects.using(using).filter(pk__in=[todo.pk for todo in todos])
+    now = timezone.now()
+
+    if action == 'complete':
+        queryset.update(date_completed=now)
+        for todo in todos:
+            todo.date_completed = now
+    elif action == 'reopen':
+        queryset.update(date_completed=None, date_created=now)
+        for todo in todos:
+            todo.date_completed = None
+    elif action == 'delete':
+        delete_todos(model, [todo.pk for todo in todos], using)
+    else:
+        for todo in todos:
+            todo.important = not todo.important
+        model.objects.using(using).bulk_update(todos, ('important',))
+
+
+def delete_todos(model, ids, using):
+    """
+    Deletes the todos with a single DELETE and removes them from the search index. Nothing references a todo,
+    so there is nothing to cascade, and skipping the post_delete receivers (one index DELETE and one counter
+    UPDATE per todo) is what makes it set-based; the counters are moved by move_team_counters().
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+                       f'WHERE id IN ({", ".join(["%s"] * len(ids))})', ids)
+    get_search_backend(using).remove(model, ids)
+
+
+def move_team_counters(todos, using, deleted=False):
+    """
+    Moves the team counters of all the changed (or deleted) todos with one UPDATE per (team, counter),
+    instead of the one UPDATE per todo the signal receivers would issue.
+    """
+    deltas = Counter()
+    for todo in todos:
+        previous, current = todo.loaded_counter, None if deleted else todo.counter_key()
+        if previous != current:
+            deltas[previous] -= 1
+            deltas[current] += 1
+
+    for key, delta in deltas.items():
+        if key and delta:
+            change_counter(Team, *key, delta, using)
+
+
+def bulk_result(todo, action):
+    if action == 'toggle_important':
+        return 'important' if todo.important else 'unimportant'
+    return {'complete': 'completed', 'reopen': 'reopened', 'delete': 'deleted'}[action]
+
+
+def apply_bulk_action(queryset, action, ids):
+    """
+    Applies the action to the todos of the queryset with the given ids and returns {id: result}.
+
+    The queryset must already be limited to the todos the user may change, so the access check is
+    a single SELECT. It locks the todos until the action is applied, so concurrent actions on the same todos
+    see each other's changes and never move the team counters twice. The action is one UPDATE or DELETE
+    that bypasses the model signals, so the search index, the team counters and the change versions are
+    maintained here.
+    """
+    model = queryset.model
+    fields = ['date_completed', 'important', 'team_id' if model is TeamTodo else 'user_id']
+    results = {pk: NOT_FOUND for pk in ids}
+
+    with transaction.atomic(using=queryset.db):
+        todos = list(queryset.filter(pk__in=ids).select_for_update(of=('self',)).only(*fields))
+        results.update({todo.pk: UNCHANGED for todo in todos})
+
+        changed = selected_todos(todos, action)
+        if not changed:
+            return results
+
+        apply_changes(model, changed, action, queryset.db)
+        if model is TeamTodo:
+            move_team_counters(changed, queryset.db, deleted=action == 'delete')
+            invalidate_changes('team', {todo.team_id for todo in changed}, using=queryset.db)
+        else:
+            invalidate_changes('user', {todo.user_id for todo in changed}, using=queryset.db)
+
+    results.update({todo.pk: bulk_result(todo, action) for todo in changed})
+    return results
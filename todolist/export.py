@@ -0,0 +1,86 @@
+import csv
+import json
+import zlib
+from datetime import datetime
+from django.core.serializers.json import DjangoJSONEncoder
+from todolist.models import TeamTodo
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+STATUSES = {'all': {}, 'open': {'date_completed__isnull': True}, 'completed': {'date_completed__isnull': False}}
+EXPORT_FIELDS = ('id', 'title', 'memo', 'important', 'date_created', 'date_completed')
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+class Echo:
+    """
+    File-like object that returns what is written, so csv.writer can format one row at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def export_fields(model):
+    return EXPORT_FIELDS + (('team__slug',) if model is TeamTodo else ())
+
+
+def export_rows(queryset, status='all', chunk_size=CHUNK_SIZE):
+    """
+    Yields the todos as tuples. iterator() fetches them chunk by chunk (with a server-side cursor on PostgreSQL)
+    and values_list() skips building model instances, so the memory used does not depend on the export size.
+    """
+    return (queryset.filter(**STATUSES[status]).order_by('pk')
+            .values_list(*export_fields(queryset.model)).iterator(chunk_size=chunk_size))
+
+
+def csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow([field.replace('__', '_') for field in fields])
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def ndjson_lines(rows, fields):
+    keys = [field.replace('__', '_') for field in fields]
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """
+    Joins the lines into chunks of about `size` bytes, so the response is not written one row at a time.
+    """
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    # wbits=31 writes the gzip header and trailer, so the output is a regular .gz file
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_todos(queryset, export_format='csv', status='all', gzip=False, chunk_size=CHUNK_SIZE):
+    """
+    Returns an iterator of bytes with the todos of the queryset in CSV or NDJSON, optionally gzipped on the fly.
+    """
+    fields = export_fields(queryset.model)
+    lines = {'csv': csv_lines, 'ndjson': ndjson_lines}[export_format](export_rows(queryset, status, chunk_size), fields)
+    chunks = buffered(lines)
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,106 @@
+from hashlib import md5
+from typing import Callable, NamedTuple
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+from utils.caching import get_change_version, get_change_versions
+from utils.instrumentation import record_fragment_access
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600)
+CARD_TEMPLATE = 'home/logged in/render_todo.html'
+PANEL_TEMPLATE = 'home/logged in/panel.html'
+
+
+class Panel(NamedTuple):
+    """
+    A home page panel: get_versions() returns what the panel depends on and build() returns its page of todos.
+    """
+    get_versions: Callable
+    build: Callable
+    query_key: str
+    team_todo: bool
+
+
+class RenderedPanel(NamedTuple):
+    html: SafeString
+    has_todos: bool
+
+
+def digest(*parts):
+    return md5(repr(parts).encode()).hexdigest()
+
+
+def card_version(todo, team_todo):
+    """
+    Digest of everything the card shows, so a saved todo gets a new card key without any invalidation.
+    The old cards simply expire.
+    """
+    team = (todo.team.slug, todo.team.title) if team_todo else None
+    return digest(todo.title, todo.slug, todo.memo, todo.important, todo.date_created, team)
+
+
+def card_key(todo, team_todo):
+    return f'fragment:todo:{"team" if team_todo else "user"}:{todo.pk}:{card_version(todo, team_todo)}'
+
+
+def render_cards(todos, team_todo=False):
+    """
+    Returns the rendered card of every todo. The cached cards are read with a single get_many(),
+    only the new or changed todos are rendered again.
+    """
+    keys = [card_key(todo, team_todo) for todo in todos]
+    cards = cache.get_many(keys)
+    record_fragment_access(len(cards), len(keys) - len(cards))
+
+    rendered = {}
+    for todo, key in zip(todos, keys):
+        if key not in cards:
+            rendered[key] = render_to_string(CARD_TEMPLATE, {'todo': todo, 'team_todo': team_todo})
+
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
+
+
+def panel_key(name, request, versions):
+    # The querystring holds the cursors, the ordering and the search keyword, which the panel depends on
+    query = sorted(request.GET.lists())
+    return f'fragment:panel:{name}:{request.user.id}:{digest(request.path, versions, query)}'
+
+
+def user_panel_versions(request):
+    return get_change_version('user', request.user.id)
+
+
+def team_panel_versions(request):
+    # The user cache version changes with the memberships, the team versions with the todos and team names
+    team_ids = request.user_cache.team_ids
+    return request.user_cache.version, sorted(get_change_versions('team', team_ids).items())
+
+
+def render_panels(request, panels):
+    """
+    Renders the home page panels, given as {name: Panel}. A cached panel skips both the query and the rendering;
+    a missing one is paginated with build() and rendered from the cached cards.
+    """
+    keys = {name: panel_key(name, request, panel.get_versions()) for name, panel in panels.items()}
+    cached = cache.get_many(keys.values())
+    record_fragment_access(len(cached), len(keys) - len(cached))
+
+    result, rendered = {}, {}
+    for name, panel in panels.items():
+        key = keys[name]
+        if key in cached:
+            result[name] = cached[key]
+            continue
+
+        page = panel.build()
+        html = render_to_string(PANEL_TEMPLATE, {'todos': page, 'cards': render_cards(page, panel.team_todo),
+                                                 'query_key': panel.query_key, 'request': request})
+        result[name] = rendered[key] = RenderedPanel(mark_safe(html), bool(page))
+
+    if rendered:
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+    return result
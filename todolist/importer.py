@@ -0,0 +1,152 @@
+import codecs
+import csv
+import json
+from itertools import chain
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from teams.counters import change_counter
+from teams.models import Team
+from todolist.models import TeamTodo
+from todolist.search import get_search_backend
+from utils.caching import invalidate_changes
+from utils.iterables import batched
+
+IMPORT_FORMATS = ('csv', 'json')
+MAX_REPORTED_ERRORS = 1000
+BATCH_SIZE = 1000
+
+# The owner (user or team) comes from the request, never from the file
+OWNER_FIELDS = ('user', 'team')
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+class InvalidRow:
+    def __init__(self, message):
+        self.message = message
+
+
+def read_csv(file):
+    return csv.DictReader(codecs.iterdecode(file, 'utf-8-sig'))
+
+
+def parse_json_line(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return InvalidRow('This line is not valid JSON.')
+    return row if isinstance(row, dict) else InvalidRow('This line is not a JSON object.')
+
+
+def read_json(file):
+    """
+    Reads either a JSON array of objects or one object per line (NDJSON). NDJSON is streamed,
+    an array has to be parsed at once.
+    """
+    lines = (line for line in codecs.iterdecode(file, 'utf-8-sig') if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return iter(())
+
+    if first.lstrip().startswith('['):
+        try:
+            rows = json.loads(''.join(chain((first,), lines)))
+        except ValueError:
+            raise InvalidImport('The file is not valid JSON.')
+        return (row if isinstance(row, dict) else InvalidRow('This item is not a JSON object.') for row in rows)
+
+    return (parse_json_line(line) for line in chain((first,), lines))
+
+
+def import_fields(form_class):
+    return {name: field for name, field in form_class.base_fields.items() if name not in OWNER_FIELDS}
+
+
+def validate_row(fields, row):
+    """
+    Cleans the row with the form's field rules (required, max_length, boolean parsing...), without a form instance.
+    Returns (cleaned data, errors).
+    """
+    if isinstance(row, InvalidRow):
+        return None, {'__all__': [row.message]}
+
+    cleaned, errors = {}, {}
+    for name, field in fields.items():
+        try:
+            cleaned[name] = field.clean(row.get(name, ''))
+        except ValidationError as error:
+            errors[name] = error.messages
+    return cleaned, errors
+
+
+def build_todos(model, rows, form_class, report, now, owner_ids):
+    """
+    Yields the valid todos, with the slug and date_created that BaseTodo.save() would set, and reports the invalid rows.
+    The TODO_IMPORT_MAX_ROWS setting is read on every call.
+    """
+    fields = import_fields(form_class)
+    max_rows = getattr(settings, 'TODO_IMPORT_MAX_ROWS', 100_000)
+
+    for number, row in enumerate(rows, start=1):
+        if number > max_rows:
+            raise InvalidImport(f'The file has more than {max_rows} rows.')
+
+        cleaned, errors = validate_row(fields, row)
+        if errors:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'row': number, 'errors': errors})
+            continue
+
+        yield model(slug=slugify(cleaned['title'], allow_unicode=True), date_created=now, **cleaned, **owner_ids)
+
+
+def import_todos(file, import_format, model, form_class, batch_size=BATCH_SIZE, **owner):
+    """
+    Imports the todos of a CSV or JSON file for the owner (user=... or team=...) and returns the report:
+    {'imported': count, 'failed': count, 'errors': [{'row': number, 'errors': {field: messages}}]}.
+
+    Valid rows are inserted with batched bulk_create in one transaction. bulk_create sends no signals,
+    so the search index is updated per batch and the team counters and the change versions once, at the end.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise InvalidImport('The format must be csv or json.')
+
+    report = {'imported': 0, 'failed': 0, 'errors': []}
+    now = timezone.now()
+    owner_field, owner_object = next(iter(owner.items()))
+    # Setting the raw foreign key skips the related descriptor, which is noticeable on 100k rows
+    owner_ids = {f'{owner_field}_id': owner_object.pk}
+
+    try:
+        rows = read_csv(file) if import_format == 'csv' else read_json(file)
+
+        backend = get_search_backend()
+        returns_ids = connection.features.can_return_rows_from_bulk_insert
+
+        with transaction.atomic():
+            for batch in batched(build_todos(model, rows, form_class, report, now, owner_ids), batch_size):
+                model.objects.bulk_create(batch)
+                report['imported'] += len(batch)
+                if returns_ids:
+                    backend.index(model, [todo.pk for todo in batch])
+
+            if report['imported']:
+                if not returns_ids:
+                    # Without the primary keys, every todo of the owner that is missing from the index is indexed
+                    backend.index_unindexed(model.objects.filter(**owner_ids), batch_size)
+
+                if model is TeamTodo:
+                    change_counter(Team, owner_object.pk, 'open_todo_count', report['imported'])
+                invalidate_changes(owner_field, [owner_object.pk])
+    except UnicodeDecodeError:
+        raise InvalidImport('The file must be UTF-8 encoded.')
+    except csv.Error as error:
+        raise InvalidImport(f'The file is not valid CSV: {error}.')
+
+    return report
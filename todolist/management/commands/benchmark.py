@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from accounts.models import CustomUser
+from utils.benchmark import build_report, compare_reports, load_report, run_benchmark, save_report
+from utils.seeding import Population, seed_population
+
+
+class Command(BaseCommand):
+    help = ('Seeds a population in the test database and measures the latency (p50/p95/p99), queries and throughput '
+            'of the main pages and todo actions. Results can be saved as a JSON baseline and compared to one.')
+
+    def add_arguments(self, parser):
+        defaults = Population()
+        for field in Population._fields:
+            parser.add_argument(f'--{field.replace("_", "-")}', type=type(getattr(defaults, field)),
+                                default=getattr(defaults, field))
+
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the generated population, so runs are comparable.')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Number of measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Number of unmeasured requests per scenario, sent first.')
+        parser.add_argument('--scenario', action='append',
+                            help='Run only the given scenario. Can be repeated.')
+        parser.add_argument('--save', metavar='PATH',
+                            help='Store the results as a JSON baseline.')
+        parser.add_argument('--compare', metavar='PATH',
+                            help='Compare the results to a JSON baseline and fail on regressions.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed latency growth against the baseline (0.2 means 20%%).')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database between runs.')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Send the requests through the ASGI handler (needs ASYNC_VIEWS=True to benchmark '
+                                 'the async views). Compare it to a WSGI baseline to see the difference.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        population = Population(**{field: options[field] for field in Population._fields})
+        if options['asgi'] and not settings.ASYNC_VIEWS:
+            raise CommandError('Set ASYNC_VIEWS=True, otherwise the ASGI handler serves the sync views.')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            self.stdout.write(f'Seeding {population}...')
+            user_ids, team_ids = seed_population(population, seed=options['seed'], prefix='bench')
+
+            results = run_benchmark(CustomUser.objects.get(pk=user_ids[0]), team_ids[0],
+                                    requests=options['requests'], warmup=options['warmup'],
+                                    only=options['scenario'], progress=self.write_result, asgi=options['asgi'])
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = build_report(results, population, options['seed'], 'asgi' if options['asgi'] else 'wsgi')
+        if options['save']:
+            save_report(report, options['save'])
+            self.stdout.write(f'Saved the results to {options["save"]}.')
+
+        if options['compare']:
+            self.compare(load_report(options['compare']), report, options['threshold'])
+
+    def write_result(self, name, metrics):
+        self.stdout.write(f'{name:<28} p50 {metrics["p50"]:7.2f} ms  p95 {metrics["p95"]:7.2f} ms  '
+                          f'p99 {metrics["p99"]:7.2f} ms  {metrics["queries"]:5.1f} queries  '
+                          f'{metrics["session_writes"]:4.1f} session writes  {metrics["throughput"]:7.1f} req/s')
+
+    def compare(self, baseline, report, threshold):
+        if baseline['meta']['vendor'] != report['meta']['vendor']:
+            self.stderr.write(f'The baseline was recorded on {baseline["meta"]["vendor"]}, '
+                              f'not {report["meta"]["vendor"]}.')
+
+        interfaces = (baseline['meta'].get('interface', 'wsgi'), report['meta']['interface'])
+        if interfaces[0] != interfaces[1]:
+            self.stdout.write(f'Comparing the {interfaces[0].upper()} baseline to this {interfaces[1].upper()} run.')
+
+        regressions = 0
+        for name, metric, previous, current, regressed in compare_reports(baseline, report, threshold):
+            line = f'{name} {metric}: {previous:.2f} -> {current:.2f}'
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            elif self.verbosity > 1:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'{regressions} regressions against the baseline.')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,38 @@
+import os
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from utils.staticfiles import ENCODINGS, brotli
+
+
+class Command(BaseCommand):
+    help = ('Runs collectstatic with the static pipeline (minified CSS, content-hashed names, .gz/.br sidecars) '
+            'and reports the size of every hashed file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the files of STATIC_ROOT (e.g. the hashes of a previous build) first.')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'STATIC_PIPELINE', False):
+            raise CommandError('The static pipeline is off, set STATIC_PIPELINE=True.')
+
+        call_command('collectstatic', interactive=False, clear=options['clear'], verbosity=0)
+
+        header = f'{"file":<56} {"source":>8} {"built":>8} {"gzip":>8} {"brotli":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, hashed_name in sorted(staticfiles_storage.hashed_files.items()):
+            source = finders.find(name)
+            sizes = [os.path.getsize(source) if source else None, staticfiles_storage.size(hashed_name)]
+            sizes += [staticfiles_storage.size(hashed_name + extension)
+                      if staticfiles_storage.exists(hashed_name + extension) else None
+                      for _, extension in reversed(ENCODINGS)]
+            columns = ' '.join(f'{"-" if size is None else size:>8}' for size in sizes)
+            self.stdout.write(f'{hashed_name:<56} {columns}')
+
+        self.stdout.write(f'\nBuilt {len(staticfiles_storage.hashed_files)} files in {settings.STATIC_ROOT}.')
+        if brotli is None:
+            self.stdout.write('The brotli package is not installed, so no .br files were written.')
@@ -0,0 +1,47 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import CustomUser
+from teams.models import Team
+from todolist.export import CHUNK_SIZE, FORMATS, STATUSES, export_todos
+from todolist.models import UserTodo, TeamTodo
+
+
+class Command(BaseCommand):
+    help = 'Streams the todos of a user or a team to a CSV or NDJSON file (or stdout), optionally gzipped.'
+
+    def add_arguments(self, parser):
+        owner = parser.add_mutually_exclusive_group(required=True)
+        owner.add_argument('--user', metavar='USERNAME', help='Export the todos of this user.')
+        owner.add_argument('--team', metavar='SLUG', help='Export the todos of this team.')
+
+        parser.add_argument('--format', choices=tuple(FORMATS), default='csv')
+        parser.add_argument('--status', choices=tuple(STATUSES), default='all')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output on the fly.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Number of todos fetched from the database at a time.')
+        parser.add_argument('--output', metavar='PATH', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            if not CustomUser.objects.filter(username=options['user']).exists():
+                raise CommandError(f'There is no user {options["user"]}.')
+            queryset = UserTodo.objects.filter(user__username=options['user'])
+        else:
+            if not Team.objects.filter(slug=options['team']).exists():
+                raise CommandError(f'There is no team {options["team"]}.')
+            queryset = TeamTodo.objects.filter(team__slug=options['team'])
+
+        chunks = export_todos(queryset, options['format'], options['status'], options['gzip'], options['chunk_size'])
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(f'Wrote {written} bytes to {options["output"]}.')
@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import CustomUser
+from teams.models import Team
+from todolist.forms import UserTodoForm, TeamTodoForm
+from todolist.importer import IMPORT_FORMATS, InvalidImport, import_todos
+from todolist.models import UserTodo, TeamTodo
+
+
+class Command(BaseCommand):
+    help = 'Imports todos for a user or a team from a CSV or JSON (array or one object per line) file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The CSV or JSON file.')
+        owner = parser.add_mutually_exclusive_group(required=True)
+        owner.add_argument('--user', metavar='USERNAME', help='Import the todos for this user.')
+        owner.add_argument('--team', metavar='SLUG', help='Import the todos for this team.')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='The format of the file. By default it is guessed from the extension.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            owner = CustomUser.objects.filter(username=options['user']).first()
+            if owner is None:
+                raise CommandError(f'There is no user {options["user"]}.')
+            model, form_class, owner_kwargs = UserTodo, UserTodoForm, {'user': owner}
+        else:
+            owner = Team.objects.filter(slug=options['team']).first()
+            if owner is None:
+                raise CommandError(f'There is no team {options["team"]}.')
+            model, form_class, owner_kwargs = TeamTodo, TeamTodoForm, {'team': owner}
+
+        extension = options['path'].rsplit('.', 1)[-1].lower()
+        import_format = options['format'] or ('json' if extension in ('json', 'ndjson') else extension)
+
+        start = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as file:
+                report = import_todos(file, import_format, model, form_class, **owner_kwargs)
+        except (InvalidImport, OSError) as error:
+            raise CommandError(error)
+
+        for error in report['errors']:
+            messages = '; '.join(f'{field}: {" ".join(errors)}' for field, errors in error['errors'].items())
+            self.stderr.write(f'Row {error["row"]}: {messages}')
+
+        self.stdout.write(f'Imported {report["imported"]} todos in {time.monotonic() - start:.1f}s. '
+                          f'{report["failed"]} rows were invalid.')
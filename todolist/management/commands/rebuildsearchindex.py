@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from todolist.models import UserTodo, TeamTodo
+from todolist.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of the user and team todos in batches.'
+    MODELS = {'user': UserTodo, 'team': TeamTodo}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of todos indexed per query.')
+        parser.add_argument('--model', choices=tuple(self.MODELS), action='append',
+                            help='Rebuild only the given todo type. Can be repeated.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options['database'])
+
+        for name in options['model'] or self.MODELS:
+            model = self.MODELS[name]
+            indexed = backend.rebuild(
+                model, batch_size=options['batch_size'],
+                progress=lambda count: self.stdout.write(f'{model.__name__}: indexed {count} todos...')
+            )
+            self.stdout.write(f'Rebuilt the {model.__name__} search index ({indexed} todos).')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from utils.instrumentation import read_stats, reset_stats, get_query_budget
+
+
+class Command(BaseCommand):
+    help = 'Shows the per-view request stats recorded by the instrumentation middleware.'
+    SORT_BY = ('requests', 'queries', 'sql', 'render', 'total', 'over_budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=self.SORT_BY, default='total',
+                            help='Sort the views by this (average) metric, highest first.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Clear the recorded stats after showing them.')
+
+    def handle(self, *args, **options):
+        rows = [self.summarize(view_name, metrics) for view_name, metrics in read_stats().items()]
+        if not rows:
+            self.stdout.write('No requests were recorded yet.')
+            return
+
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+
+        header = (f'{"view":<32} {"requests":>8} {"queries":>8} {"replica":>7} {"budget":>6} {"sql ms":>8} '
+                  f'{"render ms":>9} {"total ms":>9} {"cache hit":>9} {"fragments":>9} {"sess w":>6} {"over":>5}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for row in rows:
+            budget = '-' if row['budget'] is None else row['budget']
+            hit_rate = '-' if row['hit_rate'] is None else f'{row["hit_rate"]:.0%}'
+            fragment_rate = '-' if row['fragment_rate'] is None else f'{row["fragment_rate"]:.0%}'
+            replica_rate = '-' if row['replica_rate'] is None else f'{row["replica_rate"]:.0%}'
+            self.stdout.write(f'{row["view"]:<32} {row["requests"]:>8} {row["queries"]:>8.1f} {replica_rate:>7} '
+                              f'{budget:>6} {row["sql"]:>8.1f} {row["render"]:>9.1f} {row["total"]:>9.1f} '
+                              f'{hit_rate:>9} {fragment_rate:>9} {row["session_writes"]:>6.2f} {row["over_budget"]:>5}')
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write('The stats were reset.')
+
+    @staticmethod
+    def summarize(view_name, metrics):
+        requests = metrics['requests'] or 1
+        cache_accesses = metrics['cache_hits'] + metrics['cache_misses']
+        fragments = metrics['fragment_hits'] + metrics['fragment_misses']
+        return {'view': view_name,
+                'requests': metrics['requests'],
+                'queries': metrics['queries'] / requests,
+                'replica_rate': metrics['replica_queries'] / metrics['queries'] if metrics['queries'] else None,
+                'budget': get_query_budget(view_name),
+                'sql': metrics['sql_time'] / requests / 1000,
+                'render': metrics['render_time'] / requests / 1000,
+                'total': metrics['total_time'] / requests / 1000,
+                'hit_rate': metrics['cache_hits'] / cache_accesses if cache_accesses else None,
+                'fragment_rate': metrics['fragment_hits'] / fragments if fragments else None,
+                'session_writes': metrics['session_writes'] / requests,
+                'over_budget': metrics['over_budget']}
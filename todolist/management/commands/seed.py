@@ -0,0 +1,51 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from utils.seeding import Population, check_prefix, seed_population
+
+
+class Command(BaseCommand):
+    help = ('Generates a reproducible synthetic population (users, teams, memberships and todos) with batched '
+            'bulk inserts. Use --skew for production-like distributions: a few huge teams and many tiny ones.')
+
+    def add_arguments(self, parser):
+        defaults = Population()
+        for field in Population._fields:
+            parser.add_argument(f'--{field.replace("_", "-")}', type=type(getattr(defaults, field)),
+                                default=getattr(defaults, field))
+
+        parser.add_argument('--seed', type=int, default=0,
+                            help='The same seed always generates the same rows.')
+        parser.add_argument('--prefix', default='seed',
+                            help='Prefix of the generated usernames and team titles. It must not be used yet.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows per INSERT.')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Do not rebuild the search index (run rebuildsearchindex later).')
+
+    def handle(self, *args, **options):
+        population = Population(**{field: options[field] for field in Population._fields})
+        if population.skew and population.skew <= 1:
+            raise CommandError('The skew must be greater than 1 (or 0 for no skew).')
+        if population.users < 1:
+            raise CommandError('At least one user is needed.')
+        try:
+            check_prefix(options['prefix'], population)
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.stdout.write(f'Seeding {population}...')
+        start = last_report = time.monotonic()
+
+        def progress(model_name, inserted):
+            nonlocal last_report
+            if time.monotonic() - last_report >= 1:
+                last_report = time.monotonic()
+                self.stdout.write(f'{model_name}: {inserted} rows...')
+
+        user_ids, team_ids = seed_population(population, seed=options['seed'], prefix=options['prefix'],
+                                             batch_size=options['batch_size'], index=not options['no_index'],
+                                             progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded {len(user_ids)} users and {len(team_ids)} teams '
+                                             f'in {time.monotonic() - start:.1f}s. '
+                                             f'Every user can log in with the password "seed-password".'))
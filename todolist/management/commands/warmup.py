@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from utils.warmup import is_cached, warm_up
+
+
+class Command(BaseCommand):
+    help = ('Compiles every template and primes the URL resolver, like a worker does on start with TEMPLATE_WARM_UP, '
+            'and reports the compile time of each template (slowest first).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of templates to list (0 lists all of them).')
+
+    def handle(self, *args, **options):
+        templates, patterns = warm_up()
+        ranked = sorted(templates, key=lambda template: template.seconds, reverse=True)
+        shown = ranked[:options['limit']] if options['limit'] else ranked
+
+        width = max((len(template.name) for template in shown), default=8)
+        self.stdout.write(f'{"template":<{width}} {"compile ms":>10}')
+        self.stdout.write('-' * (width + 11))
+        for template in shown:
+            self.stdout.write(f'{template.name:<{width}} {template.seconds * 1000:>10.2f}')
+
+        total = sum(template.seconds for template in templates) * 1000
+        self.stdout.write(f'\nCompiled {len(templates)} templates in {total:.1f}ms and primed {patterns} URL patterns.')
+
+        cached = [backend.name for backend in engines.all() if hasattr(backend, 'engine') and is_cached(backend.engine)]
+        if not cached:
+            self.stdout.write('The cached loader is off (TEMPLATE_CACHE), so workers would compile them again.')
+
+        failed = [template for template in templates if template.error]
+        for template in failed:
+            self.stderr.write(f'{template.name}: {template.error}')
+        if failed:
+            raise CommandError(f'{len(failed)} templates could not be compiled.')
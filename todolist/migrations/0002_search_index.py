@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from todolist.search import get_search_backend
+
+MODELS = ('UserTodo', 'TeamTodo')
+
+
+def install_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection.alias)
+
+    for model_name in MODELS:
+        model = apps.get_model('todolist', model_name)
+        backend.install(model)
+        backend.rebuild(model)
+
+
+def uninstall_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection.alias)
+
+    for model_name in MODELS:
+        backend.uninstall(apps.get_model('todolist', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todolist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
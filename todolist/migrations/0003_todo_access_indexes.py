@@ -0,0 +1,39 @@
+# Generated by Django 3.1.9 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todolist', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='teamtodo',
+            name='date_created',
+            field=models.DateTimeField(),
+        ),
+        migrations.AlterField(
+            model_name='usertodo',
+            name='date_created',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='teamtodo',
+            index=models.Index(condition=models.Q(date_completed__isnull=True), fields=['team', 'date_created', 'id'], name='teamtodo_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamtodo',
+            index=models.Index(condition=models.Q(date_completed__isnull=False), fields=['team', 'date_created', 'id'], name='teamtodo_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertodo',
+            index=models.Index(condition=models.Q(date_completed__isnull=True), fields=['user', 'date_created', 'id'], name='usertodo_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertodo',
+            index=models.Index(condition=models.Q(date_completed__isnull=False), fields=['user', 'date_created', 'id'], name='usertodo_completed_idx'),
+        ),
+    ]
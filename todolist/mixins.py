@@ -1,12 +1,12 @@
 from django.http import Http404
-from teams.models import TeamJunction
-from todolist.models import UserTodo, TeamTodo
+from teams.mixins import TeamAccessMixin
+from todolist.models import UserTodo
 
 
-class GetSingleTodoMixin:
+class GetSingleTodoMixin(TeamAccessMixin):
     """
     To return an instance of TeamTodo, in the implementation add team_todo = True.
-    To work, you need to pass the team in the url.
+    To work, you need to pass the team in the url. The team todo is loaded by the shared TeamAccess resolver.
     """
     team_todo = False
 
@@ -26,12 +26,9 @@ class GetSingleTodoMixin:
             return None
 
     def __get_team_todo(self):
-        try:
-            team = TeamJunction.objects.get(user=self.request.user, team__slug=self.kwargs['team']).team
-            return TeamTodo.objects.get(pk=self.kwargs['todo_pk'],
-                                        team=team)
-        except (TeamJunction.DoesNotExist, TeamTodo.DoesNotExist, ValueError):
+        if not self.team_access or not self.team_access.membership:
             return None
+        return self.team_access.todo
 
 
 class InitializeTodoMixin(GetSingleTodoMixin):
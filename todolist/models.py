@@ -10,7 +10,7 @@ class BaseTodo(models.Model):
     title = models.CharField(db_index=True, max_length=50, verbose_name='Task')
     slug = models.SlugField(blank=True, allow_unicode=True)
     memo = models.TextField(blank=True)
-    date_created = models.DateTimeField(db_index=True)
+    date_created = models.DateTimeField()
     date_completed = models.DateTimeField(null=True, blank=True)
     important = models.BooleanField(default=False)
 
@@ -30,6 +30,36 @@ class BaseTodo(models.Model):
 class UserTodo(BaseTodo):
     user = models.ForeignKey(db_index=True, to=CustomUser, on_delete=models.CASCADE)
 
+    class Meta:
+        # The home and completed pages filter by owner and status and seek by (date_created, id)
+        indexes = [
+            models.Index(fields=['user', 'date_created', 'id'], name='usertodo_open_idx',
+                         condition=models.Q(date_completed__isnull=True)),
+            models.Index(fields=['user', 'date_created', 'id'], name='usertodo_completed_idx',
+                         condition=models.Q(date_completed__isnull=False)),
+        ]
+
 
 class TeamTodo(BaseTodo):
     team = models.ForeignKey(Team, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'date_created', 'id'], name='teamtodo_open_idx',
+                         condition=models.Q(date_completed__isnull=True)),
+            models.Index(fields=['team', 'date_created', 'id'], name='teamtodo_completed_idx',
+                         condition=models.Q(date_completed__isnull=False)),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the counter bucket the todo was loaded in, so the team counters can be moved on save
+        instance.loaded_counter = instance.counter_key()
+        return instance
+
+    def counter_key(self):
+        if 'team_id' in self.get_deferred_fields() or 'date_completed' in self.get_deferred_fields():
+            return None
+        counter = 'completed_todo_count' if self.date_completed else 'open_todo_count'
+        return self.team_id, counter
@@ -0,0 +1,240 @@
+import re
+from abc import ABC, abstractmethod
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+class BaseSearchBackend(ABC):
+    """
+    Full-text search over the title and memo of a todo model.
+
+    Every backend keeps its own index next to the todo tables. It is created by the migrations (install),
+    kept fresh by the todolist signals (index/remove) and can be repaired with the rebuildsearchindex command.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+
+    @staticmethod
+    def tokenize(keyword):
+        return re.findall(r'\w+', keyword.lower())
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def install(self, model):
+        pass
+
+    def uninstall(self, model):
+        pass
+
+    def index(self, model, ids):
+        pass
+
+    def remove(self, model, ids):
+        pass
+
+    def purge(self, model):
+        pass
+
+    def unindexed(self, model, ids):
+        """
+        Returns the ids that have no index row.
+        """
+        return []
+
+    def index_unindexed(self, queryset, batch_size=1000):
+        """
+        Indexes the rows of the queryset that are missing from the index, in batches of primary keys.
+        For rows inserted without signals when their primary keys are not known (see todolist.importer).
+        """
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            self.index(queryset.model, self.unindexed(queryset.model, ids))
+            last_id = ids[-1]
+
+    def rebuild(self, model, batch_size=1000, progress=None):
+        """
+        Re-indexes every row of the model in batches of primary keys and drops the index rows of deleted todos.
+        The optional progress callable receives the number of rows indexed so far after every batch.
+        """
+        indexed, last_id = 0, 0
+
+        while True:
+            ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            self.index(model, ids)
+            indexed, last_id = indexed + len(ids), ids[-1]
+            if progress:
+                progress(indexed)
+
+        self.purge(model)
+        return indexed
+
+    @staticmethod
+    def no_results(queryset):
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    @abstractmethod
+    def search(self, queryset, keyword):
+        """
+        Returns the queryset filtered to the todos matching the keyword and annotated with `rank`.
+        The higher the rank, the better the match.
+        """
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Fallback for database vendors without a supported full-text engine. It does not keep any index.
+    """
+    def rebuild(self, model, batch_size=1000, progress=None):
+        return 0
+
+    def search(self, queryset, keyword):
+        for token in self.tokenize(keyword):
+            queryset = queryset.filter(Q(title__icontains=token) | Q(memo__icontains=token))
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Keeps a weighted tsvector column (title A, memo B) with a GIN index on every todo table.
+    """
+    config = 'english'
+    column = 'search_vector'
+
+    def vector_sql(self):
+        return (f"setweight(to_tsvector('{self.config}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{self.config}', coalesce(memo, '')), 'B')")
+
+    def install(self, model):
+        table = model._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {self.quote(table)} ADD COLUMN {self.column} tsvector')
+            cursor.execute(f'CREATE INDEX {table}_search_idx ON {self.quote(table)} USING gin ({self.column})')
+
+    def uninstall(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {self.quote(model._meta.db_table)} DROP COLUMN {self.column}')
+
+    def index(self, model, ids):
+        ids = list(ids)
+        if not ids:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {self.quote(model._meta.db_table)} '
+                           f'SET {self.column} = {self.vector_sql()} WHERE id = ANY(%s)', (ids,))
+
+    def unindexed(self, model, ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM {self.quote(model._meta.db_table)} '
+                           f'WHERE id = ANY(%s) AND {self.column} IS NULL', (list(ids),))
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, queryset, keyword):
+        tokens = self.tokenize(keyword)
+        if not tokens:
+            return self.no_results(queryset)
+
+        table = self.quote(queryset.model._meta.db_table)
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        tsquery = f"to_tsquery('{self.config}', %s)"
+
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT id FROM {table} WHERE {self.column} @@ {tsquery}', (query,))
+        ).annotate(
+            rank=RawSQL(f'ts_rank_cd({table}.{self.column}, {tsquery})::double precision', (query,),
+                        output_field=FloatField())
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Keeps an FTS5 virtual table per todo table, where the rowid of the index row is the todo id.
+    """
+    def fts_table(self, model):
+        return self.quote(f'{model._meta.db_table}_fts')
+
+    @staticmethod
+    def placeholders(ids):
+        return ', '.join(['%s'] * len(ids))
+
+    def install(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'CREATE VIRTUAL TABLE {self.fts_table(model)} '
+                           f"USING fts5(title, memo, tokenize = 'unicode61')")
+
+    def uninstall(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE {self.fts_table(model)}')
+
+    def index(self, model, ids):
+        ids = list(ids)
+        if not ids:
+            return
+
+        self.remove(model, ids)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {self.fts_table(model)} (rowid, title, memo) '
+                           f'SELECT id, title, memo FROM {self.quote(model._meta.db_table)} '
+                           f'WHERE id IN ({self.placeholders(ids)})', ids)
+
+    def remove(self, model, ids):
+        ids = list(ids)
+        if not ids:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.fts_table(model)} WHERE rowid IN ({self.placeholders(ids)})', ids)
+
+    def unindexed(self, model, ids):
+        ids = list(ids)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {self.fts_table(model)} WHERE rowid IN ({self.placeholders(ids)})', ids)
+            indexed = {row[0] for row in cursor.fetchall()}
+        return [pk for pk in ids if pk not in indexed]
+
+    def purge(self, model):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.fts_table(model)} '
+                           f'WHERE rowid NOT IN (SELECT id FROM {self.quote(model._meta.db_table)})')
+
+    def search(self, queryset, keyword):
+        tokens = self.tokenize(keyword)
+        if not tokens:
+            return self.no_results(queryset)
+
+        table = self.quote(queryset.model._meta.db_table)
+        fts_table = self.fts_table(queryset.model)
+        query = ' '.join(f'"{token}"*' for token in tokens)
+
+        # bm25() is negative and lower is better, so flip it to match the Postgres rank.
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', (query,))
+        ).annotate(
+            rank=RawSQL(f'SELECT -bm25({fts_table}, 10.0, 1.0) FROM {fts_table} '
+                        f'WHERE {fts_table} MATCH %s AND rowid = {table}.id', (query,),
+                        output_field=FloatField())
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, SimpleSearchBackend)(connection)
+
+
+def search_todos(queryset, keyword):
+    return get_search_backend(queryset.db).search(queryset, keyword)
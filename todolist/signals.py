@@ -0,0 +1,57 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from teams.counters import change_counter
+from teams.models import Team
+from todolist.models import UserTodo, TeamTodo
+from todolist.search import get_search_backend
+from utils.caching import invalidate_changes
+
+SEARCH_FIELDS = {'title', 'memo'}
+
+
+@receiver(post_save, sender=UserTodo)
+@receiver(post_save, sender=TeamTodo)
+def index_todo(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    get_search_backend(kwargs['using']).index(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=UserTodo)
+@receiver(post_delete, sender=TeamTodo)
+def unindex_todo(sender, instance, **kwargs):
+    get_search_backend(kwargs['using']).remove(sender, [instance.pk])
+
+
+@receiver(post_save, sender=TeamTodo)
+def move_team_todo_counter(sender, instance, created, using, **kwargs):
+    previous = None if created else getattr(instance, 'loaded_counter', None)
+    current = instance.counter_key()
+
+    if previous == current or (not created and previous is None):
+        return
+
+    if previous:
+        change_counter(Team, *previous, -1, using)
+    if current:
+        change_counter(Team, *current, 1, using)
+    instance.loaded_counter = current
+
+
+@receiver(post_delete, sender=TeamTodo)
+def decrement_team_todo_counter(sender, instance, using, **kwargs):
+    counter = getattr(instance, 'loaded_counter', None) or instance.counter_key()
+    if counter:
+        change_counter(Team, *counter, -1, using)
+
+
+@receiver(post_save, sender=UserTodo)
+@receiver(post_delete, sender=UserTodo)
+def invalidate_user_todo_changes(sender, instance, using, **kwargs):
+    invalidate_changes('user', [instance.user_id], using=using)
+
+
+@receiver(post_save, sender=TeamTodo)
+@receiver(post_delete, sender=TeamTodo)
+def invalidate_team_todo_changes(sender, instance, using, **kwargs):
+    invalidate_changes('team', [instance.team_id], using=using)
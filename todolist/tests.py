@@ -1,3 +1,421 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from teams.models import Team, TeamJunction
+from todolist.fragments import render_cards
+from todolist.models import UserTodo, TeamTodo
+from todolist.search import SimpleSearchBackend, SQLiteSearchBackend, get_search_backend, search_todos
+from utils.pagination import InvalidCursor, KeysetPaginator
 
-# Create your tests here.
+
+class QueryPlanTestCase(TestCase):
+    """
+    Loads a page, then runs EXPLAIN on the queries it sent to a table, so the assertions check
+    the real queries of the page and not a copy of them.
+    """
+    def page_queries(self, url, table):
+        # A cached panel would skip its queries
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        queries = [query['sql'] for query in context.captured_queries if f'FROM "{table}"' in query['sql']]
+        self.assertTrue(queries, f'{url} did not query {table}.')
+        return queries
+
+    def query_plan(self, sql):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The test tables are tiny, a sequential scan would always win
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertPageUsesIndex(self, url, table, index):
+        for sql in self.page_queries(url, table):
+            plan = self.query_plan(sql)
+            self.assertIn(index, plan, f'{sql}\n\ndoes not use {index}:\n{plan}')
+            self.assertNotIn('TEMP B-TREE', plan.upper(), f'{sql}\n\nsorts the rows:\n{plan}')
+
+
+class TodoIndexesTest(QueryPlanTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='planner', email='planner@example.com', password='x')
+        cls.team = Team.objects.create(title='Planners', identifier='planners', owner=cls.user)
+        TeamJunction.objects.create(team=cls.team, user=cls.user)
+
+        now = timezone.now()
+        for number in range(20):
+            completed = now if number % 2 else None
+            UserTodo.objects.create(title=f'Todo {number}', user=cls.user, date_completed=completed)
+            TeamTodo.objects.create(title=f'Todo {number}', team=cls.team, date_completed=completed)
+        UserTodo.objects.update(date_created=now - timedelta(days=1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_home_uses_open_indexes(self):
+        for order in ('newest', 'oldest'):
+            url = f'{reverse("home")}?order_by={order}'
+            self.assertPageUsesIndex(url, 'todolist_usertodo', 'usertodo_open_idx')
+            self.assertPageUsesIndex(url, 'todolist_teamtodo', 'teamtodo_open_idx')
+
+    def test_completed_uses_completed_indexes(self):
+        url = reverse('todo:completed_todos')
+        self.assertPageUsesIndex(url, 'todolist_usertodo', 'usertodo_completed_idx')
+        self.assertPageUsesIndex(url, 'todolist_teamtodo', 'teamtodo_completed_idx')
+
+    def test_team_todos_use_status_indexes(self):
+        url = reverse('api:team_todos', kwargs={'team': self.team.slug})
+        self.assertPageUsesIndex(f'{url}?status=open', 'todolist_teamtodo', 'teamtodo_open_idx')
+        self.assertPageUsesIndex(f'{url}?status=completed', 'todolist_teamtodo', 'teamtodo_completed_idx')
+
+
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='pager', email='pager@example.com', password='x')
+        for number in range(10):
+            UserTodo.objects.create(title=f'Todo {number}', user=cls.user)
+        # Half of the todos share their date, so the id has to break the ties
+        now = timezone.now()
+        UserTodo.objects.filter(title__in=[f'Todo {number}' for number in range(5)]).update(date_created=now)
+
+    def setUp(self):
+        self.ordering = ('-date_created', '-id')
+        self.expected = list(UserTodo.objects.filter(user=self.user).order_by(*self.ordering))
+        self.paginator = KeysetPaginator(UserTodo.objects.filter(user=self.user), self.ordering, per_page=4)
+
+    def test_next_cursors_walk_every_row_once(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual([todo for page in pages for todo in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        self.assertEqual(list(self.paginator.page(second.previous_cursor)), list(first))
+        self.assertTrue(self.paginator.page(second.previous_cursor).has_next())
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', 'WyJ4IiwiMSJd', 'WyJuIiwibm90IGEgZGF0ZSIsIjEiXQ'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+    def test_home_pages(self):
+        self.client.force_login(self.user)
+        cursor = self.paginator.page().next_cursor
+        self.assertEqual(self.client.get(reverse('home'), {'u_page': cursor}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('home'), {'u_page': 'garbage'}).status_code, 400)
+
+
+class BulkTodoActionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='bulk', email='bulk@example.com', password='x')
+        cls.other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        cls.team = Team.objects.create(title='Bulk', identifier='bulkteam', owner=cls.user)
+        TeamJunction.objects.create(team=cls.team, user=cls.user)
+        cls.todos = [TeamTodo.objects.create(title=f'Bulk todo {number}', team=cls.team) for number in range(3)]
+        cls.foreign = UserTodo.objects.create(title='Foreign', user=cls.other)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('teams:team_bulk_todos', kwargs={'team': self.team.slug})
+
+    def bulk(self, action, todos, url=None):
+        response = self.client.post(url or self.url, {'action': action, 'ids': [todo.pk for todo in todos]})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def assertCounters(self, open_todos, completed_todos):
+        team = Team.objects.get(pk=self.team.pk)
+        self.assertEqual((team.open_todo_count, team.completed_todo_count), (open_todos, completed_todos))
+
+    def test_complete_twice_moves_the_counters_once(self):
+        first, second = self.todos[0], self.todos[1]
+        self.assertEqual(self.bulk('complete', [first, second]),
+                         {str(first.pk): 'completed', str(second.pk): 'completed'})
+        self.assertEqual(self.bulk('complete', [first, self.todos[2]]),
+                         {str(first.pk): 'unchanged', str(self.todos[2].pk): 'completed'})
+        self.assertCounters(0, 3)
+
+        self.bulk('reopen', [first])
+        self.assertCounters(1, 2)
+
+    def test_delete_keeps_counters_and_search_index(self):
+        self.bulk('complete', [self.todos[0]])
+        self.assertEqual(self.bulk('delete', self.todos[:2]),
+                         {str(todo.pk): 'deleted' for todo in self.todos[:2]})
+
+        self.assertCounters(1, 0)
+        self.assertEqual(list(search_todos(TeamTodo.objects.all(), 'bulk')), [self.todos[2]])
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_delete_runs_a_fixed_number_of_queries(self):
+        todos = self.todos + [TeamTodo.objects.create(title=f'Extra {number}', team=self.team) for number in range(20)]
+        todos[0].date_completed = timezone.now()
+        todos[0].save()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk('delete', todos)
+        self.assertEqual(sum(query['sql'].startswith('DELETE') for query in queries), 2)
+        self.assertLessEqual(len(queries), 12)
+        self.assertCounters(0, 0)
+        self.assertFalse(search_todos(TeamTodo.objects.all(), 'extra').exists())
+
+    def test_foreign_todos_are_not_found(self):
+        results = self.bulk('toggle_important', [self.foreign], url=reverse('todo:user_bulk_todos'))
+        self.assertEqual(results, {str(self.foreign.pk): 'not_found'})
+        self.assertFalse(UserTodo.objects.get(pk=self.foreign.pk).important)
+
+
+class ExportTodosTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='exporter', email='exporter@example.com', password='x')
+        cls.other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        cls.open = UserTodo.objects.create(title='Open, "quoted"', memo='Line\nbreak', user=cls.user)
+        cls.completed = UserTodo.objects.create(title='Completed', user=cls.user, date_completed=timezone.now())
+        UserTodo.objects.create(title='Foreign', user=cls.other)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('todo:user_export_todos'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="exporter-todos-all.csv"')
+
+        rows = list(csv.DictReader(content.decode().splitlines(keepends=True)))
+        self.assertEqual([(row['id'], row['title'], row['memo']) for row in rows],
+                         [(str(self.open.pk), 'Open, "quoted"', 'Line\nbreak'),
+                          (str(self.completed.pk), 'Completed', '')])
+
+    def test_ndjson_status_filter(self):
+        _, content = self.export(format='ndjson', status='completed')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Completed'])
+
+    def test_gzip(self):
+        response, content = self.export(format='ndjson', status='open', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(json.loads(gzip.decompress(content))['title'], 'Open, "quoted"')
+
+    def test_invalid_format(self):
+        self.assertEqual(self.client.get(reverse('todo:user_export_todos'), {'format': 'xml'}).status_code, 400)
+
+
+class ImportTodosTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='importer', email='importer@example.com', password='x')
+        cls.team = Team.objects.create(title='Imported', identifier='imported', owner=cls.user)
+        TeamJunction.objects.create(team=cls.team, user=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, name, content, url=None):
+        response = self.client.post(url or reverse('todo:user_import_todos'),
+                                    {'file': SimpleUploadedFile(name, content.encode())})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_csv_reports_invalid_rows(self):
+        report = self.upload('todos.csv', 'title,memo,important\nFirst import,Memo,true\n,No title,\nSecond import,,\n')
+        self.assertEqual((report['imported'], report['failed']), (2, 1))
+        self.assertEqual(report['errors'], [{'row': 2, 'errors': {'title': ['This field is required.']}}])
+
+        todos = UserTodo.objects.filter(user=self.user).order_by('id')
+        self.assertEqual([(todo.title, todo.slug, todo.important) for todo in todos],
+                         [('First import', 'first-import', True), ('Second import', 'second-import', False)])
+        self.assertEqual(list(search_todos(todos, 'import')), list(todos))
+
+    def test_team_ndjson_moves_the_counter(self):
+        url = reverse('teams:team_import_todos', kwargs={'team': self.team.slug})
+        report = self.upload('todos.ndjson', '{"title": "Team import"}\n[1]\n{"title": "Other"}\n', url=url)
+        self.assertEqual((report['imported'], report['failed']), (2, 1))
+        self.assertEqual(Team.objects.get(pk=self.team.pk).open_todo_count, 2)
+
+    def test_only_imported_todos_are_indexed(self):
+        existing = UserTodo.objects.create(title='Existing', user=self.user)
+        backend = type(get_search_backend())
+        # A todo created at the same instant must not be mistaken for an imported one
+        with mock.patch('todolist.importer.timezone.now', return_value=existing.date_created), \
+                mock.patch.object(backend, 'index', autospec=True, side_effect=backend.index) as index:
+            self.upload('todos.json', '[{"title": "Imported"}]')
+
+        imported = UserTodo.objects.get(title='Imported')
+        self.assertEqual(imported.date_created, existing.date_created)
+        self.assertEqual([pk for call in index.call_args_list for pk in call.args[2]], [imported.pk])
+
+    @override_settings(TODO_IMPORT_MAX_ROWS=2)
+    def test_too_many_rows(self):
+        response = self.client.post(reverse('todo:user_import_todos'),
+                                    {'file': SimpleUploadedFile('todos.csv', b'title\nFirst\nSecond\nThird\n')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'The file has more than 2 rows.')
+        self.assertFalse(UserTodo.objects.exists())
+
+    def test_export_round_trip(self):
+        UserTodo.objects.create(title='Round, "trip"', memo='Line\nbreak', important=True, user=self.user)
+        content = b''.join(self.client.get(reverse('todo:user_export_todos')).streaming_content).decode()
+        UserTodo.objects.filter(user=self.user).delete()
+
+        self.assertEqual(self.upload('todos.csv', content)['imported'], 1)
+        todo = UserTodo.objects.get(user=self.user)
+        self.assertEqual((todo.title, todo.memo, todo.important), ('Round, "trip"', 'Line\nbreak', True))
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='cards', email='cards@example.com', password='x')
+        cls.todos = [UserTodo.objects.create(title=f'Card {number}', user=cls.user) for number in range(2)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_are_rendered_once(self):
+        with mock.patch('todolist.fragments.render_to_string', wraps=render_to_string) as render:
+            first = render_cards(self.todos)
+            self.assertEqual(render_cards(self.todos), first)
+            self.assertEqual(render.call_count, 2)
+
+            # A changed todo gets a new key, the other card is reused
+            self.todos[0].title = 'Changed card'
+            cards = render_cards(self.todos)
+            self.assertEqual(render.call_count, 3)
+            self.assertIn('Changed card', cards[0])
+            self.assertEqual(cards[1], first[1])
+
+
+class PanelCacheTest(TransactionTestCase):
+    """
+    The panels are keyed on the change versions, which are invalidated on commit.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='panels', email='panels@example.com', password='x')
+        self.todo = UserTodo.objects.create(title='Panel todo', user=self.user)
+        self.client.force_login(self.user)
+
+    def get_home(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_cached_panel_skips_the_query(self):
+        response, first = self.get_home()
+        self.assertContains(response, 'Panel todo')
+
+        response, second = self.get_home()
+        self.assertContains(response, 'Panel todo')
+        self.assertLess(second, first)
+
+    def test_saved_todo_renders_the_panel_again(self):
+        self.get_home()
+        self.todo.title = 'Renamed todo'
+        self.todo.save()
+
+        response, _ = self.get_home()
+        self.assertContains(response, 'Renamed todo')
+        self.assertNotContains(response, 'Panel todo')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='searcher', email='searcher@example.com', password='x')
+        cls.in_memo = UserTodo.objects.create(title='Groceries', memo='Add the report receipts', user=cls.user)
+        cls.in_title = UserTodo.objects.create(title='Quarterly report', memo='Numbers', user=cls.user)
+        cls.unrelated = UserTodo.objects.create(title='Walk the dog', user=cls.user)
+
+    def search(self, keyword, queryset=None):
+        return list(search_todos(queryset or UserTodo.objects.all(), keyword).order_by('-rank', 'id'))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('report'), [self.in_title, self.in_memo])
+        self.assertEqual(self.search('quart rep'), [self.in_title])
+        self.assertEqual(self.search('  ...  '), [])
+
+    def test_signals_keep_the_index_fresh(self):
+        todo = UserTodo.objects.create(title='Dentist appointment', user=self.user)
+        self.assertEqual(self.search('dentist'), [todo])
+
+        todo.title = 'Doctor appointment'
+        todo.save()
+        self.assertEqual(self.search('dentist'), [])
+        self.assertEqual(self.search('doctor'), [todo])
+
+        todo.delete()
+        self.assertEqual(self.search('appointment'), [])
+
+    def test_simple_backend_fallback(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+            results = list(search_todos(UserTodo.objects.order_by('id'), 'REPORT numb'))
+        self.assertEqual(results, [self.in_title])
+        self.assertEqual(results[0].rank, 0.0)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 is SQLite only')
+class SQLiteSearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='indexer', email='indexer@example.com', password='x')
+        cls.todos = [UserTodo.objects.create(title=f'Indexed todo {number}', user=cls.user) for number in range(3)]
+        cls.backend = SQLiteSearchBackend(connection)
+
+    def index_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid, title FROM todolist_usertodo_fts ORDER BY rowid')
+            return cursor.fetchall()
+
+    def test_index_rows_follow_the_todos(self):
+        self.assertEqual(self.index_rows(), [(todo.pk, todo.title) for todo in self.todos])
+        # Saves that do not touch the title or the memo skip the index
+        with CaptureQueriesContext(connection) as queries:
+            self.todos[0].save(update_fields=('important',))
+        self.assertFalse([query for query in queries if '_fts' in query['sql']])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM todolist_usertodo_fts')
+            cursor.execute("INSERT INTO todolist_usertodo_fts (rowid, title, memo) VALUES (99999, 'Orphan', '')")
+        self.assertEqual(self.backend.unindexed(UserTodo, [todo.pk for todo in self.todos]),
+                         [todo.pk for todo in self.todos])
+
+        out = StringIO()
+        call_command('rebuildsearchindex', '--model', 'user', '--batch-size', '2', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(),
+                         ['UserTodo: indexed 2 todos...', 'UserTodo: indexed 3 todos...',
+                          'Rebuilt the UserTodo search index (3 todos).'])
+        self.assertEqual(self.index_rows(), [(todo.pk, todo.title) for todo in self.todos])
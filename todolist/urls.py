@@ -1,14 +1,19 @@
 from django.urls import path
 from todolist.views.todo import generic, user, team
 from django.contrib.auth.decorators import login_required
-from todolist.views.home import CompletedTodoHomeView
+from django.conf import settings
+from todolist.views.home import CompletedTodoHomeView, AsyncCompletedTodoHomeView
 from teams.urls import urlpatterns as teams_urlpatterns
 
 app_name = 'todo'
 
 urlpatterns = [
     path('create/', login_required(user.UserTodoCreation.as_view()), name='user_create_todo'),
-    path('completed/', login_required(CompletedTodoHomeView.as_view()), name='completed_todos'),
+    path('completed/', AsyncCompletedTodoHomeView.as_view() if settings.ASYNC_VIEWS
+         else login_required(CompletedTodoHomeView.as_view()), name='completed_todos'),
+    path('bulk/', login_required(generic.BulkTodoAction.as_view()), name='user_bulk_todos'),
+    path('export/', login_required(user.UserExportTodos.as_view()), name='user_export_todos'),
+    path('import/', login_required(user.UserImportTodos.as_view()), name='user_import_todos'),
 
     # User Todos Management
     path('<int:todo_pk>/<str:todo_title>/', login_required(user.UserDetailedTodo.as_view()),
@@ -29,6 +34,15 @@ teams_urlpatterns += [
     path('todo/create/', login_required(team.TeamTodoCreation.as_view()),
          name='team_todo_create'),
 
+    path('<str:team>/todo/bulk/', login_required(generic.BulkTodoAction.as_view()),
+         name='team_bulk_todos'),
+
+    path('<str:team>/todo/export/', login_required(team.TeamExportTodos.as_view()),
+         name='team_export_todos'),
+
+    path('<str:team>/todo/import/', login_required(team.TeamImportTodos.as_view()),
+         name='team_import_todos'),
+
     path('<str:team>/todo/<int:todo_pk>/<str:todo_title>/', login_required(team.TeamDetailedTodo.as_view()),
          name='team_detailed_todo'),
 
@@ -1,60 +1,93 @@
+import asyncio
+from functools import partial
 from django.shortcuts import render
 from django.views import View
+from todolist.fragments import Panel, RenderedPanel, render_panels, user_panel_versions, team_panel_versions
 from todolist.models import UserTodo, TeamTodo
-from utils.mixins import EnableSearchBarMixin, PaginateObjectMixin
+from todolist.search import search_todos
+from utils.async_db import is_authenticated, run_db
+from utils.caching import get_change_version, get_change_versions
+from utils.flash import pop_flashed
+from utils.mixins import AsyncViewMixin, ConditionalPageMixin, EnableSearchBarMixin, CursorPaginateObjectMixin
 from utils.http import Http400
-from django.core.cache import cache
 from typing import Dict, Union
 
 
-class TodoHomeView(EnableSearchBarMixin, PaginateObjectMixin, View):
-    ORDER_BY = {'oldest': 'date_created', 'newest': '-date_created'}
+class TodoHomeView(ConditionalPageMixin, EnableSearchBarMixin, CursorPaginateObjectMixin, View):
+    ORDER_BY = {'oldest': ('date_created', 'id'), 'newest': ('-date_created', '-id')}
+    SEARCH_ORDER = ('-rank', '-id')
     per_page = 4
-    orphans = 1
+    completed = False
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.todos: Union[Dict[str, object], None] = None
+        self.todos: Union[Dict[str, RenderedPanel], None] = None
         self.message = None
 
     def dispatch(self, request, *args, **kwargs):
         if not self.request.method == 'GET':
             raise Http400
+        self.message, _ = pop_flashed(self.request)
+        if self.message is None and (response := self.not_modified()):
+            return response
+
         self.todos = self.filter_todos()
-        self.message = self.request.session.pop('message', None)
-        return super().dispatch(request, *args, **kwargs)
+        return self.add_validators(super().dispatch(request, *args, **kwargs))
 
     def get(self, request, *args, **kwargs):
         context = self.get_context_data()
         return render(request, 'home/home.html', context)
 
-    def filter_todos(self, **kwargs) -> Union[Dict[str, object], None]:
+    def get_versions(self):
+        # The user's cache record (teams, dark mode), the user's todos and the todos of every team of the user
+        if not self.request.user.is_authenticated:
+            return None
+        user_cache = self.request.user_cache
+        return [user_cache.version, get_change_version('user', self.request.user.id),
+                *get_change_versions('team', user_cache.team_ids).values()]
+
+    def filter_todos(self) -> Union[Dict[str, RenderedPanel], None]:
         """
-        this method filters the todos, paginates them and returns them.
+        this method filters the todos, paginates them and returns the rendered user and team panels.
         If the user is not authenticated, None is returned.
 
-        This method could return two possible data types: Dictionary with two key-value OR None.
+        The panels are cached (see todolist.fragments), so the querysets are only evaluated when a panel
+        changed since it was last rendered.
         """
         if not self.request.user.is_authenticated:
             return None
+        return render_panels(self.request, self.get_panels())
 
-        user_todo_page = self.request.GET.get('u_page', 1)
-        team_todo_page = self.request.GET.get('t_page', 1)
-
+    def get_panels(self) -> Dict[str, Panel]:
+        """
+        Returns the user and team panels. Nothing is read until a panel is rendered, so they can be rendered
+        independently of each other.
+        """
         order = self.ORDER_BY[self.request.GET.get('order_by', 'newest')]
         keyword = self.request.GET.get('q', None)
 
-        params = {'date_completed__isnull': kwargs.get('isnull', True)}
-        if keyword:
-            params.update({'title__icontains': keyword})
+        # Search results are ranked, unless the user explicitly asked for an ordering.
+        if keyword and 'order_by' not in self.request.GET:
+            order = self.SEARCH_ORDER
 
-        user_todos = UserTodo.objects.filter(user=self.request.user, **params).order_by(order)
+        return {'user': Panel(partial(user_panel_versions, self.request), partial(self.user_todos, order, keyword),
+                              'u_page', False),
+                'team': Panel(partial(team_panel_versions, self.request), partial(self.team_todos, order, keyword),
+                              't_page', True)}
 
-        user_teams = cache.get(self.request.user)['user_teams']
-        team_todos = TeamTodo.objects.filter(team__in=user_teams, **params).order_by(order)
+    def user_todos(self, order, keyword):
+        todos = UserTodo.objects.filter(user=self.request.user, date_completed__isnull=not self.completed)
+        if keyword:
+            todos = search_todos(todos, keyword)
+        return self.cursor_paginate(todos, self.request.GET.get('u_page', None), order)
 
-        return {'user': self.paginate(user_todos, user_todo_page),
-                'team': self.paginate(team_todos, team_todo_page, per_page=3, orphans=0)}
+    def team_todos(self, order, keyword):
+        user_teams = self.request.user_cache.team_ids
+        todos = TeamTodo.objects.filter(team_id__in=user_teams,
+                                        date_completed__isnull=not self.completed).select_related('team')
+        if keyword:
+            todos = search_todos(todos, keyword)
+        return self.cursor_paginate(todos, self.request.GET.get('t_page', None), order, per_page=3)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data()
@@ -62,8 +95,8 @@ class TodoHomeView(EnableSearchBarMixin, PaginateObjectMixin, View):
             return context
 
         context.update({
-            'user_todos': self.todos['user'],
-            'team_todos': self.todos['team'],
+            'user_panel': self.todos['user'],
+            'team_panel': self.todos['team'],
             'message': self.message,
         })
 
@@ -71,5 +104,33 @@ class TodoHomeView(EnableSearchBarMixin, PaginateObjectMixin, View):
 
 
 class CompletedTodoHomeView(TodoHomeView):
-    def filter_todos(self, **kwargs):
-        return super().filter_todos(isnull=False)
+    completed = True
+
+
+class AsyncTodoHomeView(AsyncViewMixin, TodoHomeView):
+    """
+    The home page for ASGI. The flashed message and the versions of the page are loaded concurrently on the
+    database executor, then the user and team panels, which do not depend on each other either. The page is
+    rendered like TodoHomeView.
+    """
+    async def get(self, request, *args, **kwargs):
+        (self.message, _), not_modified = await asyncio.gather(run_db(pop_flashed, request),
+                                                               run_db(self.not_modified))
+        if self.message is None and not_modified:
+            return not_modified
+        if self.message is not None:
+            # Like TodoHomeView, a page with a flashed message is not cached
+            self.validators = None
+
+        loads = []
+        if await run_db(is_authenticated, request):
+            loads = [run_db(render_panels, request, {name: panel}) for name, panel in self.get_panels().items()]
+
+        panels = await asyncio.gather(*loads)
+        self.todos = {name: panel for rendered in panels for name, panel in rendered.items()} or None
+        return self.add_validators(await run_db(super().get, request, *args, **kwargs))
+
+
+class AsyncCompletedTodoHomeView(AsyncTodoHomeView):
+    completed = True
+    login_required = True
@@ -1,8 +1,16 @@
+from abc import ABC, abstractmethod
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.views import View
 from django.views.generic import UpdateView
 from django.utils import timezone
+from todolist.bulk import ACTIONS, MAX_BULK_IDS, apply_bulk_action
+from todolist.export import FORMATS, STATUSES, export_todos
+from todolist.importer import IMPORT_FORMATS, InvalidImport, import_todos
 from todolist.mixins import InitializeTodoMixin
+from todolist.models import UserTodo, TeamTodo
+from utils.flash import flash_message
+from utils.http import Http400
 from utils.mixins import GenericDispatchMixin
 
 
@@ -15,7 +23,7 @@ class CompleteTodo(InitializeTodoMixin, View):
     def post(self, request, *args, **kwargs):
         self.todo.date_completed = timezone.now()
         self.todo.save()
-        self.request.session['message'] = f'You completed {self.todo.title}!'
+        flash_message(self.request, f'You completed {self.todo.title}!')
         return redirect('home')
 
 
@@ -29,7 +37,7 @@ class ReopenTodo(InitializeTodoMixin, View):
         self.todo.date_completed = None
         self.todo.date_created = timezone.now()
         self.todo.save()
-        self.request.session['message'] = f'You reopened {self.todo.title}!'
+        flash_message(self.request, f'You reopened {self.todo.title}!')
         return redirect('home')
 
 
@@ -41,10 +49,100 @@ class DeleteTodo(InitializeTodoMixin, View):
 
     def post(self, request, *args, **kwargs):
         self.todo.delete()
-        self.request.session['message'] = f'You deleted {self.todo.title}!'
+        flash_message(self.request, f'You deleted {self.todo.title}!')
         return redirect('home')
 
 
+class BulkTodoAction(View):
+    """
+    Completes, reopens, deletes or toggles the importance of many todos at once.
+    POST the action and the todo ids (repeated `ids` parameter), the response maps every id to its result.
+    """
+    def get_queryset(self):
+        if 'team' in self.kwargs:
+            # The membership check is part of the same query as the todos
+            return TeamTodo.objects.filter(team__slug=self.kwargs['team'], team__teamjunction__user=self.request.user)
+        return UserTodo.objects.filter(user=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get('action')
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.POST.getlist('ids')))
+        except ValueError:
+            raise Http400
+
+        if action not in ACTIONS or not ids or len(ids) > MAX_BULK_IDS:
+            raise Http400
+
+        results = apply_bulk_action(self.get_queryset(), action, ids)
+        return JsonResponse({'action': action, 'results': {str(pk): result for pk, result in results.items()}})
+
+
+class BaseExportTodos(ABC, View):
+    """
+    Streams the todos as a CSV or NDJSON download. Query params: format (csv, ndjson), status (all, open, completed)
+    and gzip=1 to compress on the fly. You should supply get_queryset() and get_filename().
+    """
+    http_method_names = ['get']
+
+    @abstractmethod
+    def get_queryset(self):
+        pass
+
+    @abstractmethod
+    def get_filename(self):
+        pass
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        status = request.GET.get('status', 'all')
+        gzip = request.GET.get('gzip') == '1'
+        if export_format not in FORMATS or status not in STATUSES:
+            raise Http400
+
+        filename = f'{self.get_filename()}-{status}.{export_format}'
+        content_type = FORMATS[export_format]
+        if gzip:
+            filename, content_type = f'{filename}.gz', 'application/gzip'
+
+        response = StreamingHttpResponse(export_todos(self.get_queryset(), export_format, status, gzip),
+                                         content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class BaseImportTodos(ABC, View):
+    """
+    Imports the todos of an uploaded CSV or JSON file (POST `file`, and `format` if the extension does not tell it).
+    The response reports the number of imported rows and the errors of the invalid ones.
+    You should supply model, form_class and get_owner() (e.g. {'user': user}).
+    """
+    http_method_names = ['post']
+    model = None
+    form_class = None
+
+    @abstractmethod
+    def get_owner(self):
+        pass
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise Http400
+
+        import_format = request.POST.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+        if import_format == 'ndjson':
+            import_format = 'json'
+        if import_format not in IMPORT_FORMATS:
+            raise Http400
+
+        try:
+            report = import_todos(upload, import_format, self.model, self.form_class, **self.get_owner())
+        except InvalidImport as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse(report)
+
+
 class BaseDetailedTodo(InitializeTodoMixin, GenericDispatchMixin, UpdateView):
     post_only = False
     form_class = None
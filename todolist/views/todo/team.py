@@ -1,8 +1,10 @@
-from django.core.cache import cache
 from django.shortcuts import redirect
 from django.views.generic import FormView
+from teams.mixins import TeamMemberRequiredMixin
+from teams.models import Team
 from todolist.forms import TeamTodoForm
-from todolist.views.todo.generic import BaseDetailedTodo
+from todolist.models import TeamTodo
+from todolist.views.todo.generic import BaseDetailedTodo, BaseExportTodos, BaseImportTodos
 from utils.http import Http400
 from utils.mixins import GenericDispatchMixin
 
@@ -16,9 +18,10 @@ class TeamTodoCreation(GenericDispatchMixin, FormView):
         self.queryset = None
 
     def dispatch(self, request, *args, **kwargs):
-        self.queryset = cache.get(self.request.user)['user_teams']
-        if not self.queryset:
+        user_teams = self.request.user_cache.team_ids
+        if not user_teams:
             raise Http400
+        self.queryset = Team.objects.filter(id__in=user_teams)
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):
@@ -44,3 +47,19 @@ class TeamDetailedTodo(BaseDetailedTodo):
         context = super().get_context_data(**kwargs)
         context['team_todo'] = True
         return context
+
+
+class TeamExportTodos(TeamMemberRequiredMixin, BaseExportTodos):
+    def get_queryset(self):
+        return TeamTodo.objects.filter(team=self.team)
+
+    def get_filename(self):
+        return f'{self.team.slug}-todos'
+
+
+class TeamImportTodos(TeamMemberRequiredMixin, BaseImportTodos):
+    model = TeamTodo
+    form_class = TeamTodoForm
+
+    def get_owner(self):
+        return {'team': self.team}
@@ -1,7 +1,8 @@
 from django.shortcuts import redirect
 from django.views.generic import FormView
 from todolist.forms import UserTodoForm
-from todolist.views.todo.generic import BaseDetailedTodo
+from todolist.models import UserTodo
+from todolist.views.todo.generic import BaseDetailedTodo, BaseExportTodos, BaseImportTodos
 from utils.mixins import GenericDispatchMixin
 
 
@@ -18,3 +19,19 @@ class UserTodoCreation(GenericDispatchMixin, FormView):
 
 class UserDetailedTodo(BaseDetailedTodo):
     form_class = UserTodoForm
+
+
+class UserExportTodos(BaseExportTodos):
+    def get_queryset(self):
+        return UserTodo.objects.filter(user=self.request.user)
+
+    def get_filename(self):
+        return f'{self.request.user.username}-todos'
+
+
+class UserImportTodos(BaseImportTodos):
+    model = UserTodo
+    form_class = UserTodoForm
+
+    def get_owner(self):
+        return {'user': self.request.user}
@@ -0,0 +1,46 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import close_old_connections, connections
+from utils.instrumentation import current_stats
+
+DB_WORKERS = getattr(settings, 'ASYNC_DB_WORKERS', 8)
+
+# The ORM is synchronous and its connections are thread local, so async views run it on these threads.
+# Every thread opens its own connections, so DB_WORKERS bounds the connections they use.
+executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+
+
+def call_in_request_context(func, *args, **kwargs):
+    """
+    Runs func on an executor thread like a short request: the thread's connections are recycled like the request
+    ones (CONN_MAX_AGE, errors) and, while func runs, report their queries to the request's instrumentation.
+    """
+    close_old_connections()
+    stats = current_stats()
+    try:
+        with ExitStack() as stack:
+            if stats is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Awaits a synchronous (ORM, session, cache or template) call made on the database executor.
+    The context variables of the request (e.g. its instrumentation) are copied to the executor thread,
+    so concurrent calls of one request still share one request context.
+    """
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, call_in_request_context, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+def is_authenticated(request):
+    return request.user.is_authenticated
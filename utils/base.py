@@ -3,6 +3,7 @@ from django.views.generic.edit import FormMixin
 from django.shortcuts import redirect
 from django.urls import reverse
 from abc import ABC, abstractmethod
+from utils.flash import flash_errors
 from utils.http import Http400
 
 
@@ -12,7 +13,7 @@ class BaseRedirectFormView(ABC, FormMixin, View):
     You should supply form_class, success_url (class attributes) and give an interface to the form_valid method.
 
     The main difference between this class and FormView is,
-    that this class works with sessions and redirects,
+    that this class flashes the form's errors and redirects,
     where FormView renders the same page with form's errors.
     """
     post_only = True
@@ -20,7 +21,6 @@ class BaseRedirectFormView(ABC, FormMixin, View):
     def dispatch(self, request, *args, **kwargs):
         if self.post_only and not self.request.method == 'POST':
             raise Http400
-        self.request.session['errors'] = []
         return super().dispatch(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
@@ -34,8 +34,7 @@ class BaseRedirectFormView(ABC, FormMixin, View):
         pass
 
     def form_invalid(self, errors=None):
-        errors = errors or []
-        self.request.session['errors'].extend(errors)
+        flash_errors(self.request, errors or [])
         return self.redirect()
 
     def redirect(self, redirect_kwargs=None):
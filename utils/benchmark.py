@@ -0,0 +1,218 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from typing import Callable, NamedTuple
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils.http import urlencode
+from teams.models import Team
+from todolist.models import UserTodo, TeamTodo
+
+
+class Scenario(NamedTuple):
+    """
+    One benchmarked route. `request` receives the logged in client and the iteration number and returns the response.
+    """
+    name: str
+    request: Callable
+
+
+def toggle_todo(url_prefix, todos):
+    """
+    Completes the todo on even iterations and reopens it on odd ones, so the data does not drift between runs.
+    """
+    def request(client, iteration):
+        todo = todos[(iteration // 2) % len(todos)]
+        action = 'complete' if iteration % 2 == 0 else 'reopen'
+        return client.post(reverse(f'{url_prefix}_{action}_todo', kwargs=todo['kwargs']))
+    return request
+
+
+def toggle_bulk(url, ids):
+    def request(client, iteration):
+        return client.post(url, {'action': 'complete' if iteration % 2 == 0 else 'reopen', 'ids': ids})
+    return request
+
+
+def get(url, **params):
+    return lambda client, iteration: client.get(url, params)
+
+
+def revalidate(url):
+    """
+    Reloads the page like a browser that kept it, with the ETag of the previous response.
+    """
+    previous = {}
+
+    def request(client, iteration):
+        headers = {'HTTP_IF_NONE_MATCH': previous['etag']} if 'etag' in previous else {}
+        response = client.get(url, **headers)
+        if response.has_header('ETag'):
+            previous['etag'] = response['ETag']
+        return response
+    return request
+
+
+def build_scenarios(user, team_id):
+    """
+    The main pages and todo actions, as seen by the given user (which must be a member of the team).
+    """
+    team = Team.objects.get(pk=team_id)
+    user_todos = list(UserTodo.objects.filter(user=user, date_completed__isnull=True).order_by('pk')[:20])
+    team_todos = list(TeamTodo.objects.filter(team=team, date_completed__isnull=True).order_by('pk')[:20])
+
+    user_actions = [{'kwargs': {'todo_pk': todo.pk, 'todo_title': todo.slug}} for todo in user_todos]
+    team_actions = [{'kwargs': {'team': team.slug, 'todo_pk': todo.pk, 'todo_title': todo.slug}} for todo in team_todos]
+
+    scenarios = [
+        Scenario('home', get(reverse('home'))),
+        Scenario('home_oldest', get(reverse('home'), order_by='oldest')),
+        Scenario('home_search', get(reverse('home'), q='report')),
+        Scenario('completed', get(reverse('todo:completed_todos'))),
+        Scenario('team_home', get(reverse('teams:team_home'))),
+        Scenario('home_revalidate', revalidate(reverse('home'))),
+        Scenario('team_home_revalidate', revalidate(reverse('teams:team_home'))),
+        Scenario('manage_team', get(reverse('teams:manage_team', kwargs={'team': team.slug}))),
+    ]
+
+    if user_actions:
+        todo = user_actions[0]['kwargs']
+        scenarios += [
+            Scenario('user_todo_detail', get(reverse('todo:user_detailed_todo', kwargs=todo))),
+            Scenario('user_todo_complete_reopen', toggle_todo('todo:user', user_actions)),
+            Scenario('user_todo_bulk', toggle_bulk(reverse('todo:user_bulk_todos'), [t.pk for t in user_todos])),
+        ]
+    if team_actions:
+        scenarios += [
+            Scenario('team_todo_complete_reopen', toggle_todo('teams:team', team_actions)),
+            Scenario('team_todo_bulk', toggle_bulk(reverse('teams:team_bulk_todos', kwargs={'team': team.slug}),
+                                                   [t.pk for t in team_todos])),
+        ]
+    return scenarios
+
+
+class AsgiClient:
+    """
+    Sends the requests through the ASGI handler, on one event loop running in a background thread like under
+    an ASGI server. It has the get/post/force_login interface of the test Client, so the scenarios work unchanged.
+    """
+    def __init__(self):
+        self.client = AsyncClient()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def force_login(self, user):
+        self.client.force_login(user)
+
+    def send(self, request):
+        return asyncio.run_coroutine_threadsafe(request, self.loop).result()
+
+    def get(self, path, data=None, **extra):
+        return self.send(self.client.get(path, data, **extra))
+
+    def post(self, path, data=None, **extra):
+        if 'content_type' not in extra:
+            # The async request factory of Django 3.1 wraps the body in a FakePayload that refuses the larger reads
+            # of the multipart parser, so the form data is sent url-encoded (lists as repeated keys)
+            data, extra['content_type'] = urlencode(data or {}, doseq=True), 'application/x-www-form-urlencoded'
+        return self.send(self.client.post(path, data, **extra))
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[percent - 1]
+
+
+def run_scenario(client, scenario, requests, warmup=0):
+    for iteration in range(warmup):
+        scenario.request(client, iteration)
+
+    durations, queries, session_writes = [], [], []
+    for iteration in range(warmup, warmup + requests):
+        start = time.perf_counter()
+        response = scenario.request(client, iteration)
+        durations.append(time.perf_counter() - start)
+
+        if response.status_code >= 400:
+            raise RuntimeError(f'{scenario.name} answered {response.status_code}.')
+        request = response.asgi_request if hasattr(response, 'asgi_request') else response.wsgi_request
+        queries.append(request.request_stats.queries)
+        session_writes.append(request.request_stats.session_writes)
+
+    return {'requests': requests,
+            'p50': percentile(durations, 50) * 1000,
+            'p95': percentile(durations, 95) * 1000,
+            'p99': percentile(durations, 99) * 1000,
+            'mean': statistics.fmean(durations) * 1000,
+            'queries': statistics.fmean(queries),
+            'session_writes': statistics.fmean(session_writes),
+            'throughput': requests / sum(durations)}
+
+
+def run_benchmark(user, team_id, requests=100, warmup=10, only=None, progress=None, asgi=False):
+    """
+    Drives every scenario through the test client (the whole middleware, URL and template stack, without a socket)
+    and returns {scenario: metrics}. Latencies are in milliseconds and throughput in requests per second.
+    With asgi=True the requests go through the ASGI handler instead of the WSGI one.
+    """
+    client = AsgiClient() if asgi else Client()
+    client.force_login(user)
+
+    results = {}
+    try:
+        for scenario in build_scenarios(user, team_id):
+            if only and scenario.name not in only:
+                continue
+            results[scenario.name] = run_scenario(client, scenario, requests, warmup)
+            if progress:
+                progress(scenario.name, results[scenario.name])
+    finally:
+        if asgi:
+            client.close()
+    return results
+
+
+def build_report(results, population, seed, interface='wsgi'):
+    return {'meta': {'vendor': connection.vendor,
+                     'interface': interface,
+                     'population': population._asdict(),
+                     'seed': seed,
+                     'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+
+
+def load_report(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_report(report, path):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """
+    Yields (scenario, metric, baseline value, current value, is_regression) for every scenario of both reports.
+    Latencies regress when they grow by more than `threshold`, query counts and session writes on any increase.
+    """
+    for name, metrics in current['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+
+        for metric in ('p50', 'p95', 'p99'):
+            yield name, metric, previous[metric], metrics[metric], metrics[metric] > previous[metric] * (1 + threshold)
+        for metric in ('queries', 'session_writes'):
+            if metric in previous:
+                yield name, metric, previous[metric], metrics[metric], metrics[metric] > previous[metric]
@@ -1,22 +1,183 @@
+import threading
+import time
+from typing import NamedTuple, Tuple
 from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.functional import SimpleLazyObject
 from accounts.models import UserProfile
-from teams.models import TeamJunction, Team
+from teams.models import TeamJunction
+from utils.instrumentation import record_cache_access
+from utils.replicas import note_versions
 
+USER_CACHE_TIMEOUT = 300
 
-def set_cache(user):
-    teams_id = (team.team.id for team in TeamJunction.objects.filter(user=user))
-    user_teams = Team.objects.filter(id__in=teams_id)
 
-    cache.set(user, {'userprofile': UserProfile.objects.get(user=user),
-                     'user_teams': user_teams}, 300)
+class CachedTeam(NamedTuple):
+    id: int
+    slug: str
+    title: str
+    owner_id: int
+    owner_name: str
+
+
+class UserCacheRecord(NamedTuple):
+    """
+    Immutable snapshot of the per-user data that almost every page needs.
+    It holds only plain values, so reading it never touches the database.
+    """
+    version: int
+    dark_mode: bool
+    teams: Tuple[CachedTeam, ...]
+
+    @property
+    def team_ids(self):
+        return tuple(team.id for team in self.teams)
+
+    @property
+    def has_team(self):
+        return bool(self.teams)
+
+    def owned_teams(self, user_id):
+        return tuple(team for team in self.teams if team.owner_id == user_id)
+
+
+def version_key(user_id):
+    return f'user-cache:{user_id}:version'
+
+
+def record_key(user_id, version):
+    return f'user-cache:{user_id}:v{version}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    record_cache_access(version is not None)
+
+    if version is None:
+        # Start a fresh namespace, so records left over from an evicted counter are never read again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    note_versions(version)
+    return version
+
+
+def get_cache_version(user_id):
+    return get_version(version_key(user_id))
+
+
+def change_version_key(scope, object_id):
+    return f'changes:{scope}:{object_id}'
+
+
+def get_change_version(scope, object_id):
+    """
+    Returns the version of everything stored under the scope ('user' todos or 'team' todos and members).
+    It changes whenever one of them changes, so it can be used as a cheap ETag source.
+    """
+    return get_version(change_version_key(scope, object_id))
+
+
+def get_change_versions(scope, object_ids):
+    """
+    Returns {object id: change version} with a single cache round-trip when every version is already known.
+    """
+    keys = {object_id: change_version_key(scope, object_id) for object_id in object_ids}
+    versions = cache.get_many(keys.values())
+    for _ in versions:
+        record_cache_access(True)
+
+    note_versions(*versions.values())
+    return {object_id: versions[key] if key in versions else get_version(key) for object_id, key in keys.items()}
+
+
+def bump_cache_versions(user_ids):
+    """
+    Invalidates every record of the users by dropping their version counters in one round-trip.
+    The next read starts a new, higher version and the old records simply expire.
+    """
+    cache.delete_many([version_key(user_id) for user_id in user_ids])
+
+
+class InvalidationBatch:
+    """
+    Collects the version keys that must be dropped during one transaction.
+    It is flushed once, when the transaction commits, and dropped by Django if it rolls back.
+    """
+    def __init__(self):
+        self.keys = set()
+
+    def is_scheduled(self, connection):
+        return any(entry[1] == self.flush for entry in connection.run_on_commit)
+
+    def flush(self):
+        keys, self.keys = self.keys, set()
+        cache.delete_many(keys)
+
+
+_batches = threading.local()
+
+
+def invalidate_versions(keys, using=DEFAULT_DB_ALIAS):
+    keys = set(keys)
+    if not keys:
+        return
+
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        cache.delete_many(keys)
+        return
+
+    batch = getattr(_batches, using, None)
+    if batch is None or not batch.is_scheduled(connection):
+        batch = InvalidationBatch()
+        setattr(_batches, using, batch)
+        transaction.on_commit(batch.flush, using=using)
+
+    batch.keys.update(keys)
+
+
+def invalidate_user_caches(user_ids, using=DEFAULT_DB_ALIAS):
+    invalidate_versions([version_key(user_id) for user_id in user_ids if user_id is not None], using)
+
+
+def invalidate_changes(scope, object_ids, using=DEFAULT_DB_ALIAS):
+    invalidate_versions([change_version_key(scope, object_id) for object_id in object_ids if object_id is not None],
+                        using)
+
+
+def build_user_cache(user_id, version):
+    dark_mode = UserProfile.objects.filter(user_id=user_id).values_list('dark_mode', flat=True).first()
+    teams = TeamJunction.objects.filter(user_id=user_id).order_by('team_id').values_list(
+        'team_id', 'team__slug', 'team__title', 'team__owner_id', 'team__owner__username'
+    )
+
+    return UserCacheRecord(version=version,
+                           dark_mode=bool(dark_mode),
+                           teams=tuple(CachedTeam(*team) for team in teams))
+
+
+def get_user_cache(user):
+    version = get_cache_version(user.id)
+    key = record_key(user.id, version)
+
+    record = cache.get(key)
+    record_cache_access(record is not None)
+    if record is None:
+        record = build_user_cache(user.id, version)
+        cache.set(key, record, USER_CACHE_TIMEOUT)
+    return record
 
 
 class CacheMiddleware:
+    """
+    Exposes the cache record of the authenticated user as request.user_cache.
+    It is loaded lazily, at most once per request.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request, *args, **kwargs):
-        if request.user.is_authenticated and request.user not in cache:
-            set_cache(request.user)
+        if request.user.is_authenticated:
+            request.user_cache = SimpleLazyObject(lambda: get_user_cache(request.user))
         response = self.get_response(request)
         return response
@@ -0,0 +1,39 @@
+from typing import List, Optional, Tuple
+from django.contrib import messages
+
+
+def clear_flashed(request):
+    # Iterating the storage marks its messages as shown, so they are not stored again
+    for _ in messages.get_messages(request):
+        pass
+
+
+def flash_message(request, message):
+    """
+    Shows the message on the next page that pops the flashed messages (usually the one the view redirects to).
+    A new flash replaces the ones that were not shown yet, so at most one is ever kept.
+
+    Flashed messages are kept by django.contrib.messages (MESSAGE_STORAGE), which only writes when one is added
+    or shown, so the session is left untouched.
+    """
+    clear_flashed(request)
+    messages.success(request, message)
+
+
+def flash_errors(request, errors):
+    clear_flashed(request)
+    for error in errors:
+        messages.error(request, error)
+
+
+def pop_flashed(request) -> Tuple[Optional[str], List[str]]:
+    """
+    Returns the last flashed message and the flashed errors of the request, and removes them.
+    """
+    message, errors = None, []
+    for flashed in messages.get_messages(request):
+        if flashed.level == messages.ERROR:
+            errors.append(flashed.message)
+        else:
+            message = flashed.message
+    return message, errors
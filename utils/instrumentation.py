@@ -0,0 +1,272 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('instrumentation')
+
+FLUSH_INTERVAL = getattr(settings, 'INSTRUMENTATION_FLUSH_INTERVAL', 10)
+
+# Timings are aggregated in microseconds, so every metric is an integer the cache can incr()
+METRICS = ('requests', 'queries', 'replica_queries', 'sql_time', 'render_time', 'total_time', 'cache_hits',
+           'cache_misses', 'fragment_hits', 'fragment_misses', 'session_writes', 'over_budget')
+VIEWS_KEY = 'instrumentation:views'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    """
+    What one request cost. It is installed as the execute_wrapper of every database connection,
+    so it sees every query, including the session and authentication ones.
+    Async views query from several executor threads at once, so the counters are updated under a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.replica_queries = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        self.session_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.queries += 1
+                self.replica_queries += context['connection'].alias != DEFAULT_DB_ALIAS
+                self.sql_time += duration
+
+    def as_metrics(self):
+        return {'requests': 1,
+                'queries': self.queries,
+                'replica_queries': self.replica_queries,
+                'sql_time': int(self.sql_time * 1_000_000),
+                'render_time': int(self.render_time * 1_000_000),
+                'total_time': int(self.total_time * 1_000_000),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'fragment_hits': self.fragment_hits,
+                'fragment_misses': self.fragment_misses,
+                'session_writes': self.session_writes}
+
+
+_current_stats = ContextVar('request_stats', default=None)
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+def record_cache_access(hit):
+    stats = current_stats()
+    if stats is None:
+        return
+    with stats.lock:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def record_fragment_access(hits, misses):
+    """
+    Counts the rendered fragments (todo cards, home panels) that were reused from the cache or rendered again.
+    """
+    stats = current_stats()
+    if stats is None:
+        return
+    with stats.lock:
+        stats.fragment_hits += hits
+        stats.fragment_misses += misses
+
+
+@receiver(post_save, sender='sessions.Session', dispatch_uid='instrumentation_session_writes')
+def record_session_write(**kwargs):
+    """
+    Counts the saves of database-backed sessions (the db and cached_db engines), which only happen
+    when the session was modified.
+    """
+    stats = current_stats()
+    if stats is None:
+        return
+    with stats.lock:
+        stats.session_writes += 1
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                duration = time.perf_counter() - start
+                with stats.lock:
+                    stats.render_time += duration
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing every top level render() (includes are part of their parent).
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+def metric_key(view_name, metric):
+    return f'instrumentation:{view_name}:{metric}'
+
+
+def stats_cache():
+    # Read on every flush, so tests can point it to another cache with override_settings
+    return caches[getattr(settings, 'INSTRUMENTATION_CACHE', 'default')]
+
+
+class StatsAggregator:
+    """
+    Sums the request stats of this process per view and adds them to the shared cache every FLUSH_INTERVAL seconds,
+    so the instrumentation costs a few cache round-trips per interval instead of per request.
+
+    The totals are only exact with a cache whose incr() is atomic (memcached). The file-based cache reads and writes
+    the value back, like the list of view names, so workers that flush at the same moment can lose each other's
+    counts. A view name lost that way comes back with the next flush of that view.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(Counter)
+        self.last_flush = time.monotonic()
+
+    def add(self, view_name, metrics):
+        with self.lock:
+            self.pending[view_name].update(metrics)
+            due = time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(Counter)
+            self.last_flush = time.monotonic()
+
+        if not pending:
+            return
+
+        cache = stats_cache()
+        cache.set(VIEWS_KEY, set(cache.get(VIEWS_KEY, ())) | set(pending), None)
+        for view_name, metrics in pending.items():
+            for metric, value in metrics.items():
+                key = metric_key(view_name, metric)
+                cache.add(key, 0, None)
+                cache.incr(key, value)
+
+
+aggregator = StatsAggregator()
+
+
+def read_stats():
+    """
+    Returns {view name: {metric: total}} aggregated over every process that flushed to the stats cache.
+    See StatsAggregator for how exact the totals are.
+    """
+    aggregator.flush()
+    cache = stats_cache()
+    view_names = sorted(cache.get(VIEWS_KEY, ()))
+
+    keys = [metric_key(view_name, metric) for view_name in view_names for metric in METRICS]
+    values = cache.get_many(keys)
+    return {view_name: {metric: values.get(metric_key(view_name, metric), 0) for metric in METRICS}
+            for view_name in view_names}
+
+
+def reset_stats():
+    cache = stats_cache()
+    view_names = cache.get(VIEWS_KEY, ())
+    cache.delete_many([VIEWS_KEY, *(metric_key(view_name, metric) for view_name in view_names for metric in METRICS)])
+
+
+def get_query_budget(view_name):
+    # Read on every request, so tests can change the budgets with override_settings
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view_name, getattr(settings, 'DEFAULT_QUERY_BUDGET', None))
+
+
+def is_over_budget(view_name, stats):
+    budget = get_query_budget(view_name)
+    return budget is not None and stats.queries > budget
+
+
+def report_over_budget(view_name, stats):
+    message = f'{view_name} ran {stats.queries} queries, over its budget of {get_query_budget(view_name)}.'
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class InstrumentationMiddleware:
+    """
+    Records the query count, SQL time, cache and fragment hits/misses, render time and total time of every request,
+    tagged by URL name (e.g. 'todo:completed_todos'), and checks the query budget of the view.
+    Put it first, so the queries of the other middlewares (session, authentication) are counted too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request, *args, **kwargs):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        stats.total_time = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        request.request_stats = stats
+
+        over_budget = is_over_budget(view_name, stats)
+        aggregator.add(view_name, {**stats.as_metrics(), 'over_budget': int(over_budget)})
+        if over_budget:
+            report_over_budget(view_name, stats)
+
+        if settings.DEBUG:
+            response['Server-Timing'] = (f'sql;desc="{stats.queries} queries, {stats.replica_queries} on replicas";'
+                                         f'dur={stats.sql_time * 1000:.1f}, '
+                                         f'render;dur={stats.render_time * 1000:.1f}, '
+                                         f'fragments;desc="{stats.fragment_hits} hits, '
+                                         f'{stats.fragment_misses} misses", '
+                                         f'session;desc="{stats.session_writes} writes", '
+                                         f'total;dur={stats.total_time * 1000:.1f}')
+        return response
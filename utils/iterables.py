@@ -0,0 +1,12 @@
+from itertools import islice
+
+
+def batched(iterable, size):
+    """
+    Yields lists of up to `size` items, consuming the iterable lazily.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
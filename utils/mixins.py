@@ -1,6 +1,18 @@
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from utils.async_db import is_authenticated, run_db
 from utils.http import Http400
 from django.views.generic.base import ContextMixin
 from django.core.paginator import Paginator
+from utils.pagination import KeysetPaginator
+
+RELEASE = getattr(settings, 'RELEASE', '')
 
 
 class GenericDispatchMixin:
@@ -14,6 +26,31 @@ class GenericDispatchMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
+class AsyncViewMixin:
+    """
+    Mixin for class-based views with async handlers (async def get...), served concurrently under ASGI.
+    Django 3.1 only recognises async function views, so as_view() marks the view function as a coroutine function.
+
+    login_required() is sync only, set login_required = True instead. Unknown methods raise Http400,
+    like GenericDispatchMixin.
+    """
+    login_required = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view._is_coroutine = asyncio.coroutines._is_coroutine
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if method not in self.http_method_names or not hasattr(self, method):
+            raise Http400
+        if self.login_required and not await run_db(is_authenticated, request):
+            return redirect_to_login(request.get_full_path())
+        return await getattr(self, method)(request, *args, **kwargs)
+
+
 class EnableSearchBarMixin(ContextMixin):
     """
     Simple Mixin to make it easier to enable the search bar for authenticated users.
@@ -25,23 +62,105 @@ class EnableSearchBarMixin(ContextMixin):
         return context
 
 
+class CountedPaginator(Paginator):
+    """
+    Paginator that trusts an already known total (e.g. a denormalized counter) instead of running COUNT(*).
+    """
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        if count is not None:
+            self.count = count
+
+
 class PaginateObjectMixin:
     """
     Mixin that paginate objects. You need to specify per_page (orphans is optional).
 
     You can customize it even further by specifying per_page and orphans (optional) in the
-    paginate method.
+    paginate method. If the total number of objects is already known, pass it as count to skip the COUNT query.
     """
     per_page = None
     orphans = 0
 
-    def paginate(self, obj, page, per_page=None, orphans=None):
+    def paginate(self, obj, page, per_page=None, orphans=None, count=None):
         self.per_page = per_page or self.per_page
         self.orphans = orphans or self.orphans
 
-        paginator = Paginator(obj, per_page=self.per_page, orphans=self.orphans)
+        paginator = CountedPaginator(obj, per_page=self.per_page, orphans=self.orphans, count=count)
         paginated_obj = paginator.page(page)
         return paginated_obj
 
     # if len(paginated_obj.object_list) > 1:
     # paginated_obj.object_list[0].is_first = True
+
+
+class CursorPaginateObjectMixin:
+    """
+    Mixin that paginates QuerySets with cursors instead of page numbers. You need to specify per_page.
+    The ordering must be unique (e.g. ('-date_created', '-id')), because it is used as the seek key.
+
+    Unlike PaginateObjectMixin it never counts the table, so deep pages cost the same as the first one.
+    """
+    per_page = None
+
+    def cursor_paginate(self, queryset, cursor, ordering, per_page=None):
+        paginator = KeysetPaginator(queryset, ordering, per_page=per_page or self.per_page)
+        return paginator.page(cursor)
+
+
+class ConditionalPageMixin(ABC):
+    """
+    Answers GET with 304 Not Modified when nothing the page shows changed since the client loaded it,
+    before any of the page's own queries run. Implement get_versions(), which returns the change versions
+    (utils.caching) of everything the page shows, or None to always render the page.
+
+    Call not_modified() first and pass the rendered response to add_validators(). Pages that show a one-time
+    flashed message must not call not_modified(), so they are never cached by the browser.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.validators = None
+
+    @abstractmethod
+    def get_versions(self):
+        pass
+
+    def get_validators(self):
+        versions = self.get_versions()
+        if not versions:
+            return None
+
+        # Besides the versions, the page shows the username and embeds a CSRF token bound to the CSRF cookie.
+        # get_token() creates the cookie now rather than while rendering, so the first ETag already matches it
+        user = self.request.user
+        get_token(self.request)
+        raw = (f'{RELEASE}:{user.id}:{user.get_username()}:{user.is_superuser}:{self.request.META["CSRF_COOKIE"]}:'
+               f'{versions}:{self.request.get_full_path()}')
+        # The versions are started with time.time_ns(), so the newest one is also the date of the last change
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest()), max(versions) // 1_000_000_000
+
+    def not_modified(self):
+        """
+        Returns 304 Not Modified if the client's copy of the page is current, otherwise None.
+        """
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+
+        self.validators = self.get_validators()
+        if self.validators is None:
+            return None
+        etag, last_modified = self.validators
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        return self.add_validators(response) if response is not None else None
+
+    def add_validators(self, response):
+        if self.validators is None or response.status_code not in (200, 304):
+            return response
+
+        etag, last_modified = self.validators
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # The page is personal and must be revalidated on every load
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,142 @@
+import json
+from binascii import Error as BinasciiError
+from functools import reduce
+from operator import or_
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from utils.http import Http400
+
+
+class InvalidCursor(Http400):
+    pass
+
+
+class KeysetPage:
+    """
+    One page of a keyset (cursor) paginated QuerySet.
+    It mimics the parts of django.core.paginator.Page that the templates use,
+    but instead of page numbers it carries opaque next/previous cursors.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginator that seeks by the ordering key instead of counting and offsetting.
+
+    The ordering must be a tuple of field names that are unique all together (e.g. ('-date_created', '-id')),
+    and every field must be ordered in the same direction. Each page costs exactly one query of per_page + 1 rows,
+    no matter how deep the page is.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = int(per_page)
+
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        descending = {field.startswith('-') for field in self.ordering}
+        if len(descending) != 1:
+            raise ValueError('All ordering fields must be ordered in the same direction.')
+        self.descending = descending.pop()
+
+    def page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor) if cursor else (self.NEXT, None)
+        backwards = direction == self.PREVIOUS
+
+        queryset = self.queryset.order_by(*(self.reverse_ordering() if backwards else self.ordering))
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values, backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(self.NEXT, rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(self.PREVIOUS, rows[0]) if has_previous else None,
+        )
+
+    def reverse_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def seek_filter(self, values, backwards=False):
+        """
+        Build the row-value comparison (f1, f2, ...) > (v1, v2, ...) as a chain of OR-ed Q objects,
+        so it works on every database backend.
+        """
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        conditions = []
+
+        for index, field in enumerate(self.fields):
+            equal = {name: value for name, value in zip(self.fields[:index], values[:index])}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+
+        return reduce(or_, conditions)
+
+    def get_field(self, name):
+        """
+        Returns the field used to parse the cursor values. Annotations (e.g. search rank) can be used as keys too.
+        """
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.queryset.query.annotations[name].output_field
+
+    def encode_cursor(self, direction, obj):
+        values = [str(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps([direction, *values], separators=(',', ':'))
+        return urlsafe_base64_encode(force_bytes(payload))
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, *raw_values = json.loads(force_str(urlsafe_base64_decode(cursor)))
+            if direction not in (self.NEXT, self.PREVIOUS) or len(raw_values) != len(self.fields):
+                raise ValueError
+
+            values = [self.get_field(field).to_python(value) for field, value in zip(self.fields, raw_values)]
+        except (BinasciiError, TypeError, ValueError, UnicodeDecodeError, ValidationError):
+            raise InvalidCursor
+
+        return direction, values
@@ -0,0 +1,205 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger('replicas')
+
+PIN_COOKIE = getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_until')
+
+# The session of a user changes with the login, so it is always read where it was written
+PRIMARY_APPS = ('sessions',)
+
+LAG_QUERIES = {
+    # An idle primary sends nothing to replay, so a replica that replayed everything it received is not lagging
+    'postgresql': 'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+                  'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END',
+}
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def max_lag():
+    return getattr(settings, 'REPLICA_MAX_LAG', pin_seconds())
+
+
+def lag_check_interval():
+    return getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+
+
+class LagMonitor:
+    """
+    Measures the replication lag of every replica at most once per REPLICA_LAG_CHECK_INTERVAL seconds (per process),
+    and as soon as a replica is added to DATABASE_REPLICAS. Databases without a lag query (e.g. SQLite copies
+    standing in for replicas) count as not lagging.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+        self.lags = {}
+
+    @staticmethod
+    def measure(alias):
+        connection = connections[alias]
+        query = LAG_QUERIES.get(connection.vendor)
+        if query is None:
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            return float(cursor.fetchone()[0] or 0)
+
+    def refresh(self, replicas):
+        lags = {}
+        for alias in replicas:
+            try:
+                lags[alias] = self.measure(alias)
+            except DatabaseError as exception:
+                # An unreachable replica is skipped until the next check
+                logger.warning(f'Could not measure the lag of {alias}: {exception}')
+                lags[alias] = None
+        self.lags = lags
+
+    def available(self):
+        """
+        Returns the replicas that are at most REPLICA_MAX_LAG seconds behind the primary.
+        """
+        replicas = replica_aliases()
+        due = time.monotonic() - self.checked_at >= lag_check_interval() or not set(replicas) <= set(self.lags)
+        if due and self.lock.acquire(blocking=False):
+            # One thread measures, the others keep using the previous measurement
+            try:
+                self.refresh(replicas)
+                self.checked_at = time.monotonic()
+            finally:
+                self.lock.release()
+
+        limit = max_lag()
+        return [alias for alias in replicas if self.lags.get(alias) is not None and self.lags[alias] <= limit]
+
+    def choose(self):
+        available = self.available()
+        return random.choice(available) if available else DEFAULT_DB_ALIAS
+
+
+monitor = LagMonitor()
+
+
+class RoutingState:
+    """
+    Where the reads of one request go. It is shared (not copied) by the executor threads of async views,
+    so a write on any of them moves the rest of the request to the primary.
+    """
+    def __init__(self, alias):
+        self.alias = alias
+        self.wrote = False
+
+
+_current_state = ContextVar('replica_routing', default=None)
+
+
+def use_primary():
+    """
+    Sends the remaining reads of the current request to the primary.
+    """
+    state = _current_state.get()
+    if state is not None:
+        state.alias = DEFAULT_DB_ALIAS
+
+
+def is_recent(version):
+    """
+    Versions are started with time.time_ns() (utils.caching.get_version) on the first read after a change.
+    A version younger than the lag allowed for the replicas may describe data they do not have yet.
+    """
+    return time.time_ns() - version < (max_lag() + lag_check_interval()) * 1_000_000_000
+
+
+def note_versions(*versions):
+    """
+    Called with every change version a request reads. Data that changed moments ago is read from the primary,
+    so it is not cached (under the new version) as the replica saw it before the change.
+    """
+    if replica_aliases() and any(isinstance(version, int) and is_recent(version) for version in versions):
+        use_primary()
+
+
+class ReplicaRouter:
+    """
+    Writes of a request go to the primary. Reads go to the replica chosen for the request, or to the primary outside
+    of requests (management commands) and for the rest of a request once it wrote. Outside of requests, writes are
+    left to Django, so an object read from another database (e.g. by migrate --database) is saved back to it.
+    """
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if state is None or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+
+        # Related objects are read from the database their instance came from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is None:
+            return None
+        if model._meta.app_label not in PRIMARY_APPS:
+            state.wrote = True
+            state.alias = DEFAULT_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def pinned_until(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return 0.0
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Chooses where the reads of the request go. Safe (GET, HEAD...) requests read from a replica that is not lagging,
+    other requests from the primary. A request that writes pins its user to the primary for REPLICA_PIN_SECONDS with
+    a cookie, so the pages they load next show their own changes (read-your-writes). The settings are read
+    on every request.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request, *args, **kwargs):
+        replicas = replica_aliases()
+        if not replicas or request.method not in self.SAFE_METHODS or pinned_until(request) > time.time():
+            state = RoutingState(DEFAULT_DB_ALIAS)
+        else:
+            state = RoutingState(monitor.choose())
+
+        token = _current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_state.reset(token)
+
+        if state.wrote and replicas:
+            seconds = pin_seconds()
+            response.set_cookie(PIN_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,199 @@
+import random
+from functools import lru_cache
+from datetime import timedelta
+from typing import NamedTuple
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from accounts.models import CustomUser, UserProfile
+from teams.common import identifier_settings
+from teams.counters import actual_counters
+from teams.models import Team, TeamJunction, PendingUser
+from todolist.models import UserTodo, TeamTodo
+from todolist.search import get_search_backend
+from utils.iterables import batched
+
+SEED_PASSWORD = 'seed-password'
+TITLE_WORDS = ('report', 'review', 'deploy', 'meeting', 'invoice', 'backup', 'release', 'call', 'budget', 'design')
+MAX_AGE = timedelta(days=2 * 365)
+MEAN_AGE = timedelta(days=90)
+
+
+class Population(NamedTuple):
+    """
+    The sizes are means. With skew (the Pareto shape, > 1) a few teams and users get most of the
+    members and todos and most of them get a few, like in production. A skew of 0 gives everyone the mean.
+    """
+    users: int = 100
+    teams: int = 10
+    members_per_team: int = 10
+    pending_per_team: int = 2
+    todos_per_user: int = 20
+    todos_per_team: int = 50
+    completed_ratio: float = 0.3
+    skew: float = 0.0
+
+
+def skewed_sizes(rng, count, mean, skew, maximum=None):
+    """
+    Returns `count` sizes averaging about `mean`, sorted from the biggest to the smallest.
+    """
+    if skew:
+        # The mean of Pareto(skew) is skew / (skew - 1), scale it down to the wanted mean
+        scale = mean * (skew - 1) / skew
+        sizes = [int(scale * rng.paretovariate(skew)) for _ in range(count)]
+    else:
+        sizes = [mean] * count
+
+    if maximum is not None:
+        sizes = [min(size, maximum) for size in sizes]
+    return sorted(sizes, reverse=True)
+
+
+def insert_batches(model, objects, batch_size, progress=None):
+    """
+    Streams the generated objects into bulk_create, one batch at a time, so memory stays flat at any size.
+    bulk_create does not send any model signal, so no profile, cache, counter or search receiver runs per row.
+    """
+    inserted = 0
+    for batch in batched(objects, batch_size):
+        model.objects.bulk_create(batch)
+        inserted += len(batch)
+        if progress:
+            progress(model.__name__, inserted)
+    return inserted
+
+
+def seeded_identifier(rng):
+    # Not generate_identifier(), which draws from the OS CSPRNG and would not be reproducible
+    length, alphabet = identifier_settings()
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def team_title(prefix, number):
+    return f'{prefix}-team-{number}'
+
+
+def check_prefix(prefix, population):
+    """
+    Raises ValueError if the generated team titles would not fit in Team.title.
+    """
+    longest = team_title(prefix, max(population.teams - 1, 0))
+    max_length = Team._meta.get_field('title').max_length
+    if len(longest) > max_length:
+        raise ValueError(f'The prefix "{prefix}" is too long, team titles like "{longest}" '
+                         f'exceed {max_length} characters.')
+
+
+def created_ids(model, **lookup):
+    # bulk_create does not return the primary keys on every backend, so they are read back
+    return list(model.objects.filter(**lookup).order_by('pk').values_list('pk', flat=True))
+
+
+@lru_cache(maxsize=None)
+def words_slug(words):
+    return slugify(words, allow_unicode=True)
+
+
+def build_todos(model, rng, now, count, completed_ratio, **owner):
+    """
+    Generates the todos of one owner, filling slug and date_created like BaseTodo.save() would.
+    Most todos are recent, the age follows an exponential distribution.
+    """
+    for index in range(count):
+        words = f'{rng.choice(TITLE_WORDS).capitalize()} {rng.choice(TITLE_WORDS)}'
+        title = f'{words} {index}'
+        age = min(MAX_AGE, timedelta(seconds=rng.expovariate(1 / MEAN_AGE.total_seconds())))
+        date_created = now - age
+        date_completed = date_created + min(age, timedelta(hours=rng.randrange(1, 72)))
+        completed = rng.random() < completed_ratio
+
+        yield model(title=title,
+                    slug=f'{words_slug(words)}-{index}',
+                    memo=f'Generated memo for {title.lower()}.' if rng.random() < 0.5 else '',
+                    important=rng.random() < 0.1,
+                    date_created=date_created,
+                    date_completed=date_completed if completed else None,
+                    **owner)
+
+
+def build_teams_junctions(rng, user_ids, team_ids, population):
+    """
+    Yields (team id, member ids, pending ids). The owner of each team is a member of it.
+    Team sizes are skewed and the first team is the biggest one. The first user owns it and also
+    joins the next few teams, so it is a realistic heavy user for the benchmarks.
+    """
+    sizes = skewed_sizes(rng, len(team_ids), population.members_per_team, population.skew, len(user_ids) - 1)
+
+    for index, (team_id, size) in enumerate(zip(team_ids, sizes)):
+        members = {user_ids[index % len(user_ids)]}
+        if index < 5:
+            members.add(user_ids[0])
+
+        sample = rng.sample(user_ids, min(len(user_ids), size + population.pending_per_team + len(members)))
+        candidates = [user_id for user_id in sample if user_id not in members]
+        members.update(candidates[:size])
+
+        yield team_id, members, candidates[size:size + population.pending_per_team]
+
+
+def insert_junctions(rng, user_ids, team_ids, population, batch_size, progress=None):
+    memberships, pending = [], []
+    for team_id, member_ids, pending_ids in build_teams_junctions(rng, user_ids, team_ids, population):
+        memberships.extend(TeamJunction(team_id=team_id, user_id=user_id) for user_id in member_ids)
+        pending.extend(PendingUser(team_id=team_id, user_id=user_id) for user_id in pending_ids)
+
+        for model, rows in ((TeamJunction, memberships), (PendingUser, pending)):
+            if len(rows) >= batch_size:
+                insert_batches(model, rows, batch_size, progress)
+                rows.clear()
+
+    insert_batches(TeamJunction, memberships, batch_size, progress)
+    insert_batches(PendingUser, pending, batch_size, progress)
+
+
+def seed_population(population, seed=0, prefix='seed', batch_size=1000, index=True, progress=None):
+    """
+    Inserts a reproducible population (the same seed always generates the same rows) and returns the ids
+    of its users and teams. The team counters and the search index are computed once at the end.
+    """
+    check_prefix(prefix, population)
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(SEED_PASSWORD)
+
+    # A failure leaves nothing behind, so the same prefix can be seeded again
+    with transaction.atomic():
+        users = (CustomUser(username=f'{prefix}-user-{number}', email=f'{prefix}-user-{number}@example.com',
+                            password=password, date_joined=now) for number in range(population.users))
+        insert_batches(CustomUser, users, batch_size, progress)
+        user_ids = created_ids(CustomUser, username__startswith=f'{prefix}-user-')
+        insert_batches(UserProfile, (UserProfile(user_id=user_id) for user_id in user_ids), batch_size, progress)
+
+        insert_batches(Team, (Team(title=team_title(prefix, number), slug=slugify(team_title(prefix, number)),
+                                   identifier=seeded_identifier(rng), owner_id=user_ids[number % len(user_ids)])
+                              for number in range(population.teams)), batch_size, progress)
+        team_ids = created_ids(Team, title__startswith=f'{prefix}-team-')
+
+        insert_junctions(rng, user_ids, team_ids, population, batch_size, progress)
+
+        user_sizes = skewed_sizes(rng, len(user_ids), population.todos_per_user, population.skew)
+        insert_batches(UserTodo, (todo for user_id, size in zip(user_ids, user_sizes)
+                                  for todo in build_todos(UserTodo, rng, now, size, population.completed_ratio,
+                                                          user_id=user_id)), batch_size, progress)
+
+        team_sizes = skewed_sizes(rng, len(team_ids), population.todos_per_team, population.skew)
+        insert_batches(TeamTodo, (todo for team_id, size in zip(team_ids, team_sizes)
+                                  for todo in build_todos(TeamTodo, rng, now, size, population.completed_ratio,
+                                                          team_id=team_id)), batch_size, progress)
+
+        for batch in batched(team_ids, batch_size):
+            Team.objects.filter(pk__in=batch).update(**actual_counters(TeamJunction, PendingUser, TeamTodo))
+
+        if index:
+            backend = get_search_backend()
+            for model in (UserTodo, TeamTodo):
+                backend.rebuild(model, batch_size=batch_size)
+
+    return user_ids, team_ids
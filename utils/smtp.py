@@ -0,0 +1,97 @@
+import email
+import socketserver
+import threading
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    Speaks just enough SMTP for smtplib and Django's SMTP backend. Every message is accepted and stored.
+    """
+    def reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+    def handle(self):
+        mail_from, recipients = None, []
+        self.reply('220 localhost SMTP sink ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+
+            command, _, argument = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+            command = command.upper()
+
+            if command == 'EHLO':
+                self.reply('250-localhost', '250-AUTH PLAIN LOGIN', '250-8BITMIME', '250 SMTPUTF8')
+            elif command == 'HELO':
+                self.reply('250 localhost')
+            elif command == 'AUTH':
+                self.reply('235 Authentication successful')
+            elif command == 'MAIL':
+                mail_from, recipients = argument.partition(':')[2].strip('<> '), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipients.append(argument.partition(':')[2].strip('<> '))
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                self.server.store(mail_from, recipients, self.read_data())
+                self.reply('250 OK')
+            elif command in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b'.\r\n':
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server that keeps every received email in memory, for tests and local development.
+    Use it as a context manager; port 0 picks a free port, which is available as sink.port.
+
+        with SMTPSink() as sink:
+            with self.settings(EMAIL_HOST='localhost', EMAIL_PORT=sink.port, EMAIL_USE_TLS=False):
+                ...
+            sink.messages  # [(mail_from, recipients, email.message.Message)]
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='localhost', port=0, on_message=None):
+        super().__init__((host, port), SMTPSinkHandler)
+        self.messages = []
+        self.on_message = on_message
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, mail_from, recipients, data):
+        message = (mail_from, recipients, email.message_from_bytes(data))
+        with self.lock:
+            self.messages.append(message)
+        if self.on_message:
+            self.on_message(*message)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,182 @@
+import gzip
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 60)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map')
+# The best encoding the client accepts wins. The sidecars are only written when they are smaller than the file
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CSS_STRINGS_AND_COMMENTS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*(?!!).*?\*/', re.S)
+CSS_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def minify_css(css):
+    """
+    Removes the comments (but not /*! ones), the indentation and the whitespace around {};, and after colons.
+    Strings are left as they are and the whitespace before a colon is kept (a :hover differs from a:hover).
+    """
+    css = CSS_STRINGS_AND_COMMENTS.sub(lambda match: match.group(1) or '', css)
+    parts = CSS_STRINGS.split(css)
+    for index in range(0, len(parts), 2):
+        code = re.sub(r'\s+', ' ', parts[index])
+        code = re.sub(r'\s*([{};,])\s*', r'\1', code)
+        parts[index] = re.sub(r':\s+', ':', code).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def compress(content, encoding):
+    if encoding == 'gzip':
+        # mtime=0 keeps the sidecar identical between builds of the same file
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    return brotli.compress(content, quality=11)
+
+
+class PipelineStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage (content-hashed names) that also minifies the CSS, before it is hashed, and writes
+    .gz and .br sidecars next to every hashed file, so nothing is compressed per request. The brotli package is
+    optional, without it only the .gz sidecars are written.
+    """
+    @staticmethod
+    def minified(name, content):
+        if content is None or not name.endswith('.css'):
+            return content
+        # chunks() reads from the start, the content may already have been read to hash it
+        return ContentFile(minify_css(b''.join(content.chunks()).decode()).encode())
+
+    def file_hash(self, name, content=None):
+        # Hash what is served, so a change of the minifier alone also changes the name
+        return super().file_hash(name, self.minified(name, content))
+
+    def _save(self, name, content):
+        return super()._save(name, self.minified(name, content))
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        # Only the final names, the CSS is hashed again on every pass that rewrites its url()s
+        if not dry_run:
+            for hashed_name in sorted(set(self.hashed_files.values())):
+                self.write_sidecars(hashed_name)
+
+    def write_sidecars(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+
+        with self.open(name) as file:
+            content = file.read()
+        for encoding, extension in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            compressed = compress(content, encoding)
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            if len(compressed) < len(content):
+                self._save(name + extension, ContentFile(compressed))
+
+
+class StaticFile(NamedTuple):
+    path: str
+    content_type: str
+    # {encoding: path of the pre-compressed sidecar}
+    encodings: Dict[str, str]
+    immutable: bool
+
+
+def scan_static_root():
+    """
+    Returns {URL path: StaticFile} for every collected file. Hashed names (listed in the manifest) never change
+    their content, so they are immutable.
+    """
+    root = Path(settings.STATIC_ROOT)
+    hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    sidecars = tuple(extension for _, extension in ENCODINGS)
+
+    files = {}
+    for path in sorted(root.rglob('*')) if root.is_dir() else ():
+        if not path.is_file() or path.name.endswith(sidecars):
+            continue
+        name = path.relative_to(root).as_posix()
+        encodings = {encoding: str(path) + extension for encoding, extension in ENCODINGS
+                     if os.path.isfile(str(path) + extension)}
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        files[settings.STATIC_URL + name] = StaticFile(str(path), content_type, encodings, name in hashed_names)
+    return files
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if not re.fullmatch(r'\s*q\s*=\s*0(\.0*)?\s*', params):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_static(request, static):
+    """
+    Serves the best pre-compressed variant of the file the client accepts. Hashed files are cached for a year
+    without revalidation, the others for STATIC_MAX_AGE seconds and revalidated with If-Modified-Since.
+    """
+    accepted = accepted_encodings(request)
+    encoding = next((encoding for encoding, _ in ENCODINGS if encoding in static.encodings and encoding in accepted),
+                    None)
+    path = static.encodings[encoding] if encoding else static.path
+    stat = os.stat(path)
+
+    if not static.immutable and not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime,
+                                                       stat.st_size):
+        response = HttpResponseNotModified()
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=static.content_type)
+        response['Content-Length'] = stat.st_size
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=static.content_type,
+                                filename=os.path.basename(static.path))
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if static.encodings:
+        response['Vary'] = 'Accept-Encoding'
+    if static.immutable:
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+class StaticFilesMiddleware:
+    """
+    Serves STATIC_ROOT (built by `python manage.py buildstatic`) when STATIC_PIPELINE is on. The files are listed
+    once, when the worker starts, so a request for a static file never touches the disk to find it.
+    Put it first, static files need none of the other middlewares.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'STATIC_PIPELINE', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.files = scan_static_root()
+
+    def __call__(self, request, *args, **kwargs):
+        static = self.files.get(request.path_info)
+        if static is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        return serve_static(request, static)
@@ -0,0 +1,481 @@
+import gzip
+import importlib
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.contrib.messages.storage import default_storage
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils.http import http_date
+from accounts.models import CustomUser, UserProfile
+from teams.models import Team, TeamJunction
+from todolist.models import UserTodo
+from todolist.views.home import AsyncTodoHomeView, TodoHomeView
+from utils.benchmark import build_scenarios, compare_reports, percentile, run_benchmark
+from utils.flash import flash_errors, flash_message, pop_flashed
+from utils.instrumentation import QueryBudgetExceeded, read_stats, reset_stats
+from utils.mixins import ConditionalPageMixin
+from utils.replicas import PIN_COOKIE, LagMonitor, ReplicaRouter, ReplicaRoutingMiddleware, monitor, note_versions
+from utils.seeding import Population, seed_population
+from utils.staticfiles import StaticFile, StaticFilesMiddleware, accepted_encodings, minify_css, serve_static
+from utils.warmup import compile_templates, prime_url_resolver
+
+
+@override_settings(INSTRUMENTATION_CACHE='default')
+class InstrumentationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='measured', email='measured@example.com', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_stats_are_aggregated_per_view(self):
+        # Flushes what the other tests left in this process
+        read_stats()
+        reset_stats()
+        for _ in range(2):
+            self.client.get(reverse('home'))
+
+        stats = read_stats()['home']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['total_time'], 0)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing(self):
+        self.assertIn('sql;desc="', self.client.get(reverse('home'))['Server-Timing'])
+
+    @override_settings(QUERY_BUDGETS={'home': 1})
+    def test_over_budget(self):
+        with self.assertLogs('instrumentation', 'WARNING'):
+            self.client.get(reverse('home'))
+
+        with self.settings(QUERY_BUDGET_RAISE=True), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('home'))
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_main_pages_are_within_budget(self):
+        for url in (reverse('home'), reverse('todo:completed_todos'), reverse('teams:team_home')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class CompareReportsTest(SimpleTestCase):
+    @staticmethod
+    def report(p50, queries, session_writes=None):
+        metrics = {'p50': p50, 'p95': p50 * 2, 'p99': p50 * 3, 'queries': queries}
+        if session_writes is not None:
+            metrics['session_writes'] = session_writes
+        return {'results': {'home': metrics}}
+
+    def regressions(self, baseline, current):
+        return [(name, metric) for name, metric, _, _, regressed in compare_reports(baseline, current, 0.2)
+                if regressed]
+
+    def test_latency_threshold(self):
+        self.assertEqual(self.regressions(self.report(10, 4), self.report(11.9, 4)), [])
+        self.assertEqual(self.regressions(self.report(10, 4), self.report(12.1, 4)),
+                         [('home', 'p50'), ('home', 'p95'), ('home', 'p99')])
+
+    def test_any_extra_query_or_session_write(self):
+        self.assertEqual(self.regressions(self.report(10, 4, 0), self.report(10, 4.5, 1)),
+                         [('home', 'queries'), ('home', 'session_writes')])
+        # Baselines recorded before session writes were measured
+        self.assertEqual(self.regressions(self.report(10, 4), self.report(10, 4, 1)), [])
+
+    def test_percentile(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([float(value) for value in range(1, 102)], 50), 51.0)
+
+
+class SeedPopulationTest(TestCase):
+    population = Population(users=6, teams=2, members_per_team=3, pending_per_team=1, todos_per_user=2,
+                            todos_per_team=3)
+
+    def test_seeds_consistent_counters(self):
+        user_ids, team_ids = seed_population(self.population, prefix='test')
+        self.assertEqual((len(user_ids), len(team_ids)), (6, 2))
+        self.assertEqual(UserProfile.objects.filter(user_id__in=user_ids).count(), 6)
+
+        for team in Team.objects.filter(pk__in=team_ids):
+            self.assertEqual(team.member_count, TeamJunction.objects.filter(team=team).count())
+            self.assertEqual(team.open_todo_count + team.completed_todo_count, 3)
+
+    def test_failure_leaves_nothing_behind(self):
+        with mock.patch('utils.seeding.insert_junctions', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            seed_population(self.population, prefix='test')
+        self.assertFalse(CustomUser.objects.filter(username__startswith='test-').exists())
+
+    def test_prefix_too_long_for_team_titles(self):
+        with self.assertRaises(ValueError):
+            seed_population(self.population, prefix='x' * 20)
+        with self.assertRaises(CommandError):
+            call_command('seed', '--prefix', 'x' * 20, stdout=StringIO())
+        self.assertFalse(CustomUser.objects.exists())
+
+
+class BenchmarkSmokeTest(TransactionTestCase):
+    """
+    The ASGI client sends its requests from another thread, which only sees committed rows.
+    """
+    def setUp(self):
+        cache.clear()
+        population = Population(users=4, teams=1, members_per_team=3, pending_per_team=1, todos_per_user=3,
+                                todos_per_team=3, completed_ratio=0)
+        _, team_ids = seed_population(population, prefix='bench')
+        self.membership = TeamJunction.objects.filter(team_id=team_ids[0]).select_related('user').first()
+
+    @contextmanager
+    def async_views(self):
+        """
+        The URLconf picks the views when it is imported, so it is imported again with ASYNC_VIEWS on, then off.
+        """
+        def reload_urls():
+            for module in ('teams.urls', 'todolist.urls', 'mysite.urls'):
+                importlib.reload(importlib.import_module(module))
+            clear_url_caches()
+
+        try:
+            with override_settings(ASYNC_VIEWS=True):
+                reload_urls()
+                yield
+        finally:
+            reload_urls()
+
+    def run_scenarios(self, asgi):
+        names = [scenario.name for scenario in build_scenarios(self.membership.user, self.membership.team_id)]
+        self.assertIn('user_todo_bulk', names)
+        results = run_benchmark(self.membership.user, self.membership.team_id, requests=2, warmup=0, asgi=asgi)
+        self.assertEqual(list(results), names)
+
+    def test_every_scenario_runs_under_wsgi(self):
+        self.run_scenarios(asgi=False)
+
+    def test_every_scenario_runs_under_asgi(self):
+        with self.async_views():
+            self.assertIs(resolve(reverse('home')).func.view_class, AsyncTodoHomeView)
+            self.run_scenarios(asgi=True)
+        self.assertIs(resolve(reverse('home')).func.view_class, TodoHomeView)
+
+
+class WarmUpTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        (self.root / 'pages').mkdir()
+        (self.root / 'pages' / 'valid.html').write_text('{% extends "base.html" %}')
+        (self.root / 'base.html').write_text('{% block content %}{% endblock %}')
+        (self.root / '.hidden.html').write_text('{% if %}')
+
+    def templates(self, cached=True):
+        loaders = ['django.template.loaders.filesystem.Loader']
+        if cached:
+            loaders = [('django.template.loaders.cached.Loader', loaders)]
+        return override_settings(TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                                             'DIRS': [self.root], 'OPTIONS': {'loaders': loaders}}])
+
+    def test_every_template_is_compiled(self):
+        with self.templates():
+            results = compile_templates()
+        self.assertEqual([(template.name, template.error) for template in results],
+                         [('base.html', None), ('pages/valid.html', None)])
+
+    def test_command_reports_broken_templates(self):
+        (self.root / 'broken.html').write_text('{% if %}')
+        out, err = StringIO(), StringIO()
+        with self.templates(cached=False), self.assertRaises(CommandError), self.assertLogs('warmup', 'WARNING'):
+            call_command('warmup', stdout=out, stderr=err)
+
+        self.assertIn('Compiled 3 templates', out.getvalue())
+        self.assertIn('The cached loader is off', out.getvalue())
+        self.assertIn('broken.html', err.getvalue())
+
+    def test_url_resolver_is_primed(self):
+        self.assertGreater(prime_url_resolver(), 0)
+        self.assertEqual(reverse('teams:team_import_todos', kwargs={'team': 'primed'}), '/teams/primed/todo/import/')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+@mock.patch.object(monitor, 'choose', return_value='replica')
+class ReplicaRoutingTest(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def route(self, request, *steps):
+        """
+        Runs the steps as the view of the request and returns the response with the database of every read.
+        """
+        reads = []
+
+        def view(request):
+            for step in steps:
+                step()
+                reads.append(self.router.db_for_read(UserTodo))
+            return HttpResponse()
+        return ReplicaRoutingMiddleware(view)(request), reads
+
+    def write(self):
+        self.router.db_for_write(UserTodo)
+
+    def test_safe_requests_read_from_a_replica(self, choose):
+        response, reads = self.route(RequestFactory().get('/'), lambda: None)
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        sessions = []
+        self.route(RequestFactory().get('/'), lambda: sessions.append(self.router.db_for_read(Session)))
+        self.assertEqual(sessions, ['default'])
+
+    def test_write_pins_the_user_to_the_primary(self, choose):
+        response, reads = self.route(RequestFactory().get('/'), lambda: None, self.write)
+        self.assertEqual(reads, ['replica', 'default'])
+        self.assertGreater(float(response.cookies[PIN_COOKIE].value), time.time())
+
+        factory = RequestFactory()
+        factory.cookies[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        _, reads = self.route(factory.get('/'), lambda: None)
+        self.assertEqual(reads, ['default'])
+
+    def test_unsafe_requests_and_commands_read_from_the_primary(self, choose):
+        _, reads = self.route(RequestFactory().post('/'), lambda: None)
+        self.assertEqual(reads, ['default'])
+        self.assertEqual(self.router.db_for_read(UserTodo), 'default')
+
+    def test_recent_versions_are_read_from_the_primary(self, choose):
+        _, reads = self.route(RequestFactory().get('/'), lambda: note_versions(1, None),
+                              lambda: note_versions(time.time_ns()))
+        self.assertEqual(reads, ['replica', 'default'])
+
+    def test_lagging_and_unreachable_replicas_are_skipped(self, choose):
+        lags = {'fresh': 0.5, 'lagging': 3600.0}
+
+        def measure(alias):
+            if alias not in lags:
+                raise DatabaseError('unreachable')
+            return lags[alias]
+
+        with mock.patch.object(LagMonitor, 'measure', side_effect=measure), self.assertLogs('replicas', 'WARNING'), \
+                override_settings(DATABASE_REPLICAS=['fresh', 'lagging', 'down'], REPLICA_MAX_LAG=5):
+            self.assertEqual(LagMonitor().available(), ['fresh'])
+
+
+@override_settings(DATABASE_REPLICAS=['local_replica'], REPLICA_MAX_LAG=0, REPLICA_LAG_CHECK_INTERVAL=0)
+class ReplicaDatabaseTest(TestCase):
+    """
+    Routes the requests between the primary and a separate copy standing in for the replica. The copy holds
+    the same user with a different todo, so the page tells which database it was read from. A lag and a check
+    interval of 0 keep the versions of the page from pinning it to the primary.
+    """
+    databases = {'default', 'local_replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='replicated', email='replicated@example.com', password='x')
+        cls.todo = UserTodo.objects.create(title='Primary copy', user=cls.user)
+        # bulk_create sends no signals, which would write the profile to the primary
+        CustomUser.objects.using('local_replica').bulk_create([CustomUser.objects.get(pk=cls.user.pk)])
+        UserProfile.objects.using('local_replica').bulk_create([UserProfile.objects.get(user=cls.user)])
+        UserTodo.objects.using('local_replica').bulk_create([UserTodo(title='Replica copy', slug='replica-copy',
+                                                                      date_created=cls.todo.date_created,
+                                                                      user_id=cls.user.pk)])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get_home(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['local_replica']) as replica:
+            response = self.client.get(reverse('home'))
+        tables = [{table for table in ('django_session', 'todolist_usertodo') if f'"{table}"' in query['sql']}
+                  for queries in (primary, replica) for query in queries]
+        return response, [set().union(*tables[:len(primary)]), set().union(*tables[len(primary):])]
+
+    def test_reads_go_to_the_replica(self):
+        response, (primary, replica) = self.get_home()
+        self.assertContains(response, 'Replica copy')
+        self.assertNotContains(response, 'Primary copy')
+        self.assertEqual((primary, replica), ({'django_session'}, {'todolist_usertodo'}))
+
+    def test_write_pins_the_reads_to_the_primary(self):
+        response = self.client.post(reverse('todo:user_complete_todo',
+                                            kwargs={'todo_pk': self.todo.pk, 'todo_title': self.todo.slug}))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        cache.clear()
+        response, (primary, replica) = self.get_home()
+        self.assertNotContains(response, 'Replica copy')
+        self.assertEqual((primary, replica), ({'django_session', 'todolist_usertodo'}, set()))
+
+
+class FlashTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='flashed', email='flashed@example.com', password='x')
+        cls.todo = UserTodo.objects.create(title='Flashed todo', user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def next_request(self, previous=None):
+        """
+        Returns a request with the message cookie the previous one stored.
+        """
+        factory = RequestFactory()
+        if previous is not None:
+            response = HttpResponse()
+            previous._messages.update(response)
+            factory.cookies = response.cookies
+        request = factory.get('/')
+        request._messages = default_storage(request)
+        return request
+
+    def test_message_is_shown_once_without_session_writes(self):
+        response = self.client.post(reverse('todo:user_complete_todo',
+                                            kwargs={'todo_pk': self.todo.pk, 'todo_title': self.todo.slug}))
+        self.assertEqual(response.wsgi_request.request_stats.session_writes, 0)
+        self.assertIn('messages', response.cookies)
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'You completed Flashed todo!')
+        self.assertEqual(response.wsgi_request.request_stats.session_writes, 0)
+        self.assertNotContains(self.client.get(reverse('home')), 'You completed Flashed todo!')
+
+    def test_new_flash_replaces_the_pending_ones(self):
+        request = self.next_request()
+        flash_message(request, 'First')
+        flash_message(request, 'Second')
+
+        request = self.next_request(request)
+        self.assertEqual(pop_flashed(request), ('Second', []))
+        self.assertEqual(pop_flashed(self.next_request(request)), (None, []))
+
+    def test_errors(self):
+        request = self.next_request()
+        flash_message(request, 'Replaced')
+        flash_errors(request, ['First error', 'Second error'])
+        self.assertEqual(pop_flashed(self.next_request(request)), (None, ['First error', 'Second error']))
+
+
+class StaticFilesTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.path = self.root / 'app.css'
+        self.path.write_bytes(b'body{color:red}' * 20)
+        (self.root / 'app.css.gz').write_bytes(gzip.compress(self.path.read_bytes()))
+        (self.root / 'app.css.br').write_bytes(b'brotli')
+        self.encodings = {'br': str(self.path) + '.br', 'gzip': str(self.path) + '.gz'}
+
+    def serve(self, immutable=True, method='get', **headers):
+        static = StaticFile(str(self.path), 'text/css', self.encodings, immutable)
+        return serve_static(getattr(RequestFactory(), method)('/static/app.css', **headers), static)
+
+    def test_accepted_encodings(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip;q=0, br ; q=0.8, deflate;q=0.0, identity')
+        self.assertEqual(accepted_encodings(request), {'br', 'identity'})
+
+    def test_best_accepted_encoding_is_served(self):
+        for accept, encoding, content in (('gzip, br', 'br', b'brotli'),
+                                          ('gzip', 'gzip', (self.root / 'app.css.gz').read_bytes()),
+                                          ('', None, self.path.read_bytes())):
+            with self.subTest(accept=accept):
+                response = self.serve(HTTP_ACCEPT_ENCODING=accept)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(b''.join(response.streaming_content), content)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+                response.close()
+
+    def test_unhashed_files_are_revalidated(self):
+        response = self.serve(immutable=False, method='head')
+        self.assertEqual(response['Content-Length'], str(self.path.stat().st_size))
+        self.assertEqual(response['Last-Modified'], http_date(self.path.stat().st_mtime))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+        response = self.serve(immutable=False, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_middleware_serves_the_static_root(self):
+        with override_settings(STATIC_PIPELINE=True, STATIC_ROOT=self.root):
+            middleware = StaticFilesMiddleware(lambda request: HttpResponse('page'))
+
+        response = middleware(RequestFactory().get('/static/app.css', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response.close()
+        self.assertEqual(middleware(RequestFactory().get('/static/app.css.gz')).content, b'page')
+        self.assertEqual(middleware(RequestFactory().post('/static/app.css')).content, b'page')
+
+    def test_minify_css(self):
+        css = '/* note */\na:hover {\n    color : red;\n}\n/*! license */\n.menu :first-child { content: "a ; b"; }\n'
+        self.assertEqual(minify_css(css), 'a:hover{color :red}/*! license */ .menu :first-child{content:"a ; b"}')
+
+
+class ConditionalPageTest(TransactionTestCase):
+    """
+    The change versions are invalidated on commit, which TestCase never runs.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='revalidated', email='revalidated@example.com',
+                                                   password='x')
+        self.team = Team.objects.create(title='Revalidated', identifier='revalidated', owner=self.user)
+        TeamJunction.objects.create(team=self.team, user=self.user)
+        self.todo = UserTodo.objects.create(title='Revalidated todo', user=self.user)
+        self.client.force_login(self.user)
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(queries)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (reverse('home'), reverse('teams:team_home')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+                response, queries = self.revalidate(url, response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(queries, 2)
+
+    def test_changed_page_gets_a_new_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        self.todo.title = 'Changed todo'
+        self.todo.save()
+
+        response, _ = self.revalidate(reverse('home'), etag)
+        self.assertContains(response, 'Changed todo')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_flashed_message_and_anonymous_pages_have_no_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        self.client.post(reverse('todo:user_complete_todo',
+                                 kwargs={'todo_pk': self.todo.pk, 'todo_title': self.todo.slug}))
+        response, _ = self.revalidate(reverse('home'), etag)
+        self.assertContains(response, 'You completed Revalidated todo!')
+        self.assertFalse(response.has_header('ETag'))
+
+        self.client.logout()
+        self.assertFalse(self.client.get(reverse('home')).has_header('ETag'))
+
+    def test_get_versions_is_abstract(self):
+        class Page(ConditionalPageMixin):
+            pass
+
+        with self.assertRaises(TypeError):
+            Page()
@@ -0,0 +1,125 @@
+import logging
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+from django.urls.resolvers import get_ns_resolver
+from django.utils import timezone, translation
+
+logger = logging.getLogger('warmup')
+
+
+class CompiledTemplate(NamedTuple):
+    backend: str
+    name: str
+    seconds: float
+    error: Optional[str]
+
+
+def loader_dirs(loader):
+    # The cached loader only wraps the loaders that know the directories
+    if hasattr(loader, 'loaders'):
+        return [directory for inner in loader.loaders for directory in loader_dirs(inner)]
+    return [str(directory) for directory in loader.get_dirs()] if hasattr(loader, 'get_dirs') else []
+
+
+def template_names(engine):
+    """
+    Returns the name of every file in the directories of the engine's loaders (DIRS and the app templates),
+    in the order the loaders search them. A name found twice is only returned once, like the loaders resolve it.
+    """
+    directories = [directory for loader in engine.template_loaders for directory in loader_dirs(loader)]
+    names = {}
+    for directory in dict.fromkeys(directories):
+        root = Path(directory)
+        for path in sorted(root.rglob('*')):
+            relative = path.relative_to(root)
+            if path.is_file() and not any(part.startswith('.') for part in relative.parts):
+                names.setdefault(relative.as_posix(), None)
+    return list(names)
+
+
+def is_cached(engine):
+    return any(hasattr(loader, 'loaders') for loader in engine.template_loaders)
+
+
+def compile_templates():
+    """
+    Compiles every template of every Django template backend and times each one. With the cached loader the
+    compiled templates are kept, so the first requests of the process do not pay for them. Includes and parents
+    are compiled on their own, so every time is the cost of that file alone.
+    """
+    results = []
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+
+        for name in template_names(engine):
+            start = time.perf_counter()
+            try:
+                engine.get_template(name)
+                error = None
+            except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as exception:
+                error = str(exception)
+            results.append(CompiledTemplate(backend.name, name, time.perf_counter() - start, error))
+    return results
+
+
+def count_patterns(resolver):
+    return sum(count_patterns(pattern) if isinstance(pattern, URLResolver) else 1 for pattern in resolver.url_patterns)
+
+
+def prime_namespaces(resolver, ns_pattern='', converters=()):
+    """
+    reverse('namespace:name') goes through a resolver built (and populated) per namespace by get_ns_resolver(),
+    so build them the same way reverse() does.
+    """
+    for extra, namespace_resolver in resolver.namespace_dict.values():
+        pattern = ns_pattern + extra
+        namespace_converters = tuple({**dict(converters), **namespace_resolver.pattern.converters}.items())
+        if pattern:
+            get_ns_resolver(pattern, namespace_resolver, namespace_converters).reverse_dict
+        prime_namespaces(namespace_resolver, pattern, namespace_converters)
+
+
+def prime_url_resolver():
+    """
+    Builds the reverse and namespace lookups that Django otherwise builds on the first reverse().
+    Returns the number of URL patterns.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict
+    prime_namespaces(resolver)
+    return count_patterns(resolver)
+
+
+def prime_locale():
+    """
+    Loads the default time zone (pytz reads it from disk on first use) and the translation catalog.
+    """
+    timezone.get_default_timezone()
+    if settings.USE_I18N:
+        # Not override(), which would leave the thread without any language and make the resolver populate again
+        translation.activate(settings.LANGUAGE_CODE)
+        translation.deactivate()
+
+
+def warm_up():
+    """
+    Compiles the templates and primes the URL resolver and the locale of this process. Called by the WSGI/ASGI
+    entry points when TEMPLATE_WARM_UP is on, so a new worker is warm before it accepts its first request.
+    """
+    start = time.perf_counter()
+    templates = compile_templates()
+    patterns = prime_url_resolver()
+    prime_locale()
+
+    for template in templates:
+        if template.error:
+            logger.warning(f'{template.name} could not be compiled: {template.error}')
+    logger.info(f'Compiled {len(templates)} templates and primed {patterns} URL patterns '
+                f'in {(time.perf_counter() - start) * 1000:.1f}ms.')
+    return templates, patterns